@@ -0,0 +1,139 @@
+"""
+Leveled, non-blocking logging for the web app.
+
+Modules log through `logging.getLogger(__name__)`. configure_logging()
+attaches a single QueueHandler to the root logger: request threads only put
+records on an in-memory queue, and a QueueListener thread formats them and
+writes them to stderr. A slow terminal or log collector therefore no longer
+stalls printing. The queue is bounded; when the writer cannot keep up,
+further records are dropped and counted (log_records_dropped_total) rather
+than held in memory or blocking the request.
+
+Bulky payloads (request JSON, pdflatex output, search results) are logged
+at DEBUG, so they cost nothing at the default INFO level.
+
+Environment:
+    LOG_LEVEL    DEBUG, INFO (default), WARNING, ...
+    LOG_FORMAT   "text" (default) or "json" for one JSON object per line
+    LOG_QUEUE_SIZE  records waiting for the writer before new ones are
+                 dropped (default: 10000)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+from metrics import LOG_RECORDS_DROPPED
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'
+
+_listener = None
+_listener_lock = threading.Lock()
+_queue = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record; `extra={...}` fields are included."""
+
+    _RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'message': record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in self._RESERVED})
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of failing on a full queue."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room: the stop sentinel must not be dropped
+        self.queue.put(self._sentinel)
+
+
+def _new_queue():
+    return queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', 10000)))
+
+
+def _start_listener():
+    global _listener
+    handler = logging.StreamHandler(sys.stderr)
+    if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    _listener = _QueueListener(_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def configure_logging(level=None):
+    """
+    Route all logging through a background writer thread (idempotent).
+
+    Args:
+        level (str): Log level name; defaults to $LOG_LEVEL or INFO
+    """
+    global _queue
+    with _listener_lock:
+        level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+        root = logging.getLogger()
+        root.setLevel(level)
+        if _queue is not None:
+            return
+        _queue = _new_queue()
+        # QueueHandler.prepare() still renders the message and any traceback
+        # in the calling thread; the listener adds the line format and writes
+        root.handlers = [_DroppingQueueHandler(_queue)]
+        _start_listener()
+        atexit.register(stop_logging)
+
+
+def restart_listener_after_fork():
+    """
+    Start a writer thread in a forked worker.
+
+    Threads do not survive fork(), so with gunicorn's preload_app the
+    listener started in the master must be recreated in every worker
+    (called from gunicorn.conf.py's post_fork hook). The worker also gets
+    its own queue: the master's queue lock may have been held at the fork.
+    """
+    global _queue
+    with _listener_lock:
+        if _queue is not None:
+            _queue = _new_queue()
+            for handler in logging.getLogger().handlers:
+                if isinstance(handler, _DroppingQueueHandler):
+                    handler.queue = _queue
+            _start_listener()
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            try:
+                _listener.stop()
+            except Exception:
+                pass
+            _listener = None
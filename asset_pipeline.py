@@ -0,0 +1,134 @@
+"""
+Fingerprinted, precompressed static assets for the web UI.
+
+The CSS and JavaScript of templates/index.html live in assets/. build_assets()
+copies each file to assets/dist/ under a content-hashed name
+(index.<sha>.css) next to gzip (and, if the optional brotli package is
+installed, brotli) compressed variants, and writes a manifest. Templates link
+to assets through asset_url(), and serve_asset() picks the best encoding the
+browser accepts. Because a file's name changes whenever its content does,
+the files are served with an immutable one-year Cache-Control.
+
+Usage:
+    python asset_pipeline.py        # build assets/dist
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import threading
+
+from flask import abort, request, send_file
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always produced
+    brotli = None
+
+ASSET_SOURCE_DIR = 'assets'
+ASSET_BUILD_DIR = os.path.join('assets', 'dist')
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Fingerprinted names by logical name ("js/settings.js" -> "js/settings.3f2a...js")
+_manifest = {}
+_manifest_lock = threading.Lock()
+
+
+def _source_files(source_dir):
+    for root, dirs, files in os.walk(source_dir):
+        # Never pick up our own build output
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != os.path.join(source_dir, 'dist')]
+        for name in sorted(files):
+            if name.endswith(('.css', '.js')):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, source_dir).replace(os.sep, '/'), path
+
+
+def build_assets(source_dir=ASSET_SOURCE_DIR, build_dir=ASSET_BUILD_DIR):
+    """
+    Fingerprint and precompress every asset; returns the manifest.
+
+    Files whose fingerprinted name already exists are not rewritten, so
+    rebuilding on every start-up is cheap.
+    """
+    manifest = {}
+    for logical_name, path in _source_files(source_dir):
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()[:16]
+        base, ext = os.path.splitext(logical_name)
+        built_name = f"{base}.{digest}{ext}"
+        built_path = os.path.join(build_dir, built_name)
+
+        if not os.path.exists(built_path + '.gz'):
+            os.makedirs(os.path.dirname(built_path), exist_ok=True)
+            shutil.copyfile(path, built_path)
+            # mtime=0 keeps the .gz byte-identical across rebuilds
+            with open(built_path + '.gz', 'wb') as f:
+                f.write(gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(built_path + '.br', 'wb') as f:
+                    f.write(brotli.compress(content))
+        manifest[logical_name] = built_name
+
+    os.makedirs(build_dir, exist_ok=True)
+    with open(os.path.join(build_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    with _manifest_lock:
+        _manifest.clear()
+        _manifest.update(manifest)
+    return manifest
+
+
+def manifest_version():
+    """Hashable snapshot of the manifest, for caches of pages that link assets."""
+    return tuple(sorted(_manifest.items()))
+
+
+def asset_url(logical_name):
+    """URL of the current fingerprinted version of an asset (Jinja global)."""
+    built_name = _manifest.get(logical_name)
+    if built_name is None:
+        built_name = build_assets().get(logical_name, logical_name)
+    return f'/assets/{built_name}'
+
+
+def _accepted_encodings():
+    header = request.headers.get('Accept-Encoding', '')
+    accepted = set()
+    for part in header.split(','):
+        token, _, params = part.strip().partition(';')
+        if token and params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(token.lower())
+    return accepted
+
+
+def serve_asset(built_name, build_dir=ASSET_BUILD_DIR):
+    """Serve a fingerprinted asset in the best encoding the client accepts."""
+    path = os.path.join(build_dir, built_name)
+    if built_name not in _manifest.values() or not os.path.isfile(path):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(built_name)[0] or 'application/octet-stream'
+    accepted = _accepted_encodings()
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if candidate in accepted and os.path.exists(path + suffix):
+            path, encoding = path + suffix, candidate
+            break
+
+    response = send_file(path, mimetype=mimetype, conditional=True, max_age=31536000)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+if __name__ == '__main__':
+    for logical, built in build_assets().items():
+        print(f"{logical} -> {built}")
@@ -0,0 +1,359 @@
+// Global validation functions
+function showAlert(message) {
+    alert(message);
+}
+
+function validateField(field, value, isEmpty, isValid, errorMessage) {
+    if (isEmpty(value)) {
+        showAlert(`${field} cannot be empty.`);
+        return false;
+    }
+    if (!isValid(value)) {
+        showAlert(errorMessage);
+        return false;
+    }
+    return true;
+}
+
+function validateName(name) {
+    return /^[a-zA-Z\s.]+$/.test(name);
+}
+
+function validateAge(age) {
+    return age !== "" && !isNaN(age) && parseInt(age) >= 0;
+}
+
+function validateUHID(uhid) {
+    return /^\d{9}$/.test(uhid);
+}
+
+function validateBed(bed) {
+    return bed !== 'none';
+}
+
+function validateForm() {
+    const nameInput = document.getElementById('name-to-be-taken');
+    const ageYearsInput = document.getElementById('age-years-to-be-taken');
+    const ageMonthsInput = document.getElementById('age-months-to-be-taken');
+    const uhidInput = document.getElementById('uuid-input');
+    const bedSelect = document.getElementById('bed-select');
+
+    const name = nameInput.value.trim();
+    const ageYears = ageYearsInput.value;
+    const ageMonths = ageMonthsInput.value;
+    const uhid = uhidInput.value.trim();
+    const bed = bedSelect.value;
+
+    if (!validateField('Name', name, (val) => !val, validateName, 'Name can only include letters, spaces, and dots. Numbers and other special characters are not allowed.')) {
+        return false;
+    }
+
+    if (!validateField('Age in years', ageYears, (val) => val === "", validateAge, 'Please select age in years.')) {
+        return false;
+    }
+
+    if (!validateField('Age in months', ageMonths, (val) => val === "", validateAge, 'Please select age in months.')) {
+        return false;
+    }
+
+    // Additional validation for months
+    if (parseInt(ageMonths) > 12) {
+        showAlert('Age in months cannot be greater than 12.');
+        return false;
+    }
+
+    if (!validateField('UHID', uhid, (val) => !val, validateUHID, 'UHID must be exactly 9 digits.')) {
+        return false;
+    }
+
+    if (!validateBed(bed)) {
+        showAlert('Bed cannot be none.');
+        return false;
+    }
+
+    return true;
+}
+
+// Add logo upload validation
+document.getElementById('logo-upload').addEventListener('change', function(e) {
+    const file = e.target.files[0];
+    if (file) {
+        if (file.type !== 'image/png') {
+            showAlert('Only PNG files are allowed for the logo.');
+            e.target.value = ''; // Clear the file input
+            return;
+        }
+
+        // Create FormData and append the file
+        const formData = new FormData();
+        formData.append('file', file);
+
+        // Show loading overlay
+        const loadingOverlay = document.createElement('div');
+        loadingOverlay.className = 'loading-overlay';
+        loadingOverlay.innerHTML = '<div class="loading-spinner"></div>';
+        document.body.appendChild(loadingOverlay);
+
+        // Upload the file
+        fetch('/upload_logo', {
+            method: 'POST',
+            body: formData
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.error) {
+                showAlert(data.error);
+            } else {
+                // Update the current logo display
+                document.getElementById('current-logo-path').textContent = 'RESOURCES/websitelogo.png';
+                document.getElementById('current-logo-img').src = '/resources/websitelogo.png?' + new Date().getTime(); // Add timestamp to prevent caching
+                showAlert('Logo uploaded successfully!');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showAlert('Error uploading logo');
+        })
+        .finally(() => {
+            loadingOverlay.remove();
+            e.target.value = ''; // Clear the file input
+        });
+    }
+});
+
+// Recently downloaded PDFs by ETag, so reprinting an unchanged chart is a 304
+const pdfBlobCache = new Map();
+const PDF_BLOB_CACHE_SIZE = 10;
+
+function downloadTextFile() {
+    if (!validateForm()) {
+        return;
+    }
+
+    // Show loading overlay
+    const loadingOverlay = document.createElement('div');
+    loadingOverlay.className = 'loading-overlay';
+    loadingOverlay.innerHTML = '<div class="loading-spinner"></div>';
+    document.body.appendChild(loadingOverlay);
+
+    // Clean empty rows before collecting data
+    cleanEmptyRows();
+
+    // Generate a new UUID for this entry
+    const newUuid = generateUUID();
+
+    // Get current datetime in a formatted string
+    const now = new Date();
+    const datetime = now.toISOString()
+        .replace(/[:.]/g, '-')
+        .replace('T', '_')
+        .slice(0, 19);
+
+    // Get name and UHID for filename
+    const name = document.getElementById('name-to-be-taken').value.trim().replace(/\s+/g, '_');
+    const uhid = document.getElementById('uuid-input').value.trim();
+
+    // Create filename with timestamp
+    const timestamp = now.getTime();
+    const filename = `${name}_${uhid}_${timestamp}.pdf`;
+
+    // Collect all form data with capitalized field names
+    const formData = {
+        Name: document.getElementById('name-to-be-taken').value.trim(),
+        Age_year: document.getElementById('age-years-to-be-taken').value,
+        Age_month: document.getElementById('age-months-to-be-taken').value,
+        Sex: document.getElementById('sex-select').value.trim(),
+        uhid: document.getElementById('uuid-input').value.trim(),
+        uuid: newUuid,
+        bed_number: document.getElementById('bed-select').value.trim(),
+        Diagnosis: document.getElementById('diagnosis-input').value.trim(),
+        Consultants: document.getElementById('consultants-input').value.trim(),
+        JR: document.getElementById('jr-input').value.trim(),
+        SR: document.getElementById('sr-input').value.trim()
+    };
+
+    // Collect parameters from the table
+    const parametersTable = document.getElementById('parameter-table');
+    const parameterRows = parametersTable.querySelectorAll('tbody tr');
+    const parameters = {};
+
+    parameterRows.forEach((row, index) => {
+        const parameterName = row.querySelector('td:nth-child(2) input').value.trim();
+        const parameterValue = row.querySelector('td:nth-child(3) input').value.trim();
+        parameters[`row_${index + 1}`] = {
+            row_header_name: parameterName || ' ',
+            row_header_description: parameterValue || ' '
+        };
+    });
+
+    // Collect all medication tables data
+    const medicationTables = document.querySelectorAll('#medications-container .table-container');
+    const entries = {};
+
+    medicationTables.forEach((tableContainer, tableIndex) => {
+        const table = tableContainer.querySelector('table');
+        const title = table.querySelector('th.cell-description input').value.trim();
+        const rows = table.querySelectorAll('tbody tr');
+        const subtitles = {};
+
+        rows.forEach((row, rowIndex) => {
+            const content = row.querySelector('td.cell-description input').value.trim();
+            const day = row.querySelector('td.cell-day input').value.trim();
+            const dose = row.querySelector('td.cell-dose input').value.trim();
+            const volume = row.querySelector('td.cell-volume input').value.trim();
+
+            if (content || day || dose || volume) {
+                subtitles[`subtitle_${rowIndex + 1}`] = {
+                    content: content,
+                    day: day,
+                    dose: dose,
+                    volume: volume
+                };
+            }
+        });
+
+        if (title || Object.keys(subtitles).length > 0) {
+            entries[`entry_${tableIndex + 1}`] = {
+                title: title,
+                subtitles: subtitles
+            };
+        }
+    });
+
+    // Add parameters and entries to form data
+    formData.parameters = parameters;
+    formData.entries = entries;
+
+    // Send data to server
+    const headers = {
+        'Content-Type': 'application/json',
+        'Accept': 'application/pdf'
+    };
+    if (pdfBlobCache.size > 0) {
+        headers['If-None-Match'] = Array.from(pdfBlobCache.keys()).join(', ');
+    }
+    let pdfUrl = null;
+
+    fetch('/download', {
+        method: 'POST',
+        headers: headers,
+        body: JSON.stringify(formData)
+    })
+    .then(response => {
+        pdfUrl = response.headers.get('Content-Location');
+        const etag = response.headers.get('ETag');
+        if (response.status === 304 && pdfBlobCache.has(etag)) {
+            return pdfBlobCache.get(etag);
+        }
+        if (!response.ok) {
+            return response.json().then(data => {
+                console.error('Server response:', data);
+                throw new Error(data.error || 'Error generating PDF');
+            });
+        }
+        if (response.headers.get('content-type') !== 'application/pdf') {
+            throw new Error('Server did not return a PDF file');
+        }
+        return response.blob().then(blob => {
+            if (etag) {
+                pdfBlobCache.delete(etag);
+                pdfBlobCache.set(etag, blob);
+                if (pdfBlobCache.size > PDF_BLOB_CACHE_SIZE) {
+                    pdfBlobCache.delete(pdfBlobCache.keys().next().value);
+                }
+            }
+            return blob;
+        });
+    })
+    .then(blob => {
+        if (!blob || blob.size === 0) {
+            throw new Error('Received empty PDF file');
+        }
+        console.log('Received PDF blob:', blob.size, 'bytes');
+
+        // Create object URL from blob
+        const url = window.URL.createObjectURL(blob);
+
+        // First download the file
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = filename;
+        document.body.appendChild(a);
+        a.click();
+        a.remove();
+
+        // Then open in new tab; the server URL lets the PDF viewer fetch byte ranges
+        const newWindow = window.open(pdfUrl || url, '_blank');
+
+        if (!newWindow) {
+            // If popup is blocked, show error
+            alert('Please allow popups for this website to view the PDF');
+        }
+
+        // Remove loading overlay
+        loadingOverlay.remove();
+
+        // Clean up object URL after a delay
+        setTimeout(() => {
+            window.URL.revokeObjectURL(url);
+        }, 1000);
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert(error.message);
+        // Remove loading overlay on error
+        loadingOverlay.remove();
+    });
+}
+
+// History rows are fetched one page at a time; the response carries an ETag
+// (no-cache), so reloading an unchanged page is a 304 without a body
+const HISTORY_PAGE_SIZE = 100;
+
+function loadHistoryPage(page = 1) {
+    fetch(`/get_entries?page=${page}&per_page=${HISTORY_PAGE_SIZE}`)
+        .then(response => response.json())
+        .then(entries => {
+            const tbody = document.querySelector('.search-results table tbody');
+            tbody.innerHTML = '';
+
+            if (entries && entries.length > 0) {
+                entries.forEach((entry, index) => {
+                    const row = document.createElement('tr');
+                    row.className = 'search-result-row';
+                    row.setAttribute('data-uuid', entry[3]);
+                    row.innerHTML = `
+                        <td style="text-align: center;">${(page - 1) * HISTORY_PAGE_SIZE + index + 1}</td>
+                        <td>${entry[0]}</td>
+                        <td>${entry[1]}</td>
+                        <td>${entry[2]}</td>
+                        <td style="display: none;">${entry[3]}</td>
+                    `;
+                    tbody.appendChild(row);
+                });
+            } else {
+                tbody.innerHTML = `
+                    <tr>
+                        <td colspan="5" style="text-align: center;">No entries found</td>
+                    </tr>
+                `;
+            }
+        })
+        .catch(error => {
+            console.error('Error fetching entries:', error);
+        });
+}
+
+// Initialize event listeners when DOM is loaded
+document.addEventListener('DOMContentLoaded', function() {
+    // Load the first page of search data
+    loadHistoryPage();
+
+    // Add event listener for form submission
+    document.getElementById('print-button').addEventListener('click', function(event) {
+        event.preventDefault(); // Prevent default action
+        if (validateForm()) {
+            downloadTextFile();
+        }
+    });
+});
@@ -0,0 +1,1015 @@
+// Add functionality to the search button
+document.querySelector('.search-button').addEventListener('click', function() {
+    const name = document.getElementById('search-name').value;
+    const date = document.getElementById('search-date').value;
+    const uhid = document.getElementById('search-uuid').value;
+
+    fetch('/search', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            name: name,
+            date: date,
+            uhid: uhid
+        })
+    })
+    .then(response => response.json())
+    .then(entries => {
+        const tbody = document.querySelector('.search-results table tbody');
+        tbody.innerHTML = '';
+
+        if (entries && entries.length > 0) {
+            entries.forEach((entry, index) => {
+                const row = document.createElement('tr');
+                row.className = 'search-result-row';
+                row.setAttribute('data-uuid', entry[3]);
+                row.innerHTML = `
+                    <td style="text-align: center;">${index + 1}</td>
+                    <td>${entry[0]}</td>
+                    <td>${entry[1]}</td>
+                    <td>${entry[2]}</td>
+                    <td style="display: none;">${entry[3]}</td>
+                `;
+                tbody.appendChild(row);
+            });
+        } else {
+            tbody.innerHTML = `
+                <tr>
+                    <td colspan="5" style="text-align: center;">No entries found</td>
+                </tr>
+            `;
+        }
+    })
+    .catch(error => {
+        console.error('Error performing search:', error);
+    });
+});
+
+// Add functionality to the reset button
+document.querySelectorAll('.search-button')[1].addEventListener('click', function() {
+    // Clear search inputs
+    document.getElementById('search-name').value = '';
+    document.getElementById('search-date').value = '';
+    document.getElementById('search-uuid').value = '';
+
+    // Back to the first page of all entries
+    loadHistoryPage();
+});
+
+// Tab switching functionality
+document.querySelectorAll('.tab').forEach(tab => {
+    tab.addEventListener('click', function() {
+        const tabId = this.getAttribute('data-tab');
+
+        // Update active tab
+        document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
+        this.classList.add('active');
+
+        // Show corresponding content
+        document.querySelectorAll('.tab-content').forEach(content => {
+            content.classList.remove('active');
+        });
+
+        document.getElementById(tabId + '-tab').classList.add('active');
+
+        // If switching to search tab, refresh the entries
+        if (tabId === 'search') {
+            // Clear search inputs and reload the first page of entries
+            document.getElementById('search-name').value = '';
+            document.getElementById('search-date').value = '';
+            document.getElementById('search-uuid').value = '';
+
+            loadHistoryPage();
+        }
+    });
+});
+
+// The chart format comes from a small cacheable endpoint instead of
+// being rendered into the page; setup that needs the populated tables
+// waits on window.formatReady
+document.addEventListener('DOMContentLoaded', function() {
+    window.formatReady = fetch('/formats/default_format.json')
+        .then(response => response.json())
+        .then(populateFromFormat)
+        .catch(error => {
+            console.error('Error loading chart format:', error);
+        });
+});
+
+function populateFromFormat(defaultData) {
+    const currentData = defaultData;
+
+    // Populate medication tables
+    const medicationsContainer = document.getElementById('medications-container');
+    medicationsContainer.innerHTML = ''; // Clear existing content
+
+    // Create tables from each_entry_layout
+    Object.entries(currentData.each_entry_layout).forEach(([entryKey, entryData]) => {
+        // Create table container
+        const tableContainer = document.createElement('div');
+        tableContainer.className = 'table-container';
+
+        // Create table
+        const table = document.createElement('table');
+        table.innerHTML = `
+            <colgroup>
+                <col style="width: 15px;">
+                <col style="width: 245px;">
+                <col style="width: 40px;">
+                <col style="width: 80px;">
+                <col style="width: 80px;">
+            </colgroup>
+            <thead>
+                <tr>
+                    <th class="cell-number"></th>
+                    <th class="cell-description">
+                        <input type="text" class="header-editable" value="${entryData.title || ''}">
+                    </th>
+                    <th class="cell-day">Day</th>
+                    <th class="cell-dose">Dose</th>
+                    <th class="cell-volume">Volume</th>
+                </tr>
+            </thead>
+            <tbody>
+            </tbody>
+        `;
+
+        // Add rows from subtitles
+        const tbody = table.querySelector('tbody');
+        Object.entries(entryData.subtitles || {}).forEach(([subtitleKey, subtitleData], index) => {
+            const row = document.createElement('tr');
+            row.innerHTML = `
+                <td class="cell-number">${index + 1}</td>
+                <td class="cell-description"><input type="text" class="editable" value="${subtitleData.content || ''}"></td>
+                <td class="cell-day"><input type="text" class="editable" value="${subtitleData.day || ''}"></td>
+                <td class="cell-dose"><input type="text" class="editable" value="${subtitleData.dose || ''}"></td>
+                <td class="cell-volume"><input type="text" class="editable" value="${subtitleData.volume || ''}"></td>
+            `;
+            tbody.appendChild(row);
+        });
+
+        // Add table to container
+        tableContainer.appendChild(table);
+        medicationsContainer.appendChild(tableContainer);
+
+        // Add "Add Row" button
+        const addRowButton = document.createElement('button');
+        addRowButton.className = 'button add-row';
+        addRowButton.textContent = 'Add Row';
+        medicationsContainer.appendChild(addRowButton);
+    });
+
+    // Populate parameter table
+    const parameterTable = document.getElementById('parameter-table');
+    const tbody = parameterTable.querySelector('tbody');
+    tbody.innerHTML = ''; // Clear existing content
+
+    Object.entries(currentData.each_table_row_layout || {}).forEach(([rowKey, rowData]) => {
+        const row = document.createElement('tr');
+        row.innerHTML = `
+            <td class="cell-number">${rowKey.replace('row_', '')}</td>
+            <td class="cell-description">
+                <input type="text" class="editable" value="${rowData.row_header_name || ''}">
+            </td>
+            <td class="cell-value">
+                <input type="text" class="editable" value="${rowData.row_header_description || ''}">
+            </td>
+        `;
+        tbody.appendChild(row);
+    });
+
+    // Add event listeners after populating tables
+    addInputListeners();
+
+    // Add event listeners for add row buttons
+    document.querySelectorAll('.add-row').forEach(button => {
+        button.addEventListener('click', function() {
+            const tableContainer = this.previousElementSibling;
+            const table = tableContainer.querySelector('tbody');
+            if (table) {
+                const rowCount = table.querySelectorAll('tr').length + 1;
+                const newRow = document.createElement('tr');
+                newRow.innerHTML = `
+                    <td class="cell-number">${rowCount}</td>
+                    <td class="cell-description"><input type="text" class="editable" value="New Entry"></td>
+                    <td class="cell-day"><input type="text" class="editable" value="1"></td>
+                    <td class="cell-dose"><input type="text" class="editable" value="0"></td>
+                    <td class="cell-volume"><input type="text" class="editable" value="0"></td>
+                `;
+                table.appendChild(newRow);
+
+                // Add listeners to the new inputs
+                const newInputs = newRow.querySelectorAll('input.editable');
+                newInputs.forEach(input => {
+                    input.removeEventListener('input', handleInputChange);
+                    input.addEventListener('input', handleInputChange);
+                });
+            }
+        });
+    });
+
+    // Add event listener for add box button in footer
+    document.getElementById('add-box-footer').addEventListener('click', function() {
+        addNewBox();
+        // Reattach listeners after adding new box
+        setTimeout(reattachListeners, 0);
+    });
+}
+
+// Add event listeners to all input fields in medication tables
+function addInputListeners() {
+    console.log('Adding input listeners to all tables');
+    const medicationTables = document.querySelectorAll('#medications-container .table-container');
+
+    medicationTables.forEach(tableContainer => {
+        const inputs = tableContainer.querySelectorAll('input.editable');
+        inputs.forEach(input => {
+            // Remove any existing listeners to prevent duplicates
+            input.removeEventListener('input', handleInputChange);
+            // Add the listener
+            input.addEventListener('input', handleInputChange);
+        });
+    });
+}
+
+// Debounce function to prevent too many rapid calls
+function debounce(func, wait) {
+    let timeout;
+    return function executedFunction(...args) {
+        const later = () => {
+            clearTimeout(timeout);
+            func(...args);
+        };
+        clearTimeout(timeout);
+        timeout = setTimeout(later, wait);
+    };
+}
+
+// Handle input changes with debounce
+const handleInputChange = debounce(function() {
+    console.log('Input changed, checking for empty rows');
+    cleanEmptyRows();
+}, 300);
+
+// Add functionality to clean empty rows
+function cleanEmptyRows() {
+    console.log('Cleaning empty rows');
+    const medicationTables = document.querySelectorAll('#medications-container .table-container');
+
+    medicationTables.forEach(tableContainer => {
+        const table = tableContainer.querySelector('table');
+        const rows = table.querySelectorAll('tbody tr');
+
+        rows.forEach((row, index) => {
+            const content = row.querySelector('td.cell-description input').value.trim();
+            const day = row.querySelector('td.cell-day input').value.trim();
+            const dose = row.querySelector('td.cell-dose input').value.trim();
+            const volume = row.querySelector('td.cell-volume input').value.trim();
+
+            console.log('Row values:', { content, day, dose, volume });
+
+            // If all fields are empty, remove the row
+            if (!content && !day && !dose && !volume) {
+                console.log('Removing empty row:', row);
+                row.remove();
+            }
+        });
+
+        // Update row numbers after removing empty rows
+        const remainingRows = table.querySelectorAll('tbody tr');
+        remainingRows.forEach((row, index) => {
+            row.querySelector('td.cell-number').textContent = index + 1;
+        });
+    });
+}
+
+// Function to handle add row button click
+function handleAddRow() {
+    console.log('Add row button clicked');
+    const tableContainer = this.previousElementSibling;
+    const table = tableContainer.querySelector('tbody');
+    if (table) {
+        const rowCount = table.querySelectorAll('tr').length + 1;
+        const newRow = document.createElement('tr');
+        newRow.innerHTML = `
+            <td class="cell-number">${rowCount}</td>
+            <td class="cell-description"><input type="text" class="editable" value="New Entry"></td>
+            <td class="cell-day"><input type="text" class="editable" value="1"></td>
+            <td class="cell-dose"><input type="text" class="editable" value="0"></td>
+            <td class="cell-volume"><input type="text" class="editable" value="0"></td>
+        `;
+        table.appendChild(newRow);
+
+        // Add listeners to the new inputs
+        const newInputs = newRow.querySelectorAll('input.editable');
+        newInputs.forEach(input => {
+            input.addEventListener('input', handleInputChange);
+        });
+    }
+}
+
+// Function to add event listeners to add row buttons
+function addRowButtonListeners() {
+    // Remove all existing listeners first
+    document.querySelectorAll('.add-row').forEach(button => {
+        const newButton = button.cloneNode(true);
+        button.parentNode.replaceChild(newButton, button);
+    });
+
+    // Add new listeners
+    document.querySelectorAll('.add-row').forEach(button => {
+        button.addEventListener('click', handleAddRow);
+    });
+}
+
+// Update the DOMContentLoaded event listener
+document.addEventListener('DOMContentLoaded', function() {
+    window.formatReady.then(setupChartControls);
+});
+
+function setupChartControls() {
+    // Initial setup of add row button listeners
+    addRowButtonListeners();
+
+    // Add box button functionality - remove any existing listeners first
+    const addBoxButton = document.getElementById('add-box-footer');
+    if (addBoxButton) {
+        // Remove any existing listeners by cloning the button
+        const newAddBoxButton = addBoxButton.cloneNode(true);
+        addBoxButton.parentNode.replaceChild(newAddBoxButton, addBoxButton);
+
+        // Add the new listener
+        newAddBoxButton.addEventListener('click', function() {
+            addNewBox();
+            // Reattach listeners after adding new box
+            addRowButtonListeners();
+        });
+    }
+
+    // Add parameter/cell functionality
+    document.getElementById('add-parameter').addEventListener('click', addNewParameter);
+
+    // DDI button functionality
+    const ddiButton = document.querySelector('.footer-button:nth-child(2)');
+    const ddiModalOverlay = document.getElementById('ddi-modal-overlay');
+    const closeDdiModal = document.getElementById('close-ddi-modal');
+
+    ddiButton.addEventListener('click', handleDDIClick);
+
+    // Add close button functionality
+    closeDdiModal.addEventListener('click', function() {
+        ddiModalOverlay.style.display = 'none';
+    });
+
+    // Add overlay click functionality
+    ddiModalOverlay.addEventListener('click', function(e) {
+        if (e.target === ddiModalOverlay) {
+            ddiModalOverlay.style.display = 'none';
+        }
+    });
+
+    // Add click handlers to search result rows
+    // Add click handler for existing rows
+    document.querySelectorAll('.search-result-row').forEach(row => {
+        row.addEventListener('click', function() {
+            const uuid = this.getAttribute('data-uuid');
+            if (uuid) {
+                loadEntryData(uuid);
+            }
+        });
+    });
+
+    // Add click handler for dynamically added rows
+    document.querySelector('.search-results').addEventListener('click', function(e) {
+        const row = e.target.closest('.search-result-row');
+        if (row) {
+            const uuid = row.getAttribute('data-uuid');
+            if (uuid) {
+                loadEntryData(uuid);
+            }
+        }
+    });
+}
+
+// Update the addNewBox function
+function addNewBox() {
+    const container = document.getElementById('medications-container');
+    const tableContainer = document.createElement('div');
+    tableContainer.className = 'table-container';
+
+    const table = document.createElement('table');
+    table.innerHTML = `
+        <colgroup>
+            <col style="width: 15px;">
+            <col style="width: 245px;">
+            <col style="width: 40px;">
+            <col style="width: 80px;">
+            <col style="width: 80px;">
+        </colgroup>
+        <thead>
+            <tr>
+                <th class="cell-number"></th>
+                <th class="cell-description">
+                    <input type="text" class="header-editable" placeholder="Enter title">
+                </th>
+                <th class="cell-day">Day</th>
+                <th class="cell-dose">Dose</th>
+                <th class="cell-volume">Volume</th>
+            </tr>
+        </thead>
+        <tbody>
+            <tr>
+                <td class="cell-number">1</td>
+                <td class="cell-description"><input type="text" class="editable"></td>
+                <td class="cell-day"><input type="text" class="editable" value="1"></td>
+                <td class="cell-dose"><input type="text" class="editable"></td>
+                <td class="cell-volume"><input type="text" class="editable"></td>
+            </tr>
+        </tbody>
+    `;
+
+    // Add table to container
+    tableContainer.appendChild(table);
+    container.appendChild(tableContainer);
+
+    // Add "Add Row" button
+    const addRowButton = document.createElement('button');
+    addRowButton.className = 'button add-row';
+    addRowButton.textContent = 'Add Row';
+    container.appendChild(addRowButton);
+
+    // Add input listeners to the new inputs
+    const newInputs = tableContainer.querySelectorAll('input.editable');
+    newInputs.forEach(input => {
+        input.addEventListener('input', handleInputChange);
+    });
+}
+
+// Update the handleDDIClick function
+function handleDDIClick() {
+    // Show loading overlay
+    const loadingOverlay = document.createElement('div');
+    loadingOverlay.className = 'loading-overlay';
+    loadingOverlay.innerHTML = '<div class="loading-spinner"></div>';
+    document.body.appendChild(loadingOverlay);
+
+    // Clean empty rows before collecting data
+    cleanEmptyRows();
+
+    // Generate a new UUID for this entry
+    const newUuid = generateUUID();
+
+    // Collect all form data with capitalized field names
+    const formData = {
+        Name: document.getElementById('name-to-be-taken').value.trim(),
+        Age_year: document.getElementById('age-years-to-be-taken').value,
+        Age_month: document.getElementById('age-months-to-be-taken').value,
+        Sex: document.getElementById('sex-select').value.trim(),
+        uhid: document.getElementById('uuid-input').value.trim(),
+        uuid: newUuid,
+        bed_number: document.getElementById('bed-select').value.trim(),
+        Diagnosis: document.getElementById('diagnosis-input').value.trim(),
+        Consultants: document.getElementById('consultants-input').value.trim(),
+        JR: document.getElementById('jr-input').value.trim(),
+        SR: document.getElementById('sr-input').value.trim()
+    };
+
+    // Collect parameters from the table
+    const parametersTable = document.getElementById('parameter-table');
+    const parameterRows = parametersTable.querySelectorAll('tbody tr');
+    const parameters = {};
+
+    parameterRows.forEach((row, index) => {
+        const parameterName = row.querySelector('td:nth-child(2) input').value.trim();
+        const parameterValue = row.querySelector('td:nth-child(3) input').value.trim();
+        parameters[`row_${index + 1}`] = {
+            row_header_name: parameterName || ' ',
+            row_header_description: parameterValue || ' '
+        };
+    });
+
+    // Collect all medication tables data
+    const medicationTables = document.querySelectorAll('#medications-container .table-container');
+    const entries = {};
+
+    medicationTables.forEach((tableContainer, tableIndex) => {
+        const table = tableContainer.querySelector('table');
+        const title = table.querySelector('th.cell-description input').value.trim();
+        const rows = table.querySelectorAll('tbody tr');
+        const subtitles = {};
+
+        rows.forEach((row, rowIndex) => {
+            const content = row.querySelector('td.cell-description input').value.trim();
+            const day = row.querySelector('td.cell-day input').value.trim();
+            const dose = row.querySelector('td.cell-dose input').value.trim();
+            const volume = row.querySelector('td.cell-volume input').value.trim();
+
+            if (content || day || dose || volume) {
+                subtitles[`subtitle_${rowIndex + 1}`] = {
+                    content: content,
+                    day: day,
+                    dose: dose,
+                    volume: volume
+                };
+            }
+        });
+
+        if (title || Object.keys(subtitles).length > 0) {
+            entries[`entry_${tableIndex + 1}`] = {
+                title: title,
+                subtitles: subtitles
+            };
+        }
+    });
+
+    // Add parameters and entries to form data
+    formData.parameters = parameters;
+    formData.entries = entries;
+
+    // Send data to server for DDI processing
+    fetch('/ddi', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(formData)
+    })
+    .then(response => {
+        if (!response.ok) {
+            return response.json().then(data => {
+                throw new Error(data.error || 'Error processing drug interactions');
+            });
+        }
+        return response.json();
+    })
+    .then(data => {
+        // Remove loading overlay
+        loadingOverlay.remove();
+
+        const tbody = document.querySelector('#ddi-table tbody');
+        tbody.innerHTML = '';
+
+        if (data.error) {
+            // Show error in table format
+            const tr = document.createElement('tr');
+            tr.innerHTML = `
+                <td colspan="3" style="background-color: #FFC8C8; text-align: center; font-weight: bold;">${data.error}</td>
+            `;
+            tbody.appendChild(tr);
+        } else if (data.table && data.table.length > 0) {
+            data.table.forEach(row => {
+                const tr = document.createElement('tr');
+                const color = getInteractionColor(row['Interaction']);
+                tr.innerHTML = `
+                    <td>${row['Drug 1']}</td>
+                    <td>${row['Drug 2']}</td>
+                    <td style="background-color: ${color};">${row['Interaction']}</td>
+                `;
+                tbody.appendChild(tr);
+            });
+        } else {
+            const tr = document.createElement('tr');
+            tr.innerHTML = `
+                <td colspan="3" style="background-color: #FFC8C8; text-align: center; font-weight: bold;">No drug interactions found</td>
+            `;
+            tbody.appendChild(tr);
+        }
+        document.getElementById('ddi-modal-overlay').style.display = 'flex';
+    })
+    .catch(error => {
+        // Remove loading overlay
+        loadingOverlay.remove();
+
+        console.error('Error:', error);
+        const tbody = document.querySelector('#ddi-table tbody');
+
+        // Show error in table format
+        tbody.innerHTML = `
+            <tr>
+                <td colspan="3" style="background-color: #FFC8C8; text-align: center; font-weight: bold;">${error.message}</td>
+            </tr>
+        `;
+
+        document.getElementById('ddi-modal-overlay').style.display = 'flex';
+    });
+}
+
+// Add this function to determine the color based on interaction severity
+function getInteractionColor(interaction) {
+    const lowerInteraction = interaction.toLowerCase();
+    if (lowerInteraction.includes('major') || lowerInteraction.includes('high') || lowerInteraction.includes('severe')) {
+        return '#FFC8C8';  // Light red
+    } else if (lowerInteraction.includes('moderate') || lowerInteraction.includes('medium')) {
+        return '#FFFFC8';  // Light yellow
+    } else if (lowerInteraction.includes('minor') || lowerInteraction.includes('low') || lowerInteraction.includes('mild')) {
+        return '#C8FFC8';  // Light green
+    } else {
+        return '#F0F0F0';  // Light gray for unknown
+    }
+}
+
+// Add this function to handle row clicks
+function loadEntryData(uuid) {
+    console.log('Loading entry with UUID:', uuid); // Debug log
+    fetch(`/get_entry/${uuid}`)
+        .then(response => {
+            console.log('Response status:', response.status); // Debug log
+            return response.json();
+        })
+        .then(data => {
+            console.log('Received data:', data); // Debug log
+            if (data.error) {
+                alert(data.error);
+                return;
+            }
+
+            // Switch to edit tab
+            document.querySelector('.tab[data-tab="edit"]').click();
+
+            // Fill form fields with capitalized field names
+            document.getElementById('name-to-be-taken').value = data.Name || '';
+            document.getElementById('age-years-to-be-taken').value = data.Age_year || '';
+            document.getElementById('age-months-to-be-taken').value = data.Age_month || '';
+            document.getElementById('sex-select').value = data.Sex || '';
+            document.getElementById('bed-select').value = data.bed_number || '';
+            document.getElementById('uuid-input').value = data.uhid || ''; // This is the UHID
+            document.getElementById('diagnosis-input').value = data.Diagnosis || '';
+            document.getElementById('consultants-input').value = data.Consultants || '';
+            document.getElementById('jr-input').value = data.JR || '';
+            document.getElementById('sr-input').value = data.SR || '';
+
+            // Clear existing medication tables
+            const medicationsContainer = document.getElementById('medications-container');
+            medicationsContainer.innerHTML = '';
+
+            // Create medication tables from entries
+            Object.entries(data.each_entry_layout || {}).forEach(([entryKey, entryData]) => {
+                // Create table container
+                const tableContainer = document.createElement('div');
+                tableContainer.className = 'table-container';
+
+                // Create table
+                const table = document.createElement('table');
+                table.innerHTML = `
+                    <colgroup>
+                        <col style="width: 15px;">
+                        <col style="width: 245px;">
+                        <col style="width: 40px;">
+                        <col style="width: 80px;">
+                        <col style="width: 80px;">
+                    </colgroup>
+                    <thead>
+                        <tr>
+                            <th class="cell-number"></th>
+                            <th class="cell-description">
+                                <input type="text" class="header-editable" value="${entryData.title || ''}">
+                            </th>
+                            <th class="cell-day">Day</th>
+                            <th class="cell-dose">Dose</th>
+                            <th class="cell-volume">Volume</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                    </tbody>
+                `;
+
+                // Add rows from subtitles
+                const tbody = table.querySelector('tbody');
+                Object.entries(entryData.subtitles || {}).forEach(([subtitleKey, subtitleData], index) => {
+                    const row = document.createElement('tr');
+                    row.innerHTML = `
+                        <td class="cell-number">${index + 1}</td>
+                        <td class="cell-description"><input type="text" class="editable" value="${subtitleData.content || ''}"></td>
+                        <td class="cell-day"><input type="text" class="editable" value="${subtitleData.day || ''}"></td>
+                        <td class="cell-dose"><input type="text" class="editable" value="${subtitleData.dose || ''}"></td>
+                        <td class="cell-volume"><input type="text" class="editable" value="${subtitleData.volume || ''}"></td>
+                    `;
+                    tbody.appendChild(row);
+                });
+
+                // Add table to container
+                tableContainer.appendChild(table);
+                medicationsContainer.appendChild(tableContainer);
+
+                // Add "Add Row" button
+                const addRowButton = document.createElement('button');
+                addRowButton.className = 'button add-row';
+                addRowButton.textContent = 'Add Row';
+                medicationsContainer.appendChild(addRowButton);
+            });
+
+            // Populate parameter table
+            const parameterTable = document.getElementById('parameter-table');
+            const tbody = parameterTable.querySelector('tbody');
+            tbody.innerHTML = ''; // Clear existing content
+
+            Object.entries(data.each_table_row_layout || {}).forEach(([rowKey, rowData]) => {
+                const row = document.createElement('tr');
+                row.innerHTML = `
+                    <td class="cell-number">${rowKey.replace('row_', '')}</td>
+                    <td class="cell-description">
+                        <input type="text" class="editable" value="${rowData.row_header_name || ''}">
+                    </td>
+                    <td class="cell-value">
+                        <input type="text" class="editable" value="${rowData.row_header_description || ''}">
+                    </td>
+                `;
+                tbody.appendChild(row);
+            });
+
+            // Reattach all event listeners after loading data
+            addRowButtonListeners();
+            addInputListeners();
+        })
+        .catch(error => {
+            console.error('Error loading entry:', error);
+            alert('Error loading entry data');
+        });
+}
+
+// Function to add new parameter row
+function addNewParameter() {
+    const table = document.getElementById('parameter-table').querySelector('tbody');
+    const rowCount = table.querySelectorAll('tr').length + 1;
+
+    const newRow = document.createElement('tr');
+    newRow.innerHTML = `
+        <td class="cell-number">${rowCount}</td>
+        <td><input type="text" class="editable" placeholder="Parameter name"></td>
+        <td><input type="text" class="editable"></td>
+    `;
+
+    table.appendChild(newRow);
+
+    // Add input listeners to the new inputs
+    const newInputs = newRow.querySelectorAll('input.editable');
+    newInputs.forEach(input => {
+        input.addEventListener('input', handleInputChange);
+    });
+}
+
+// Calendar functionality
+let currentDateInput = null;
+let flatpickrInstance = null;
+
+// Initialize calendar
+function initializeCalendar() {
+    const calendarModal = document.getElementById('calendar-modal-overlay');
+    const closeCalendarBtn = document.getElementById('close-calendar-modal');
+
+    // Close calendar on overlay click
+    calendarModal.addEventListener('click', function(e) {
+        if (e.target === calendarModal) {
+            closeCalendar();
+        }
+    });
+
+    // Close calendar on button click
+    closeCalendarBtn.addEventListener('click', closeCalendar);
+}
+
+// Function to check if a parameter name indicates a date field
+function isDateParameter(paramName) {
+    if (!paramName) return false;
+    const dateKeywords = ['date', 'dob', 'birth', 'admission', 'discharge'];
+    // Exclude time-related keywords
+    const timeKeywords = ['time', 'hour', 'minute', 'second'];
+
+    // Check if it's a time field first
+    if (timeKeywords.some(keyword => paramName.toLowerCase().includes(keyword))) {
+        return false;
+    }
+
+    // Then check if it's a date field
+    return dateKeywords.some(keyword => 
+        paramName.toLowerCase().includes(keyword)
+    );
+}
+
+// Function to handle parameter table changes
+function handleParameterTableChanges() {
+    const parameterTable = document.getElementById('parameter-table');
+    const tbody = parameterTable.querySelector('tbody');
+
+    // Use event delegation for parameter name changes
+    tbody.addEventListener('input', function(e) {
+        if (e.target.matches('td:nth-child(2) input')) {
+            const row = e.target.closest('tr');
+            const valueCell = row.querySelector('td:nth-child(3) input');
+
+            if (isDateParameter(e.target.value)) {
+                valueCell.classList.add('date-field');
+                valueCell.setAttribute('data-date-field', 'true');
+                // Add a visual indicator
+                valueCell.setAttribute('placeholder', 'Click to select date');
+            } else {
+                valueCell.classList.remove('date-field');
+                valueCell.removeAttribute('data-date-field');
+                valueCell.removeAttribute('placeholder');
+            }
+        }
+    });
+
+    // Use event delegation for value cell clicks
+    tbody.addEventListener('click', function(e) {
+        if (e.target.matches('td:nth-child(3) input[data-date-field="true"]')) {
+            e.preventDefault();
+            showCalendar(e.target);
+        }
+    });
+}
+
+// Function to check existing parameter rows
+function checkExistingParameterRows() {
+    const parameterTable = document.getElementById('parameter-table');
+    const rows = parameterTable.querySelectorAll('tbody tr');
+
+    rows.forEach(row => {
+        const paramNameInput = row.querySelector('td:nth-child(2) input');
+        const valueInput = row.querySelector('td:nth-child(3) input');
+
+        if (isDateParameter(paramNameInput.value)) {
+            valueInput.classList.add('date-field');
+            valueInput.setAttribute('data-date-field', 'true');
+            valueInput.setAttribute('placeholder', 'Click to select date');
+        }
+    });
+}
+
+// Function to show calendar
+function showCalendar(inputElement) {
+    currentDateInput = inputElement;
+    const calendarModal = document.getElementById('calendar-modal-overlay');
+    calendarModal.style.display = 'flex';
+
+    // Destroy existing instance if any
+    if (flatpickrInstance) {
+        flatpickrInstance.destroy();
+    }
+
+    // Initialize Flatpickr with more options
+    flatpickrInstance = flatpickr("#calendar", {
+        dateFormat: "d-m-Y",
+        allowInput: true,
+        enableTime: false,
+        time_24hr: false,
+        defaultDate: inputElement.value || "today",
+        locale: "default",
+        monthSelectorType: "static",
+        yearRange: "1900:2100",
+        showMonths: 1,
+        static: true,
+        inline: true,
+        onChange: function(selectedDates, dateStr) {
+            if (currentDateInput) {
+                currentDateInput.value = dateStr;
+                // Trigger input event to ensure any listeners are notified
+                currentDateInput.dispatchEvent(new Event('input'));
+            }
+            closeCalendar();
+        }
+    });
+}
+
+// Function to close calendar
+function closeCalendar() {
+    const calendarModal = document.getElementById('calendar-modal-overlay');
+    calendarModal.style.display = 'none';
+    currentDateInput = null;
+}
+
+// Add click handler for search date field
+document.getElementById('search-date').addEventListener('focus', function(e) {
+    showCalendar(this);
+});
+
+// Initialize everything when DOM is loaded
+document.addEventListener('DOMContentLoaded', function() {
+    window.formatReady.then(setupParameterTable);
+});
+
+function setupParameterTable() {
+    initializeCalendar();
+    handleParameterTableChanges();
+    checkExistingParameterRows();
+
+    // Set up MutationObserver for parameter table
+    const parameterTable = document.getElementById('parameter-table');
+    const observer = new MutationObserver(function(mutations) {
+        mutations.forEach(function(mutation) {
+            if (mutation.type === 'childList') {
+                checkExistingParameterRows();
+            }
+        });
+    });
+
+    observer.observe(parameterTable.querySelector('tbody'), {
+        childList: true,
+        subtree: true
+    });
+}
+
+// Add styles for date fields and calendar
+const style = document.createElement('style');
+style.textContent = `
+    .date-field {
+        background-color: #f0f8ff !important;
+        cursor: pointer !important;
+    }
+    .date-field:hover {
+        background-color: #e0f0ff !important;
+    }
+    #calendar {
+        width: 100%;
+        padding: 10px;
+    }
+    .flatpickr-calendar {
+        width: 100% !important;
+        max-width: 100% !important;
+        background: #fff;
+        box-shadow: 0 3px 13px rgba(0,0,0,0.08);
+        border-radius: 8px;
+        padding: 10px;
+    }
+    .flatpickr-month {
+        height: 50px !important;
+        background: #f8f9fa;
+        border-radius: 6px;
+        margin-bottom: 10px;
+    }
+    .flatpickr-current-month {
+        padding: 8px 0 !important;
+        font-size: 1.1em;
+    }
+    .flatpickr-weekday {
+        height: 35px !important;
+        line-height: 35px !important;
+        font-weight: 600;
+        color: #333;
+    }
+    .flatpickr-day {
+        height: 40px !important;
+        line-height: 40px !important;
+        border-radius: 4px;
+        margin: 2px;
+    }
+    .flatpickr-day.selected {
+        background: #4a90e2 !important;
+        border-color: #4a90e2 !important;
+    }
+    .flatpickr-day:hover {
+        background: #e0f0ff !important;
+    }
+    .flatpickr-months .flatpickr-month {
+        background: transparent;
+    }
+    .flatpickr-months .flatpickr-prev-month,
+    .flatpickr-months .flatpickr-next-month {
+        top: 8px;
+        padding: 5px;
+    }
+    .flatpickr-months .flatpickr-prev-month svg,
+    .flatpickr-months .flatpickr-next-month svg {
+        width: 16px;
+        height: 16px;
+    }
+    .flatpickr-current-month .flatpickr-monthDropdown-months {
+        appearance: none;
+        -webkit-appearance: none;
+        padding: 5px;
+        border: 1px solid #ddd;
+        border-radius: 4px;
+        background: white;
+        font-size: 1em;
+    }
+    .numInputWrapper {
+        width: 60px;
+    }
+    .numInputWrapper input {
+        padding: 5px;
+        border: 1px solid #ddd;
+        border-radius: 4px;
+        background: white;
+        font-size: 1em;
+    }
+    .flatpickr-calendar.arrowTop:before {
+        border-bottom-color: #f8f9fa;
+    }
+    .flatpickr-calendar.arrowBottom:before {
+        border-top-color: #f8f9fa;
+    }
+`;
+document.head.appendChild(style);
+
+function generateUUID() {
+  return 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, function(c) {
+    const r = Math.random() * 16 | 0;
+    const v = c === 'x' ? r : (r & 0x3 | 0x8);
+    return v.toString(16);
+  });
+}
+
+// Replace crypto.randomUUID() with generateUUID()
+const newUuid = generateUUID();
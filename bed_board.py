@@ -0,0 +1,88 @@
+"""
+Ward bed board: the current chart on every bed.
+
+BedBoard maps bed_number to the summary of that bed's most recent chart.
+It is built once from the chart index and then updated on every chart
+insert, so "what is on bed 7 right now" is a dict lookup and the whole
+ward overview is a single small response.
+"""
+import threading
+
+from chart_index import datetime_sort_key
+
+# Only these summary fields are shown on the board
+BOARD_FIELDS = ('uuid', 'Name', 'uhid', 'datetime', 'print_time')
+EMPTY_BED_VALUES = ('', 'none')
+
+
+def _bed_key(bed_number):
+    bed = str(bed_number or '').strip()
+    return None if bed.lower() in EMPTY_BED_VALUES else bed
+
+
+def _board_entry(chart):
+    return {field: chart.get(field) for field in BOARD_FIELDS}
+
+
+class BedBoard:
+    def __init__(self, chart_index, bed_count=16):
+        self.chart_index = chart_index
+        self.bed_count = bed_count
+        self._lock = threading.Lock()
+        self._beds = {}  # bed -> board entry of its most recent chart
+        self._reloads = None
+
+    def _rebuild(self):
+        beds = {}
+        for summary in self.chart_index.summaries():
+            bed = _bed_key(summary.get('bed_number'))
+            if bed is None:
+                continue
+            current = beds.get(bed)
+            if current is None or datetime_sort_key(summary) >= datetime_sort_key(current):
+                beds[bed] = _board_entry(summary)
+        self._beds = beds
+        self._reloads = self.chart_index.reloads
+
+    def _sync(self):
+        # Rebuild only when the index was reloaded from disk (e.g. another
+        # worker wrote); local writes arrive through record_chart_event
+        self.chart_index.refresh_if_stale()
+        if self._reloads != self.chart_index.reloads:
+            self._rebuild()
+
+    def record_chart_event(self, event, chart):
+        """Chart listener: put a newly saved chart on its bed."""
+        with self._lock:
+            self._sync()
+            bed = _bed_key(chart.get('bed_number'))
+            if bed is None:
+                return
+            current = self._beds.get(bed)
+            if event == 'inserted':
+                if current is None or datetime_sort_key(chart) >= datetime_sort_key(current):
+                    self._beds[bed] = _board_entry(chart)
+            elif event == 'printed' and current and current.get('uuid') == chart.get('uuid'):
+                current['print_time'] = chart.get('print_time')
+
+    def current(self, bed_number):
+        """Board entry of the most recent chart on this bed, or None."""
+        with self._lock:
+            self._sync()
+            entry = self._beds.get(_bed_key(bed_number))
+            return dict(entry) if entry else None
+
+    def overview(self):
+        """
+        Every ward bed with its current chart.
+
+        Returns:
+            list: {"bed": str, "chart": board entry or None}, beds 1..bed_count
+            first, followed by any other bed numbers that have charts
+        """
+        with self._lock:
+            self._sync()
+            ward_beds = [str(n) for n in range(1, self.bed_count + 1)]
+            extra_beds = sorted(bed for bed in self._beds if bed not in ward_beds)
+            return [{'bed': bed, 'chart': dict(self._beds[bed]) if bed in self._beds else None}
+                    for bed in ward_beds + extra_beds]
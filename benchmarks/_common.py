@@ -0,0 +1,104 @@
+"""
+Helpers shared by the benchmark scripts: scratch copies of the app, a
+seeded chart database and latency statistics.
+"""
+import glob
+import os
+import shutil
+import socket
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_TITLES = ["Respiratory support", "Sedation, analgesia, and neuromuscular blockade",
+                "Inotropes and Anti-hypertensives", "Antimicrobials", "Other Medications"]
+ROW_HEADERS = ["Date", "Time", "Weight", "Length", "BSA", "TFR", "TFV", "IVM"]
+
+
+def make_chart(i):
+    """A typical stored chart; `i` varies the name, uhid, bed and time."""
+    when = datetime(2025, 1, 1) + timedelta(minutes=17 * i)
+    return {
+        "uuid": str(uuid.uuid4()),
+        "datetime": when.strftime('%d-%m-%Y %H:%M:%S'),
+        "date": when.strftime('%d-%m-%Y'),
+        "default_Bed_count": 16, "default_Sex_count": 3,
+        "default_Entries_count": 5, "default_table_rows_count": 5,
+        "each_sex_value_names": {"Sex_1_name": "Male", "Sex_2_name": "Female", "Sex_3_name": "Other"},
+        "Name": f"Patient {i}", "Age_year": str(i % 18), "Age_month": str(i % 12), "Sex": "Male",
+        "uhid": f"{100000000 + i}", "bed_number": str(i % 16 + 1),
+        "Diagnosis": "Pneumonia", "Consultants": "Dr. One", "JR": "Dr. Two", "SR": "Dr. Three",
+        "each_entry_layout": {
+            f"entry_{n + 1}": {"title": title, "subtitles": {
+                f"subtitle_{m + 1}": {"content": f"Drug {m}", "day": f"D{m}", "dose": "5mg", "volume": "1ml"}
+                for m in range(3)}}
+            for n, title in enumerate(ENTRY_TITLES)},
+        "each_table_row_layout": {
+            f"row_{n + 1}": {"row_header_name": name, "row_header_description": " "}
+            for n, name in enumerate(ROW_HEADERS)},
+    }
+
+
+def make_charts(count):
+    return (make_chart(i) for i in range(count))
+
+
+def write_database(path, charts):
+    """Write charts as a TinyDB database in one streaming pass; returns the count."""
+    sys.path.insert(0, REPO_ROOT)
+    from db_storage import atomic_write_tables
+    return len(atomic_write_tables(path, {"_default": ((str(n), chart) for n, chart in enumerate(charts, 1))}))
+
+
+def prepare_workdir(workdir, charts, repo=REPO_ROOT, modules=False):
+    """
+    Scratch copy of everything the app reads through relative paths.
+
+    Args:
+        charts (int): Charts to seed DATABASE/db.json with (make_chart)
+        repo (str): Checkout to copy from
+        modules (bool): Also copy the app's modules, for apps that must run
+            from the scratch copy (they write PDFs next to them)
+    """
+    if modules:
+        for module in glob.glob(os.path.join(repo, '*.py')):
+            shutil.copy2(module, workdir)
+    # Top-level files only; RESOURCES/TinyTeX is not read through it
+    resources = os.path.join(workdir, 'RESOURCES')
+    os.makedirs(resources)
+    for name in os.listdir(os.path.join(repo, 'RESOURCES')):
+        src = os.path.join(repo, 'RESOURCES', name)
+        if os.path.isfile(src):
+            shutil.copy2(src, resources)
+    for folder in ('templates', 'assets'):
+        if os.path.isdir(os.path.join(repo, folder)):
+            shutil.copytree(os.path.join(repo, folder), os.path.join(workdir, folder),
+                            ignore=shutil.ignore_patterns('dist'))
+    shutil.copy2(os.path.join(repo, 'settings.json'), workdir)
+    os.makedirs(os.path.join(workdir, 'DATABASE'))
+    write_database(os.path.join(workdir, 'DATABASE', 'db.json'), make_charts(charts))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_samples, fraction):
+    """Value at `fraction` (0.95 for p95) of an ascending list."""
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * fraction))]
+
+
+def summarize(samples):
+    """Summary statistics in milliseconds for a list of durations in seconds."""
+    samples = sorted(samples)
+    n = len(samples)
+    return {
+        'n': n,
+        'mean_ms': round(sum(samples) / n * 1000, 3),
+        'p50_ms': round(percentile(samples, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(samples, 0.95) * 1000, 3),
+    }
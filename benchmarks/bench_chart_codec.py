@@ -0,0 +1,48 @@
+"""
+Memory saved by the compact chart encoding used by the chart body cache.
+
+Usage (from the repository root):
+    python benchmarks/bench_chart_codec.py --charts 10000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import make_chart  # noqa: E402
+from chart_codec import ChartCodec, measure_savings  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--charts', type=int, default=10000)
+    args = parser.parse_args()
+
+    # Round-trip through JSON so strings are separate objects, as after a disk read
+    charts = [json.loads(json.dumps(make_chart(i))) for i in range(args.charts)]
+
+    codec = ChartCodec()
+    result = measure_savings(charts, codec)
+
+    started = time.perf_counter()
+    encoded = [codec.encode(chart) for chart in charts]
+    encode_s = time.perf_counter() - started
+    started = time.perf_counter()
+    decoded = [codec.decode(chart) for chart in encoded]
+    decode_s = time.perf_counter() - started
+    assert decoded == charts
+
+    result.update({
+        'interned_strings': len(codec),
+        'encode_us_per_chart': round(encode_s / len(charts) * 1e6, 1),
+        'decode_us_per_chart': round(decode_s / len(charts) * 1e6, 1),
+    })
+    print(json.dumps(result, indent=2))
+    return result
+
+
+if __name__ == '__main__':
+    main()
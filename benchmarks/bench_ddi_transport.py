@@ -0,0 +1,88 @@
+"""
+DOCX upload versus compact JSON medication list for DDI scans.
+
+For generated ward charts (the /ddi body the chart form posts) this
+measures, per transport:
+
+    encode_ms     building the request body (python-docx vs json.dumps)
+    payload_kb    request body size
+    round_trip_ms encode, POST to a local ddi_stub_server and parse the
+                  answer; includes the stub's own decoding work (reading
+                  the DOCX vs the JSON body)
+
+The pair cache is bypassed, so every chart is a full scan.
+
+Usage (from the repository root):
+    python benchmarks/bench_ddi_transport.py --charts 200
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import percentile  # noqa: E402
+from ddi_stub_server import serve_in_thread  # noqa: E402
+from ddiwindowmodified import docx_bytes, medication_list, post_chart, post_medications  # noqa: E402
+from generate_charts import ChartGenerator, form_payload  # noqa: E402
+
+
+def summarize_transport(encode_s, sizes, round_trip_s):
+    encode_s, sizes, round_trip_s = sorted(encode_s), sorted(sizes), sorted(round_trip_s)
+    return {
+        'encode_ms': {'p50': round(percentile(encode_s, 0.5) * 1000, 3),
+                      'p95': round(percentile(encode_s, 0.95) * 1000, 3)},
+        'payload_kb': {'p50': round(percentile(sizes, 0.5) / 1024, 2),
+                       'p95': round(percentile(sizes, 0.95) / 1024, 2)},
+        'round_trip_ms': {'p50': round(percentile(round_trip_s, 0.5) * 1000, 2),
+                          'p95': round(percentile(round_trip_s, 0.95) * 1000, 2)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--charts', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    charts = [form_payload(chart) for chart in ChartGenerator(seed=args.seed).charts(args.charts)]
+    server = serve_in_thread()
+    base_url = f"http://127.0.0.1:{server.port}"
+
+    transports = {
+        'docx': (lambda chart: docx_bytes(chart),
+                 lambda chart: post_chart(base_url + '/uploadfile/', chart)),
+        'json': (lambda chart: json.dumps({'medications': medication_list(chart)}, separators=(',', ':')).encode(),
+                 lambda chart: post_medications(base_url + '/interactions/', chart)),
+    }
+    results = {}
+    answers = {}
+    try:
+        for name, (encode, scan) in transports.items():
+            scan(charts[0])  # connect and load python-docx outside the timings
+            encode_s, sizes, round_trip_s, rows = [], [], [], []
+            for chart in charts:
+                started = time.perf_counter()
+                body = encode(chart)
+                encode_s.append(time.perf_counter() - started)
+                sizes.append(len(body))
+                started = time.perf_counter()
+                rows.append(scan(chart))
+                round_trip_s.append(time.perf_counter() - started)
+            results[name] = summarize_transport(encode_s, sizes, round_trip_s)
+            answers[name] = rows
+    finally:
+        server.shutdown()
+
+    results['same_interactions'] = answers['docx'] == answers['json']
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == '__main__':
+    main()
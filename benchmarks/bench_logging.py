@@ -0,0 +1,131 @@
+"""
+Request latency with print-heavy vs. leveled, queued logging.
+
+Runs the app in a fresh interpreter with stdout and stderr going to a pipe
+that the parent drains slowly, like a busy terminal or container log
+driver. It times /download, /get_entry and /search through Flask's test
+client. pdflatex is replaced by a stub that writes a small PDF and prints a
+pdflatex-sized log, so the numbers measure logging, not TeX.
+
+To compare against an older checkout:
+    git worktree add /tmp/before <commit>
+    python benchmarks/bench_logging.py --repo /tmp/before
+    python benchmarks/bench_logging.py
+
+Usage (from the repository root):
+    python benchmarks/bench_logging.py --charts 200 --requests 100 --drain-mb-per-s 2
+
+With thousands of charts /download is dominated by the database write and
+the logging difference disappears in the noise.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _common import REPO_ROOT, make_chart, prepare_workdir, summarize  # noqa: E402
+
+CHILD = r'''
+import json, os, sys, time
+import pdf_generator
+
+PDFLATEX_LOG = "This is pdfTeX, Version 3.141592653 (TeX Live 2023)\n" * 600
+
+
+class _Result:
+    returncode, stdout, stderr = 0, PDFLATEX_LOG, ''
+
+
+def fake_pdflatex(cmd, cwd=None, **kwargs):
+    jobname = cmd[cmd.index('-jobname') + 1]
+    with open(os.path.join(cwd, jobname + '.pdf'), 'wb') as f:
+        f.write(b'%PDF-1.4\n' + os.urandom(20000))
+    return _Result()
+
+
+pdf_generator.subprocess.run = fake_pdflatex
+pdf_generator.os.path.exists = (lambda exists: lambda p: True if p.endswith('pdflatex') else exists(p))(os.path.exists)
+
+import main
+client = main.app.test_client()
+payload = json.loads({payload!r})
+uuids = [row[3] for row in main.return_database_with_history()[:50]]
+timings = {{'download': [], 'get_entry': [], 'search': []}}
+for i in range({requests}):
+    body = dict(payload, Name=f"{{payload['Name']}} {{i}}", uuid=f"bench-{{i}}")
+    for route, call in (('download', lambda: client.post('/download', json=body)),
+                        ('get_entry', lambda: client.get(f'/get_entry/{{uuids[i % len(uuids)]}}')),
+                        ('search', lambda: client.post('/search', json={{'name': 'patient 1'}}))):
+        started = time.perf_counter()
+        call()
+        timings[route].append(time.perf_counter() - started)
+with open({result_path!r}, 'w') as f:
+    json.dump(timings, f)
+'''
+
+
+def run(workdir, log_level, requests_count, drain_bytes_per_s):
+    payload = make_chart(0)
+    payload['entries'] = payload.pop('each_entry_layout')
+    payload['parameters'] = payload.pop('each_table_row_layout')
+    result_path = os.path.join(workdir, f'result-{log_level}.json')
+    code = CHILD.format(payload=json.dumps(payload), requests=requests_count, result_path=result_path)
+    env = dict(os.environ, PYTHONPATH=workdir, LOG_LEVEL=log_level)
+    proc = subprocess.Popen([sys.executable, '-c', code], cwd=workdir, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+    drained = [0]
+
+    def drain():
+        # A slow reader: the pipe fills up and writes in the app block
+        while True:
+            chunk = proc.stdout.read(4096)
+            if not chunk:
+                break
+            drained[0] += len(chunk)
+            time.sleep(len(chunk) / drain_bytes_per_s)
+
+    reader = threading.Thread(target=drain)
+    reader.start()
+    proc.wait()
+    reader.join()
+    if proc.returncode != 0:
+        raise RuntimeError(f'benchmark child failed with exit code {proc.returncode}')
+    with open(result_path) as f:
+        timings = json.load(f)
+    return {route: summarize(samples) for route, samples in timings.items()}, drained[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repo', default=REPO_ROOT, help='checkout to benchmark (default: this one)')
+    parser.add_argument('--charts', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--drain-mb-per-s', type=float, default=2.0,
+                        help='how fast the log consumer reads (default: 2 MB/s)')
+    parser.add_argument('--levels', nargs='+', default=['INFO', 'DEBUG'])
+    args = parser.parse_args()
+
+    results = []
+    for level in args.levels:
+        with tempfile.TemporaryDirectory() as workdir:
+            # The app writes PDFs next to its modules, so run a copy of them
+            prepare_workdir(workdir, args.charts, repo=os.path.abspath(args.repo), modules=True)
+            summary, log_bytes = run(workdir, level, args.requests,
+                                     args.drain_mb_per_s * 1024 * 1024)
+        for route, stats in summary.items():
+            results.append(dict(stats, route=route, log_level=level))
+            print(f"{level:<6} {route:<10} mean {stats['mean_ms']:>8} ms  p50 {stats['p50_ms']:>8} ms  "
+                  f"p95 {stats['p95_ms']:>8} ms")
+        print(f"{level:<6} log output {log_bytes / 1024 / 1024:.1f} MB")
+    print(json.dumps(results))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Requests/second of the development server vs. the production server.
+
+Starts `python main.py`'s Werkzeug server and gunicorn (gunicorn.conf.py)
+against the same seeded database in a scratch directory and drives
+/get_entries and /download with concurrent keep-alive clients.
+
+Usage (from the repository root):
+    python benchmarks/bench_serving.py --charts 2000 --clients 16 --seconds 10
+
+/download includes the pdflatex compile; without pdflatex installed it
+measures the request path up to the failed compile.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _common import REPO_ROOT, free_port, make_chart, percentile, prepare_workdir  # noqa: E402
+
+
+def start_server(kind, workdir, port, workers, threads):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, FLASK_HOST='127.0.0.1', FLASK_PORT=str(port),
+               WEB_WORKERS=str(workers), WEB_THREADS=str(threads))
+    if kind == 'werkzeug':
+        cmd = [sys.executable, '-c', f"from main import app; app.run(host='127.0.0.1', port={port}, debug=False)"]
+    else:
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(REPO_ROOT, 'gunicorn.conf.py'),
+               'wsgi:app']
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/get_entries', timeout=5)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f'{kind} server did not come up on port {port}')
+
+
+def drive(url, method, payload, clients, seconds):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def client():
+        session = requests.Session()
+        local = []
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                session.request(method, url, json=payload, timeout=60).content
+                local.append(time.perf_counter() - started)
+            except requests.RequestException:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / seconds, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--charts', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    payload = make_chart(0)
+    payload['entries'] = payload.pop('each_entry_layout')
+    payload['parameters'] = payload.pop('each_table_row_layout')
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(workdir, args.charts)
+        for kind in ('werkzeug', 'gunicorn'):
+            port = free_port()
+            proc = start_server(kind, workdir, port, args.workers, args.threads)
+            try:
+                for route, method, body in (('/get_entries', 'GET', None), ('/download', 'POST', payload)):
+                    result = drive(f'http://127.0.0.1:{port}{route}', method, body, args.clients, args.seconds)
+                    result.update({'server': kind, 'route': route})
+                    results.append(result)
+                    print(f"{kind:<9} {route:<13} {result['rps']:>8} req/s  p50 {result['p50_ms']} ms  "
+                          f"p95 {result['p95_ms']} ms  errors {result['errors']}")
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+    print(json.dumps(results))
+    return results
+
+
+if __name__ == '__main__':
+    main()
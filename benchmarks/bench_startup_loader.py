@@ -0,0 +1,69 @@
+"""
+Startup time and peak memory of loading the chart database.
+
+Compares the old import-time path (TinyDB + db.all()) with the streaming
+ChartIndex at several database sizes. Each measurement runs in a fresh
+interpreter so peak RSS is not polluted by earlier runs.
+
+Usage (from the repository root):
+    python benchmarks/bench_startup_loader.py --sizes 10000 100000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _common import REPO_ROOT, make_charts, write_database  # noqa: E402
+
+CHILD = r'''
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+if {mode!r} == 'tinydb':
+    from tinydb import TinyDB
+    records = len(TinyDB({path!r}).all())
+else:
+    from chart_index import ChartIndex
+    records = len(ChartIndex({path!r}).load())
+elapsed = time.perf_counter() - started
+try:
+    # ru_maxrss survives exec on Linux and would include the parent's peak
+    with open('/proc/self/status') as f:
+        peak_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"records": records, "seconds": elapsed, "peak_rss_mb": peak_kb / 1024}}))
+'''
+
+
+def measure(mode, path):
+    code = CHILD.format(root=REPO_ROOT, mode=mode, path=path)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f'db_{size}.json')
+            write_database(path, make_charts(size))
+            file_mb = os.path.getsize(path) / (1024 * 1024)
+            for mode in ('tinydb', 'index'):
+                result = measure(mode, path)
+                result.update({'mode': mode, 'charts': size, 'file_mb': round(file_mb, 1)})
+                results.append(result)
+                print(f"{size:>8} charts ({file_mb:6.1f} MB)  {mode:<7} "
+                      f"{result['seconds']:7.3f} s  peak RSS {result['peak_rss_mb']:7.1f} MB")
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Startup time of the web process, with a budget for CI.
+
+Each run starts a fresh interpreter in a scratch copy of the app seeded
+with --charts charts and measures:
+
+    process_ms        interpreter start until `import main` returns
+    import_main_ms    `import main` alone (what the dev server waits for)
+    first_request_ms  the first /get_entries after import, which loads the
+                      chart index on first use
+    import_wsgi_ms    `import wsgi`, the gunicorn master's preload, which
+                      also loads the chart index and aggregates up front
+
+Medians over --repeat runs are reported. The command exits with status 1
+if import_main_ms exceeds --max-import-ms, or if any metric is more than
+--threshold (and --min-delta-ms) slower than in a --baseline file written
+earlier with --output:
+
+    python benchmarks/check_startup.py --output startup.json
+    python benchmarks/check_startup.py --baseline startup.json --threshold 0.2
+
+--importtime prints the slowest modules of one `import main`.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _common import REPO_ROOT, prepare_workdir  # noqa: E402
+from run_benchmarks import git_commit  # noqa: E402
+
+CHILD = r'''
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.app.test_client().get('/get_entries?page=1&per_page=1')
+served = time.perf_counter()
+print(json.dumps({"import_main_ms": (imported - started) * 1000, "first_request_ms": (served - imported) * 1000}))
+'''
+WSGI_CHILD = r'''
+import json, time
+started = time.perf_counter()
+import wsgi
+print(json.dumps({"import_wsgi_ms": (time.perf_counter() - started) * 1000}))
+'''
+METRICS = ('process_ms', 'import_main_ms', 'first_request_ms', 'import_wsgi_ms')
+
+
+def run_child(code, workdir):
+    env = dict(os.environ, PYTHONPATH=workdir, LOG_LEVEL='WARNING')
+    started = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', code], cwd=workdir, env=env, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    if out.returncode != 0:
+        raise RuntimeError(f'Startup run failed:\n{out.stderr[-3000:]}')
+    return elapsed, json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure(workdir, repeat):
+    samples = {name: [] for name in METRICS}
+    # One untimed run: builds assets/dist and the aggregates file, and warms
+    # the OS cache the way any restart after the first one would see it
+    run_child(CHILD, workdir)
+    for _ in range(repeat):
+        elapsed, result = run_child(CHILD, workdir)
+        samples['process_ms'].append(elapsed - result['first_request_ms'])
+        samples['import_main_ms'].append(result['import_main_ms'])
+        samples['first_request_ms'].append(result['first_request_ms'])
+        samples['import_wsgi_ms'].append(run_child(WSGI_CHILD, workdir)[1]['import_wsgi_ms'])
+    return {name: round(sorted(values)[len(values) // 2], 1) for name, values in samples.items()}
+
+
+def slowest_imports(workdir, count=15):
+    env = dict(os.environ, PYTHONPATH=workdir, LOG_LEVEL='WARNING')
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=workdir, env=env,
+                         capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--charts', type=int, default=10000, help='charts in the scratch database (default: 10000)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-import-ms', type=float, default=500,
+                        help='budget for import_main_ms (default: 500)')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.20, help='regression threshold (default: 0.20)')
+    parser.add_argument('--min-delta-ms', type=float, default=25,
+                        help='ignore slowdowns smaller than this (default: 25)')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--importtime', action='store_true', help='show the slowest imports')
+    parser.add_argument('--repo', default=REPO_ROOT, help='checkout to measure (default: this one)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(workdir, args.charts, repo=os.path.abspath(args.repo), modules=True)
+        results = measure(workdir, args.repeat)
+        imports = slowest_imports(workdir) if args.importtime else []
+
+    for name in METRICS:
+        print(f"{name:<18} {results[name]:>9.1f} ms")
+    if imports:
+        print(f"\n{'cumulative ms':>13} {'self ms':>8}  module")
+        for cumulative, own, module in imports:
+            print(f"{cumulative / 1000:>13.1f} {own / 1000:>8.1f}  {module}")
+
+    failures = []
+    if results['import_main_ms'] > args.max_import_ms:
+        failures.append(f"import_main_ms {results['import_main_ms']:.1f} ms > budget {args.max_import_ms:.0f} ms")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        for name in METRICS:
+            old, new = baseline.get(name), results[name]
+            if old and (new - old) / old > args.threshold and new - old > args.min_delta_ms:
+                failures.append(f"{name} {old:.1f} -> {new:.1f} ms (+{(new - old) / old:.0%})")
+    for failure in failures:
+        print(f"STARTUP REGRESSION: {failure}")
+
+    if args.output:
+        report = {'meta': {'commit': git_commit(args.repo), 'charts': args.charts, 'repeat': args.repeat},
+                  'results': results}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
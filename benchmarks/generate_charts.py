@@ -0,0 +1,237 @@
+"""
+Synthetic chart datasets for scale testing.
+
+Generates charts in the stored-chart schema (json_generator's current
+format plus print_time) by simulating a ward: every bed holds one patient
+at a time, each admission gets one chart per day for its whole stay under
+the same UHID, and medications are started and stopped from day to day,
+so the number of drugs per each_entry_layout category varies. A fraction
+of names, diagnoses and drug fields contain LaTeX special characters.
+The output is deterministic for a given --seed.
+
+Outputs:
+    db       A TinyDB database file, e.g. DATABASE/db.json, written in one
+             streaming pass (the format the app and ChartIndex read)
+    ndjson   One chart per line, to a file or '-' for stdout
+
+Usage (from the repository root):
+    python benchmarks/generate_charts.py 100000 --output /tmp/db.json
+    python benchmarks/generate_charts.py 1000000 --format ndjson --output charts.ndjson --beds 64
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _common import write_database  # noqa: E402
+
+WARD_DRUGS = {
+    'Respiratory support': ['O2 via NC', 'HFNC', 'CPAP', 'SIMV', 'Salbutamol nebulisation'],
+    'Sedation, analgesia, and neuromuscular blockade': ['Midazolam', 'Fentanyl', 'Morphine', 'Vecuronium',
+                                                        'Ketamine', 'Dexmedetomidine'],
+    'Inotropes and Anti-hypertensives': ['Adrenaline', 'Dopamine', 'Dobutamine', 'Milrinone', 'Noradrenaline'],
+    'Antimicrobials': ['Ceftriaxone', 'Vancomycin', 'Amikacin', 'Meropenem', 'Piperacillin-Tazobactam',
+                       'Fluconazole', 'Acyclovir'],
+    'Other Medications': ['Paracetamol', 'Ondansetron', 'Furosemide', 'Phenytoin', 'Levetiracetam',
+                          'Calcium Gluconate', 'Pantoprazole', 'Hydrocortisone'],
+}
+DOSES = ['0.1 mcg/kg/min', '0.5 mcg/kg/min', '1 mg/kg', '2 mg/kg', '5 mg/kg', '10 mg/kg', '15 mg/kg',
+         '50 mg/kg', '100 mg/kg', '2 L/min', '5 ml/kg/h']
+DIAGNOSES = ['Severe pneumonia', 'Septic shock', 'Dengue shock syndrome', 'Status epilepticus',
+             'Acute bronchiolitis', 'Diabetic ketoacidosis', 'Meningoencephalitis', 'Post-op TOF repair',
+             'Scrub typhus', 'Acute kidney injury']
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Anaya', 'Vihaan', 'Saanvi', 'Kabir', 'Myra', 'Reyansh',
+               'Aadhya', 'Arjun', 'Kiara', 'Sai', 'Pari', 'Vivaan', 'Navya']
+LAST_NAMES = ['Sharma', 'Verma', 'Singh', 'Kumar', 'Gupta', 'Reddy', 'Iyer', 'Das', 'Khan', 'Nair']
+DOCTORS = ['Dr. Mehta', 'Dr. Rao', 'Dr. Bose', 'Dr. Pillai', 'Dr. Joshi', 'Dr. Sen']
+ROW_HEADERS = ['Date', 'Time', 'Weight', 'Length', 'BSA', 'TFR', 'TFV', 'IVM']
+LATEX_SPECIALS = ['&', '%', '$', '#', '_', '{', '}', '~', '^', '\\']
+SEX_NAMES = {"Sex_1_name": "Male", "Sex_2_name": "Female", "Sex_3_name": "Other"}
+TABLE_ROW_LAYOUT = {f"row_{n + 1}": {"row_header_name": name, "row_header_description": " "}
+                    for n, name in enumerate(ROW_HEADERS)}
+
+
+class _Admission:
+    __slots__ = ('uhid', 'name', 'age_year', 'age_month', 'sex', 'diagnosis', 'consultant', 'jr', 'sr',
+                 'admitted', 'discharge', 'drugs')
+
+
+class ChartGenerator:
+    """
+    Simulated ward producing one chart per occupied bed per day.
+
+    Args:
+        seed (int): Random seed; the same seed gives the same charts
+        beds (int): Beds on the ward; the dataset spans count / beds days
+        max_stay (int): Longest admission in days
+        special_rate (float): Share of free-text fields given a LaTeX special
+        printed_rate (float): Share of charts with a print_time
+        start (datetime): First ward day
+    """
+
+    def __init__(self, seed=0, beds=16, max_stay=14, special_rate=0.05, printed_rate=0.8,
+                 start=datetime(2024, 1, 1)):
+        self.rng = random.Random(seed)
+        self.beds = beds
+        self.max_stay = max_stay
+        self.special_rate = special_rate
+        self.printed_rate = printed_rate
+        self.start = start
+        self._next_uhid = 100000000 + self.rng.randrange(10 ** 6)
+
+    def _text(self, text):
+        """`text`, with a LaTeX special character inserted now and then."""
+        if self.rng.random() >= self.special_rate:
+            return text
+        at = self.rng.randrange(len(text) + 1)
+        return text[:at] + self.rng.choice(LATEX_SPECIALS) + text[at:]
+
+    def _admit(self, day):
+        rng = self.rng
+        admission = _Admission()
+        self._next_uhid += rng.randint(1, 50)
+        admission.uhid = str(self._next_uhid)
+        admission.name = self._text(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}")
+        admission.age_year = str(rng.randint(0, 17))
+        admission.age_month = str(rng.randint(0, 11))
+        admission.sex = rng.choice(('Male', 'Female', 'Male', 'Female', 'Other'))
+        admission.diagnosis = self._text(rng.choice(DIAGNOSES))
+        admission.consultant, admission.jr, admission.sr = (rng.choice(DOCTORS) for _ in range(3))
+        admission.admitted = day
+        admission.discharge = day + rng.randint(1, self.max_stay)
+        # title -> {drug: (day started, content, dose, volume)}
+        admission.drugs = {title: {} for title in WARD_DRUGS}
+        for title in WARD_DRUGS:
+            for _ in range(rng.randint(0, 3)):
+                self._start_drug(admission, title, day)
+        return admission
+
+    def _start_drug(self, admission, title, day):
+        drug = self.rng.choice(WARD_DRUGS[title])
+        if drug not in admission.drugs[title]:
+            admission.drugs[title][drug] = (day, self._text(drug), self._text(self.rng.choice(DOSES)),
+                                            f"{self.rng.randint(1, 50)} ml")
+
+    def _next_day(self, admission, day):
+        rng = self.rng
+        for title, drugs in admission.drugs.items():
+            if drugs and rng.random() < 0.15:
+                del drugs[rng.choice(list(drugs))]
+            if rng.random() < 0.2:
+                self._start_drug(admission, title, day)
+
+    def _chart(self, admission, bed, day):
+        rng = self.rng
+        when = self.start + timedelta(days=day, minutes=rng.randint(7 * 60, 12 * 60), seconds=rng.randrange(60))
+        entries = {}
+        for n, (title, drugs) in enumerate(admission.drugs.items()):
+            entries[f"entry_{n + 1}"] = {"title": title, "subtitles": {
+                f"subtitle_{m + 1}": {"content": content, "day": f"D{day - started + 1}",
+                                      "dose": dose, "volume": volume}
+                for m, (started, content, dose, volume) in enumerate(drugs.values())}}
+        stamp = when.strftime('%d-%m-%Y %H:%M:%S')
+        chart = {
+            "uuid": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "datetime": stamp,
+            "date": stamp[:10],
+            "default_Bed_count": self.beds, "default_Sex_count": 3,
+            "default_Entries_count": len(WARD_DRUGS), "default_table_rows_count": len(ROW_HEADERS),
+            "each_sex_value_names": SEX_NAMES,
+            "Name": admission.name, "Age_year": admission.age_year, "Age_month": admission.age_month,
+            "Sex": admission.sex, "uhid": admission.uhid, "bed_number": str(bed),
+            "Diagnosis": admission.diagnosis, "Consultants": admission.consultant,
+            "JR": admission.jr, "SR": admission.sr,
+            "each_entry_layout": entries,
+            "each_table_row_layout": TABLE_ROW_LAYOUT,
+        }
+        if rng.random() < self.printed_rate:
+            chart["print_time"] = (when + timedelta(minutes=rng.randint(1, 90))).strftime('%d-%m-%Y %H:%M:%S')
+        return chart
+
+    def charts(self, count):
+        """
+        Yield `count` charts in ward order (by day, then bed).
+
+        The dicts for sex names and table rows are shared between charts;
+        copy a chart before mutating those.
+        """
+        ward = [None] * self.beds
+        day = 0
+        produced = 0
+        while True:
+            for bed in range(1, self.beds + 1):
+                if produced >= count:
+                    return
+                admission = ward[bed - 1]
+                if admission is None or day >= admission.discharge:
+                    admission = ward[bed - 1] = self._admit(day)
+                elif day > admission.admitted:
+                    self._next_day(admission, day)
+                yield self._chart(admission, bed, day)
+                produced += 1
+            day += 1
+
+
+FORM_FIELDS = ('Name', 'Age_year', 'Age_month', 'Sex', 'uhid', 'uuid', 'bed_number', 'Diagnosis',
+               'Consultants', 'JR', 'SR')
+
+
+def form_payload(chart):
+    """The body the chart form posts to /download and /ddi for a stored chart."""
+    payload = {field: chart.get(field, '') for field in FORM_FIELDS}
+    payload['parameters'] = chart.get('each_table_row_layout', {})
+    payload['entries'] = chart.get('each_entry_layout', {})
+    return payload
+
+
+def write_ndjson(path, charts):
+    """Write one chart per line to `path` ('-' for stdout); returns the count."""
+    out = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8')
+    count = 0
+    try:
+        dumps = json.JSONEncoder(ensure_ascii=False).encode
+        for chart in charts:
+            out.write(dumps(chart))
+            out.write('\n')
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('count', type=int, help='Number of charts')
+    parser.add_argument('--format', choices=('db', 'ndjson'), default='db')
+    parser.add_argument('--output', required=True, help="Output file ('-' for stdout with ndjson)")
+    parser.add_argument('--force', action='store_true', help='Overwrite an existing output file')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--beds', type=int, default=16)
+    parser.add_argument('--max-stay', type=int, default=14, help='Longest admission in days')
+    parser.add_argument('--special-rate', type=float, default=0.05,
+                        help='Share of free-text fields with a LaTeX special character')
+    args = parser.parse_args()
+
+    if args.output != '-' and os.path.exists(args.output) and not args.force:
+        raise SystemExit(f'{args.output} exists; pass --force to overwrite it')
+    if args.format == 'db' and args.output == '-':
+        raise SystemExit('--format db needs an output file')
+
+    started = time.perf_counter()
+    charts = ChartGenerator(seed=args.seed, beds=args.beds, max_stay=args.max_stay,
+                            special_rate=args.special_rate).charts(args.count)
+    write = write_database if args.format == 'db' else write_ndjson
+    written = write(args.output, charts)
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {written} charts to {args.output} in {elapsed:.1f} s ({written / elapsed:,.0f} charts/s)",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+"""
+Load test: how many nurses can one server support?
+
+Replays a weighted mix of ward traffic with concurrent keep-alive clients
+("users"), each waiting a random think time between requests:
+
+    index        GET  /
+    get_entries  GET  /get_entries?page=1&per_page=100
+    search       POST /search by name, UHID or date
+    get_entry    GET  /get_entry/<uuid> of a stored chart
+    download     POST /download: half reprints of stored charts, half new charts
+    ddi          POST /ddi with a chart's medications
+
+By default a scratch copy of the app is seeded with --charts charts and
+served by gunicorn (gunicorn.conf.py), with the DDI upstream pointed at a
+local ddi_stub_server.py. Without pdflatex installed, a stub that sleeps
+--pdflatex-ms and writes an empty PDF stands in for it. --url targets an
+instance that is already running instead; its DDI settings are left alone,
+and download only reprints its stored charts (which still updates their
+print_time) unless --allow-writes lets it save new charts as well.
+
+Prints throughput and p50/p95/p99 latency per route, and exits with
+status 1 if a latency budget or the error-rate budget is exceeded:
+
+    python benchmarks/load_test.py --users 20 --seconds 60
+    python benchmarks/load_test.py --mix download=0 ddi=0 --budget search:p99=300
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --output load.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _common import REPO_ROOT, free_port, percentile, prepare_workdir, write_database  # noqa: E402
+from generate_charts import ChartGenerator, form_payload  # noqa: E402
+
+ROUTES = ('index', 'get_entries', 'search', 'get_entry', 'download', 'ddi')
+DEFAULT_MIX = {'index': 5, 'get_entries': 20, 'search': 20, 'get_entry': 30, 'download': 15, 'ddi': 10}
+# Latency budgets in milliseconds
+DEFAULT_BUDGETS = {
+    'index': {'p95': 100},
+    'get_entries': {'p95': 250},
+    'search': {'p95': 250},
+    'get_entry': {'p95': 100},
+    'download': {'p95': 5000},
+    'ddi': {'p95': 2500},
+}
+PERCENTILES = ('p50', 'p95', 'p99')
+
+FAKE_PDFLATEX = ('#!/bin/sh\n# Stand-in for pdflatex: args are -jobname <name> ...\n'
+                 'sleep {seconds}\nprintf "%%PDF-1.4\\n" > "$2.pdf"\n')
+
+
+def seed_workdir(workdir, charts, ddi_port, pdflatex_ms):
+    """Scratch copy of the app with `charts` stored charts; returns them and the env."""
+    prepare_workdir(workdir, 0, modules=True)
+    shutil.copy2(os.path.join(REPO_ROOT, 'gunicorn.conf.py'), workdir)
+
+    seeded = list(ChartGenerator(seed=1).charts(charts))
+    write_database(os.path.join(workdir, 'DATABASE', 'db.json'), seeded)
+
+    settings_path = os.path.join(workdir, 'settings.json')
+    with open(settings_path) as f:
+        settings = json.load(f)
+    settings['ip_settings'] = {'host': '127.0.0.1', 'port': ddi_port}
+    with open(settings_path, 'w') as f:
+        json.dump(settings, f, indent=2)
+
+    env = dict(os.environ, PYTHONPATH=workdir, LOG_LEVEL='WARNING')
+    from pdf_generator import find_pdflatex
+    simulated = not os.path.exists(find_pdflatex())
+    if simulated:
+        fake = os.path.join(workdir, 'fake_pdflatex')
+        with open(fake, 'w') as f:
+            f.write(FAKE_PDFLATEX.format(seconds=pdflatex_ms / 1000))
+        os.chmod(fake, 0o755)
+        env['PDFLATEX'] = fake
+    return seeded, env, simulated
+
+
+def start_processes(workdir, env, server, port, ddi_port, workers, threads, ddi_latency_ms=0):
+    env = dict(env, FLASK_HOST='127.0.0.1', FLASK_PORT=str(port),
+               WEB_WORKERS=str(workers), WEB_THREADS=str(threads))
+    procs = [subprocess.Popen([sys.executable, 'ddi_stub_server.py', '--port', str(ddi_port),
+                               '--latency-ms', str(ddi_latency_ms)],
+                              cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)]
+    if server == 'werkzeug':
+        cmd = [sys.executable, '-c', "import main; main.warmup.start(); "
+               f"main.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    else:
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    procs.append(subprocess.Popen(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            # The dev server answers 503 until its warmup has finished
+            if requests.get(f'http://127.0.0.1:{port}/ready', timeout=5).ok:
+                return procs
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    stop_processes(procs)
+    raise RuntimeError(f'{server} server did not come up on port {port}')
+
+
+def stop_processes(procs):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def discover(base_url, sample=200):
+    """Charts of a running instance: history rows and a sample of chart bodies."""
+    rows = requests.get(f'{base_url}/get_entries', timeout=60).json()
+    charts = []
+    for row in random.Random(1).sample(rows, min(sample, len(rows))):
+        response = requests.get(f'{base_url}/get_entry/{row[3]}', timeout=30)
+        if response.ok:
+            charts.append(response.json())
+    return rows, charts
+
+
+class Workload:
+    """Builds the request for each route from the charts on the server."""
+
+    def __init__(self, rows, charts, new_charts=True):
+        # rows: history rows [Name, datetime, uhid, uuid]; charts: full chart bodies;
+        # new_charts: False makes every download a reprint
+        self.rows = rows
+        self.charts = charts
+        self.new_charts = new_charts
+        # Charts nurses have not printed yet; shared by all users
+        self._fresh = ChartGenerator(seed=2).charts(float('inf'))
+        self._fresh_lock = threading.Lock()
+
+    def request(self, route, rng):
+        """Return (method, path, json body or None)."""
+        if route == 'index':
+            return 'GET', '/', None
+        if route == 'get_entries':
+            return 'GET', f'/get_entries?page={rng.choice([1, 1, 1, 2])}&per_page=100', None
+        if route == 'search':
+            name, when, uhid, _ = rng.choice(self.rows)
+            field = rng.choice(['name', 'name', 'uhid', 'date'])
+            if field == 'name':
+                query = {'name': str(name).split()[0][:rng.randint(3, 6)]}
+            elif field == 'uhid':
+                query = {'uhid': str(uhid)[-rng.randint(4, 9):]}
+            else:
+                query = {'date': str(when)[:10]}
+            return 'POST', '/search', {'name': '', 'date': '', 'uhid': '', **query}
+        if route == 'get_entry':
+            return 'GET', f'/get_entry/{rng.choice(self.rows)[3]}', None
+        if route == 'download':
+            if not self.new_charts or rng.random() < 0.5:
+                return 'POST', '/download', form_payload(rng.choice(self.charts))
+            return 'POST', '/download', form_payload(self._new_chart())
+        if route == 'ddi':
+            return 'POST', '/ddi', form_payload(rng.choice(self.charts))
+        raise ValueError(f'Unknown route {route}')
+
+    def _new_chart(self):
+        with self._fresh_lock:
+            chart = next(self._fresh)
+        return dict(chart, uuid=str(uuid.uuid4()))
+
+
+def run_load(base_url, workload, mix, users, seconds, warmup, think_ms, timeout):
+    """
+    Drive the server with `users` concurrent clients.
+
+    Returns:
+        dict: route -> {'latencies': [seconds], 'errors': int}, measured
+        after the warm-up
+    """
+    routes = [route for route in ROUTES if mix.get(route, 0) > 0]
+    weights = [mix[route] for route in routes]
+    results = {route: {'latencies': [], 'errors': 0} for route in routes}
+    lock = threading.Lock()
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + seconds
+
+    def user(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while True:
+            route = rng.choices(routes, weights)[0]
+            method, path, body = workload.request(route, rng)
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                return
+            try:
+                response = session.request(method, base_url + path, json=body, timeout=timeout)
+                failed = response.status_code >= 400
+            except requests.RequestException:
+                failed = True
+            elapsed = time.perf_counter() - sent
+            if sent >= measure_from:
+                with lock:
+                    results[route]['latencies'].append(elapsed)
+                    results[route]['errors'] += failed
+            if think_ms:
+                time.sleep(rng.expovariate(1000 / think_ms))
+
+    threads = [threading.Thread(target=user, args=(n,), daemon=True) for n in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def summarize_routes(results, seconds):
+    summary = {}
+    for route, result in results.items():
+        samples = sorted(result['latencies'])
+        if not samples:
+            summary[route] = {'requests': 0, 'errors': 0, 'rps': 0.0}
+            continue
+        summary[route] = {
+            'requests': len(samples),
+            'errors': result['errors'],
+            'rps': round(len(samples) / seconds, 2),
+            **{name: round(percentile(samples, float(name[1:]) / 100) * 1000, 1) for name in PERCENTILES},
+            'max': round(samples[-1] * 1000, 1),
+        }
+    return summary
+
+
+def parse_mix(values):
+    mix = dict(DEFAULT_MIX)
+    for value in values or ():
+        route, _, weight = value.partition('=')
+        if route not in ROUTES or not weight:
+            raise SystemExit(f'--mix expects route=weight with route in {", ".join(ROUTES)}, got {value!r}')
+        mix[route] = float(weight)
+    return mix
+
+
+def parse_budgets(values):
+    budgets = {route: dict(budget) for route, budget in DEFAULT_BUDGETS.items()}
+    for value in values or ():
+        try:
+            route, rest = value.split(':', 1)
+            name, ms = rest.split('=', 1)
+            if route not in ROUTES or name not in PERCENTILES:
+                raise ValueError
+            budgets[route][name] = float(ms)
+        except ValueError:
+            raise SystemExit(f'--budget expects route:pNN=ms (pNN in {", ".join(PERCENTILES)}), got {value!r}')
+    return budgets
+
+
+def check_budgets(summary, budgets, max_error_rate):
+    """List of budget violations, empty if all budgets were met."""
+    violations = []
+    for route, stats in summary.items():
+        if not stats['requests']:
+            continue
+        for name, limit in budgets.get(route, {}).items():
+            if stats[name] > limit:
+                violations.append(f'{route} {name} {stats[name]:.1f} ms > {limit:.0f} ms')
+        error_rate = stats['errors'] / stats['requests']
+        if error_rate > max_error_rate:
+            violations.append(f'{route} error rate {error_rate:.1%} > {max_error_rate:.1%}')
+    return violations
+
+
+def print_report(summary, seconds, budgets):
+    print(f"{'route':<12} {'requests':>8} {'errors':>7} {'req/s':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  budget")
+    for route, stats in summary.items():
+        if not stats['requests']:
+            print(f"{route:<12} {0:>8}")
+            continue
+        budget = ', '.join(f'{name}<={limit:.0f}' for name, limit in budgets.get(route, {}).items())
+        print(f"{route:<12} {stats['requests']:>8} {stats['errors']:>7} {stats['rps']:>7.1f} "
+              f"{stats['p50']:>8.1f} {stats['p95']:>8.1f} {stats['p99']:>8.1f} {stats['max']:>8.1f}  {budget}")
+    total = sum(stats['requests'] for stats in summary.values())
+    print(f"{'total':<12} {total:>8} {sum(s['errors'] for s in summary.values()):>7} {total / seconds:>7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Base URL of a running instance (default: start one)')
+    parser.add_argument('--allow-writes', action='store_true',
+                        help='With --url, let download save new charts instead of only reprinting')
+    parser.add_argument('--server', choices=('gunicorn', 'werkzeug'), default='gunicorn')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--charts', type=int, default=2000, help='Charts to seed the scratch database with')
+    parser.add_argument('--pdflatex-ms', type=float, default=1500,
+                        help='Compile time of the pdflatex stand-in (only without pdflatex)')
+    parser.add_argument('--ddi-latency-ms', type=float, default=0,
+                        help='Latency of the local DDI stand-in, e.g. to mimic a remote server')
+    parser.add_argument('--users', type=int, default=10, help='Concurrent clients')
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5, help='Seconds of load before measuring')
+    parser.add_argument('--think-ms', type=float, default=500, help='Mean pause between a user\'s requests')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    parser.add_argument('--mix', nargs='*', metavar='ROUTE=WEIGHT', help=f'Override weights of {DEFAULT_MIX}')
+    parser.add_argument('--budget', action='append', metavar='ROUTE:PNN=MS',
+                        help='Override a latency budget, e.g. search:p95=200 (repeatable)')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--output', help='Write the results as JSON')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    budgets = parse_budgets(args.budget)
+    meta = {'date': datetime.now().isoformat(timespec='seconds'), 'users': args.users,
+            'seconds': args.seconds, 'think_ms': args.think_ms, 'mix': mix}
+
+    procs, workdir = [], None
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+            rows, charts = discover(base_url)
+            meta.update({'url': base_url, 'simulated_pdflatex': None, 'allow_writes': args.allow_writes})
+        else:
+            workdir = tempfile.mkdtemp(prefix='load_test_')
+            port, ddi_port = free_port(), free_port()
+            seeded, env, simulated = seed_workdir(workdir, args.charts, ddi_port, args.pdflatex_ms)
+            procs = start_processes(workdir, env, args.server, port, ddi_port, args.workers, args.threads,
+                                    args.ddi_latency_ms)
+            base_url = f'http://127.0.0.1:{port}'
+            rows = [[c['Name'], c['datetime'], c['uhid'], c['uuid']] for c in seeded]
+            charts = seeded
+            meta.update({'server': args.server, 'workers': args.workers, 'threads': args.threads,
+                         'charts': args.charts, 'simulated_pdflatex': simulated,
+                         'ddi_latency_ms': args.ddi_latency_ms})
+            if simulated:
+                print(f"pdflatex not found: simulating {args.pdflatex_ms:.0f} ms compiles")
+        if not rows or not charts:
+            raise SystemExit('The server has no charts to replay against; seed it first')
+
+        print(f"{args.users} users, {args.think_ms:.0f} ms think time, {args.seconds:.0f} s "
+              f"after {args.warmup:.0f} s warm-up against {base_url}")
+        workload = Workload(rows, charts, new_charts=not args.url or args.allow_writes)
+        results = run_load(base_url, workload, mix, args.users, args.seconds,
+                           args.warmup, args.think_ms, args.timeout)
+    finally:
+        stop_processes(procs)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = summarize_routes(results, args.seconds)
+    print_report(summary, args.seconds, budgets)
+    violations = check_budgets(summary, budgets, args.max_error_rate)
+    for violation in violations:
+        print(f"BUDGET EXCEEDED: {violation}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'budgets': budgets, 'routes': summary, 'violations': violations}, f, indent=2)
+    return 1 if violations else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Benchmark suite for chart generation, storage and search.
+
+Cases:
+    pdf          generate_picu_treatment_chart on small, typical and huge
+                 charts, split into LaTeX build time (everything before
+                 pdflatex) and compile time (the pdflatex run)
+    escape       escape_latex throughput
+    db           create_entry and return_database_with_query_is_uuid at
+                 1k, 10k and 100k stored charts
+    http         /search and /get_entries latency through the test client
+
+Every case runs in a fresh interpreter inside a scratch copy of the app,
+so module-level state (the chart index, TinyDB) is built for the database
+under test and nothing is written to the checkout. Without pdflatex
+installed, a stub that writes an empty PDF stands in and compile times are
+reported as null.
+
+Results are JSON (see --output) and can be compared between commits:
+
+    python benchmarks/run_benchmarks.py --output before.json
+    git checkout <other commit>
+    python benchmarks/run_benchmarks.py --output after.json
+    python benchmarks/run_benchmarks.py --compare before.json after.json
+
+--compare compares medians (throughput for escape_latex) and exits with
+status 1 if any metric regressed by more than --threshold (default 10%).
+Use the default --repeat or higher when comparing; a handful of runs is
+noisy.
+
+Usage (from the repository root):
+    python benchmarks/run_benchmarks.py --cases pdf escape --quick
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _common import REPO_ROOT, make_chart, prepare_workdir, summarize  # noqa: E402
+
+ALL_CASES = ('pdf', 'escape', 'db', 'http')
+DB_SIZES = (1000, 10000, 100000)
+FAKE_PDFLATEX = '#!/bin/sh\n# Stand-in for pdflatex: args are -jobname <name> ...\nprintf "%%PDF-1.4\\n" > "$2.pdf"\n'
+
+# Metrics where a larger value is better; everything else is a duration
+HIGHER_IS_BETTER = ('ops_per_s',)
+
+
+# --- Chart shapes -----------------------------------------------------------
+
+def sized_chart(size, i=0):
+    """A /download payload; size is 'small', 'typical' or 'huge'."""
+    chart = make_chart(i)
+    chart['entries'] = chart.pop('each_entry_layout')
+    chart['parameters'] = chart.pop('each_table_row_layout')
+    if size == 'small':
+        chart['entries'] = {'entry_1': {'title': 'Antimicrobials', 'subtitles': {
+            'subtitle_1': {'content': 'Ceftriaxone', 'day': 'D1', 'dose': '100mg/kg', 'volume': '10ml'}}}}
+        chart['parameters'] = dict(list(chart['parameters'].items())[:2])
+    elif size == 'huge':
+        chart['entries'] = {
+            f'entry_{n + 1}': {'title': f'Category {n + 1} & notes_{n}', 'subtitles': {
+                f'subtitle_{m + 1}': {'content': f'Drug {n}-{m} 50% in D5 #{m}', 'day': f'D{m}',
+                                      'dose': f'{m + 1}mg/kg q{m % 12 + 1}h', 'volume': f'{m}ml'}
+                for m in range(40)}}
+            for n in range(8)}
+        chart['parameters'] = {f'row_{n + 1}': {'row_header_name': f'Param {n}',
+                                                'row_header_description': f'{n * 1.5} units ~ {n}%'}
+                               for n in range(30)}
+    return chart
+
+
+# --- Cases (run inside the scratch copy) ------------------------------------
+
+def case_pdf(args):
+    import pdf_generator
+    try:
+        from tracing import finish_trace, start_trace
+    except ImportError:  # checkouts from before Server-Timing spans
+        finish_trace = start_trace = None
+
+    real_pdflatex = hasattr(pdf_generator, 'find_pdflatex') and os.path.exists(pdf_generator.find_pdflatex())
+    if not real_pdflatex:
+        if not hasattr(pdf_generator, 'find_pdflatex'):
+            return [{'benchmark': 'pdf', 'metric': 'build_ms', 'mean_ms': None,
+                     'note': 'pdflatex not installed and this checkout cannot be stubbed'}]
+        fake = os.path.abspath('fake_pdflatex')
+        with open(fake, 'w') as f:
+            f.write(FAKE_PDFLATEX)
+        os.chmod(fake, 0o755)
+        pdf_generator.find_pdflatex = lambda: fake
+
+    results = []
+    for size in ('small', 'typical', 'huge'):
+        chart = sized_chart(size)
+        build, compile_, total = [], [], []
+        # One untimed run first: the logo copy and imports happen only once
+        pdf_generator.generate_picu_treatment_chart('PICU TREATMENT CHART', 'MB 5 PCIU', chart, 8)
+        for _ in range(args.repeat):
+            if start_trace:
+                start_trace()
+            started = time.perf_counter()
+            path = pdf_generator.generate_picu_treatment_chart('PICU TREATMENT CHART', 'MB 5 PCIU', chart, 8)
+            elapsed = time.perf_counter() - started
+            spans = finish_trace()[0] if finish_trace else []
+            if not path:
+                raise RuntimeError(f'PDF generation failed for the {size} chart')
+            pdflatex = sum(d for name, _, d in spans if name == 'pdflatex')
+            build.append(elapsed - pdflatex)
+            compile_.append(pdflatex)
+            total.append(elapsed)
+        results.append(dict(summarize(build), benchmark=f'pdf.{size}', metric='build_ms'))
+        if real_pdflatex:
+            if finish_trace:
+                results.append(dict(summarize(compile_), benchmark=f'pdf.{size}', metric='compile_ms'))
+            results.append(dict(summarize(total), benchmark=f'pdf.{size}', metric='total_ms'))
+        else:
+            results.append({'benchmark': f'pdf.{size}', 'metric': 'compile_ms', 'mean_ms': None,
+                            'note': 'pdflatex not installed, stubbed'})
+    return results
+
+
+def case_escape(args):
+    from pdf_generator import escape_latex
+
+    rng = random.Random(0)
+    alphabet = string.ascii_letters + string.digits + ' ' * 10 + '&%$#_{}~^\\<>'
+    corpus = [''.join(rng.choice(alphabet) for _ in range(rng.randint(5, 80))) for _ in range(10000)]
+    rounds = max(1, args.repeat // 2)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in corpus:
+            escape_latex(text)
+    elapsed = time.perf_counter() - started
+    calls = len(corpus) * rounds
+    return [{'benchmark': 'escape_latex', 'metric': 'ops_per_s', 'n': calls,
+             'value': round(calls / elapsed, 1)}]
+
+
+def case_db(args):
+    import database_handler
+
+    size = len(database_handler.db)
+    uuids = [row[3] for row in database_handler.return_database_with_history()]
+    rng = random.Random(0)
+
+    inserts = []
+    count = args.inserts if size < 100000 else max(3, args.inserts // 4)
+    for i in range(count):
+        chart = make_chart(size + i)
+        started = time.perf_counter()
+        if not database_handler.create_entry(chart):
+            raise RuntimeError('create_entry failed')
+        inserts.append(time.perf_counter() - started)
+
+    cold, warm = [], []
+    for param_uuid in rng.sample(uuids, min(200, len(uuids))):
+        for samples in (cold, warm):  # the second lookup hits the chart body cache
+            started = time.perf_counter()
+            if database_handler.return_database_with_query_is_uuid(param_uuid=param_uuid) is None:
+                raise RuntimeError(f'chart {param_uuid} not found')
+            samples.append(time.perf_counter() - started)
+
+    name = f'db.{size // 1000}k'
+    return [dict(summarize(inserts), benchmark=name, metric='create_entry_ms'),
+            dict(summarize(cold), benchmark=name, metric='get_by_uuid_cold_ms'),
+            dict(summarize(warm), benchmark=name, metric='get_by_uuid_warm_ms')]
+
+
+def case_http(args):
+    import logging
+    import main
+    logging.getLogger().setLevel(logging.WARNING)
+
+    client = main.app.test_client()
+    size = len(main.return_database_with_history())
+    timings = {'search_name': [], 'search_uhid': [], 'get_entries_page': [], 'get_entries_all': []}
+    requests = (
+        ('search_name', lambda: client.post('/search', json={'name': 'patient 12'})),
+        ('search_uhid', lambda: client.post('/search', json={'uhid': '1000001'})),
+        ('get_entries_page', lambda: client.get('/get_entries?page=1&per_page=100')),
+        ('get_entries_all', lambda: client.get('/get_entries')),
+    )
+    for _ in range(args.repeat * 4):
+        for name, call in requests:
+            started = time.perf_counter()
+            response = call()
+            timings[name].append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f'{name} returned {response.status_code}')
+    return [dict(summarize(samples), benchmark=f'http.{size // 1000}k', metric=f'{name}_ms')
+            for name, samples in timings.items()]
+
+
+CASE_FUNCTIONS = {'pdf': case_pdf, 'escape': case_escape, 'db': case_db, 'http': case_http}
+
+
+# --- Orchestration ----------------------------------------------------------
+
+def run_case(case, repo, charts, args):
+    """Run one case in a fresh interpreter in a scratch copy of `repo`."""
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(workdir, charts, repo=repo, modules=True)
+        cmd = [sys.executable, os.path.abspath(__file__), '--child', case,
+               '--repeat', str(args.repeat), '--inserts', str(args.inserts)]
+        env = dict(os.environ, PYTHONPATH=workdir, LOG_LEVEL='WARNING')
+        out = subprocess.run(cmd, cwd=workdir, env=env, capture_output=True, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(f'{case} benchmark failed:\n{out.stderr[-3000:]}')
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def git_commit(repo):
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(args):
+    repo = os.path.abspath(args.repo)
+    sizes = args.sizes or ([1000] if args.quick else list(DB_SIZES))
+    results = []
+    for case in args.cases:
+        runs = [(case, size) for size in sizes] if case == 'db' else [(case, args.http_charts if case == 'http' else 10)]
+        for name, charts in runs:
+            started = time.perf_counter()
+            case_results = run_case(name, repo, charts, args)
+            print(f"{name:<7} charts={charts:<7} {time.perf_counter() - started:6.1f}s", file=sys.stderr)
+            for result in case_results:
+                value = result.get('value', result.get('mean_ms'))
+                print(f"    {result['benchmark']:<16} {result['metric']:<22} {value}", file=sys.stderr)
+            results.extend(case_results)
+    return {
+        'meta': {
+            'commit': git_commit(repo),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+
+def _key_values(report):
+    # Medians are compared; means are too sensitive to a single slow run
+    values = {}
+    for result in report['results']:
+        value = result.get('value', result.get('p50_ms'))
+        if value is not None:
+            values[(result['benchmark'], result['metric'])] = value
+    return values
+
+
+def compare(base_path, head_path, threshold):
+    """Print base vs. head per metric; return the number of regressions."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+    base_values, head_values = _key_values(base), _key_values(head)
+    print(f"base {base['meta'].get('commit')}  head {head['meta'].get('commit')}")
+    print(f"{'benchmark':<16} {'metric':<22} {'base':>12} {'head':>12} {'change':>8}")
+    regressions = 0
+    for key in sorted(set(base_values) & set(head_values)):
+        old, new = base_values[key], head_values[key]
+        change = (new - old) / old if old else 0.0
+        worse = -change if key[1] in HIGHER_IS_BETTER else change
+        flag = ''
+        if worse > threshold:
+            flag, regressions = '  REGRESSION', regressions + 1
+        elif worse < -threshold:
+            flag = '  improved'
+        print(f"{key[0]:<16} {key[1]:<22} {old:>12} {new:>12} {change:>+8.1%}{flag}")
+    for key in sorted(set(base_values) ^ set(head_values)):
+        print(f"{key[0]:<16} {key[1]:<22} only in {'base' if key in base_values else 'head'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='+', choices=ALL_CASES, default=list(ALL_CASES))
+    parser.add_argument('--sizes', nargs='+', type=int, help=f'database sizes for db (default: {DB_SIZES})')
+    parser.add_argument('--http-charts', type=int, default=10000, help='database size for http (default: 10000)')
+    parser.add_argument('--repeat', type=int, default=10, help='repetitions per measurement (default: 10)')
+    parser.add_argument('--inserts', type=int, default=20, help='create_entry calls per db size (default: 20)')
+    parser.add_argument('--quick', action='store_true', help='only the 1k database size')
+    parser.add_argument('--repo', default=REPO_ROOT, help='checkout to benchmark (default: this one)')
+    parser.add_argument('--output', help='write results JSON here (default: stdout)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'), help='compare two results files')
+    parser.add_argument('--threshold', type=float, default=0.10, help='regression threshold (default: 0.10)')
+    parser.add_argument('--child', choices=ALL_CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(CASE_FUNCTIONS[args.child](args)))
+        return
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    report = run_suite(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Compact in-memory encoding for cached charts.
+
+Charts repeat the same strings over and over: entry titles ("Respiratory
+support", ...), row headers (Date, Time, Weight, BSA, ...), the
+each_sex_value_names block, common drug names and every dict key. json.loads
+creates a new string object for each occurrence and a full dict per object.
+
+ChartCodec keeps one shared string table and one shape table:
+- dict keys, and string values of the fields in VOCABULARY_FIELDS and the
+  blocks in VOCABULARY_BLOCKS, up to `max_string_length` are replaced by
+  the table's canonical object, so each distinct value is stored once no
+  matter how many charts use it. One-off values (uuid, uhid, Name,
+  timestamps, row descriptions, ...) are left alone: the table never
+  evicts, and they would only fill it;
+- a dict is stored as a tuple `(shape, value1, value2, ...)`, where `shape`
+  is the interned tuple of its keys. Every subtitle dict in every chart
+  shares the same ('content', 'day', 'dose', 'volume') shape.
+Decoding rebuilds ordinary dicts, so callers never see the encoded form.
+"""
+import sys
+import threading
+
+
+# Fields whose values repeat from chart to chart: entry titles, subtitle
+# drugs and doses, row headers and the like. Per-patient free text
+# (row_header_description, Diagnosis, ...) does not belong here.
+VOCABULARY_FIELDS = frozenset({
+    'title', 'content', 'day', 'dose', 'volume',
+    'row_header_name',
+    'Sex', 'Consultants', 'JR', 'SR',
+})
+
+# Blocks whose every value is vocabulary, whatever their keys are called
+# (each_sex_value_names has one Sex_<n>_name key per configured sex)
+VOCABULARY_BLOCKS = frozenset({'each_sex_value_names'})
+
+
+class _Shape(tuple):
+    """Key tuple of an encoded dict; distinguishes encoded dicts from lists."""
+    __slots__ = ()
+
+
+class ChartCodec:
+    def __init__(self, max_string_length=64, max_strings=200000):
+        self.max_string_length = max_string_length
+        self.max_strings = max_strings
+        self._strings = {}
+        self._shapes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._strings)
+
+    def intern(self, s):
+        """Return the shared instance of `s` (or `s` itself if not interned)."""
+        if len(s) > self.max_string_length:
+            return s
+        shared = self._strings.get(s)
+        if shared is not None:
+            return shared
+        with self._lock:
+            if len(self._strings) >= self.max_strings:
+                # Table is full; free text past this point is not worth sharing
+                return s
+            return self._strings.setdefault(s, s)
+
+    def _shape(self, keys):
+        keys = tuple(self.intern(k) for k in keys)
+        shared = self._shapes.get(keys)
+        if shared is None:
+            with self._lock:
+                shared = self._shapes.setdefault(keys, _Shape(keys))
+        return shared
+
+    def encode(self, value, key=None):
+        """Encode a chart (or any JSON value) into its compact form."""
+        if isinstance(value, str):
+            return self.intern(value) if key in VOCABULARY_FIELDS or key in VOCABULARY_BLOCKS else value
+        if isinstance(value, dict):
+            if key in VOCABULARY_BLOCKS:
+                return (self._shape(value.keys()),) + tuple(self.encode(v, key) for v in value.values())
+            return (self._shape(value.keys()),) + tuple(self.encode(v, k) for k, v in value.items())
+        if isinstance(value, list):
+            return [self.encode(v, key) for v in value]
+        return value
+
+    def decode(self, value):
+        """Rebuild plain dicts and lists from an encoded value."""
+        if isinstance(value, tuple) and value and isinstance(value[0], _Shape):
+            return {key: self.decode(v) for key, v in zip(value[0], value[1:])}
+        if isinstance(value, list):
+            return [self.decode(v) for v in value]
+        return value
+
+
+def deep_sizeof(value, seen=None):
+    """Bytes used by `value` and everything it references, counting shared objects once."""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(deep_sizeof(v, seen) for v in value)
+    return size
+
+
+def measure_savings(charts, codec=None):
+    """
+    Compare the memory of plain charts with their encoded form.
+
+    Args:
+        charts (list): Chart dicts as produced by json.loads
+        codec (ChartCodec): Codec to encode with (a fresh one by default)
+
+    Returns:
+        dict: plain/encoded bytes, bytes saved, and the saving scaled to 10k charts
+    """
+    codec = codec or ChartCodec()
+    encoded = [codec.encode(chart) for chart in charts]
+    plain_bytes = deep_sizeof(charts)
+    # The string and shape tables are part of the encoded representation's cost
+    seen = set()
+    encoded_bytes = deep_sizeof(encoded, seen)
+    encoded_bytes += deep_sizeof(codec._strings, seen) + deep_sizeof(codec._shapes, seen)
+    saved = plain_bytes - encoded_bytes
+    per_10k = saved * 10000 / len(charts) if charts else 0
+    return {
+        'charts': len(charts),
+        'plain_bytes': plain_bytes,
+        'encoded_bytes': encoded_bytes,
+        'saved_bytes': saved,
+        'saved_mb_per_10k_charts': round(per_10k / (1024 * 1024), 2),
+    }
@@ -0,0 +1,319 @@
+"""
+Streaming index over DATABASE/db.json.
+
+Loading the database through TinyDB parses every chart body into Python
+dicts. The history and search views only need a handful of fields per chart,
+so ChartIndex streams the `_default` table one record at a time, keeps a
+small summary per chart plus the byte range of its body in the file, and
+pages full chart bodies in on demand.
+"""
+import codecs
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+from chart_codec import ChartCodec
+from metrics import record_cache_lookup
+
+# Fields kept in memory for every chart; everything else is paged in
+SUMMARY_FIELDS = ('uuid', 'Name', 'datetime', 'date', 'uhid', 'bed_number', 'print_time')
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = ' \t\n\r'
+
+
+def datetime_sort_key(summary):
+    try:
+        return datetime.strptime(summary.get('datetime') or '', '%d-%m-%Y %H:%M:%S')
+    except ValueError:
+        return datetime(1970, 1, 1)
+
+
+def file_signature(path):
+    """Identify a database generation; atomic replaces change the inode."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class _StreamReader:
+    """
+    Incrementally decodes a JSON file and tracks byte offsets.
+
+    Values are decoded with json.JSONDecoder.raw_decode from a small text
+    buffer that is refilled chunk by chunk, so memory use is bounded by the
+    largest single record rather than by the file.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self.offset = 0  # byte offset of self._buf[self._pos] in the file
+
+    def _fill(self):
+        if self._eof:
+            return False
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            self._buf = self._buf[self._pos:] + self._decoder.decode(b'', final=True)
+        else:
+            self._buf = self._buf[self._pos:] + self._decoder.decode(chunk)
+        self._pos = 0
+        return True
+
+    def _advance(self, end):
+        consumed = self._buf[self._pos:end]
+        self.offset += len(consumed) if consumed.isascii() else len(consumed.encode('utf-8'))
+        self._pos = end
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._advance(self._pos + 1)
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at byte {self.offset} of database file")
+        self._advance(self._pos + 1)
+
+    def value(self):
+        """Decode the next JSON value; returns (value, start_byte, end_byte)."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self._json.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # Most likely the value continues in the next chunk
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self._buf) and not self._eof:
+                # A number could be cut at the chunk boundary; make sure it is complete
+                self._fill()
+                continue
+            start = self.offset
+            self._advance(end)
+            return obj, start, self.offset
+
+
+def iter_records(path, table='_default'):
+    """
+    Stream (doc_id, record, start_byte, end_byte) from a TinyDB JSON file.
+
+    Only one record is held in memory at a time. Tables other than `table`
+    are decoded and discarded.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as f:
+        reader = _StreamReader(f)
+        reader.expect('{')
+        while reader.peek() != '}':
+            table_name, _, _ = reader.value()
+            reader.expect(':')
+            if table_name != table:
+                reader.value()
+            else:
+                reader.expect('{')
+                while reader.peek() != '}':
+                    doc_id, _, _ = reader.value()
+                    reader.expect(':')
+                    record, start, end = reader.value()
+                    yield doc_id, record, start, end
+                    if reader.peek() == ',':
+                        reader.expect(',')
+                reader.expect('}')
+            if reader.peek() == ',':
+                reader.expect(',')
+
+
+def summarize(record):
+    return {field: record.get(field) for field in SUMMARY_FIELDS if field in record}
+
+
+class ChartIndex:
+    """
+    In-memory summaries of all charts plus the location of each chart body.
+
+    The index is rebuilt by streaming the file when the file changes on disk
+    behind our back, and updated in place from the data TinyDB hands to the
+    storage when this process writes (see db_storage.AtomicJSONStorage).
+
+    Recently opened chart bodies are kept in an LRU cache of up to
+    `cache_size` charts, held in ChartCodec's compact encoded form.
+    """
+
+    def __init__(self, path, cache_size=1000):
+        self.path = path
+        self.cache_size = cache_size
+        self.codec = ChartCodec()
+        self._cache = OrderedDict()  # doc_id -> encoded chart body
+        self._lock = threading.RLock()
+        self._summaries = {}   # doc_id -> summary dict
+        self._locations = {}   # doc_id -> (start_byte, end_byte)
+        self._by_uuid = {}     # uuid -> doc_id
+        self._history = None   # cached history rows, newest first
+        self._signature = None
+        self.loaded = False
+        self.reloads = 0  # bumped on every full load, i.e. when derived indexes must rebuild
+        self._expected_uuids = None  # charts the next write updates, see expecting_write
+
+    def load(self):
+        """Stream the database file and build summaries and locations."""
+        with self._lock:
+            summaries, locations, by_uuid = {}, {}, {}
+            signature = file_signature(self.path)
+            for doc_id, record, start, end in iter_records(self.path):
+                summaries[doc_id] = summarize(record)
+                locations[doc_id] = (start, end)
+                if record.get('uuid'):
+                    by_uuid[record['uuid']] = doc_id
+            self._summaries, self._locations, self._by_uuid = summaries, locations, by_uuid
+            self._signature = signature
+            self._history = None
+            self._cache.clear()
+            self.loaded = True
+            self.reloads += 1
+        return self
+
+    def refresh_if_stale(self):
+        """Reload if db.json was replaced since the index was built."""
+        if not self.loaded or file_signature(self.path) != self._signature:
+            self.load()
+
+    @contextmanager
+    def expecting_write(self, uuids=()):
+        """
+        Declare that the write made inside this block only inserts charts
+        and updates the charts with these uuids.
+
+        apply_write then re-indexes just those records instead of the whole
+        table. Writes made without it fall back to a full pass.
+        """
+        self._expected_uuids = set(uuids)
+        try:
+            yield
+        finally:
+            self._expected_uuids = None
+
+    def apply_write(self, data, locations, signature):
+        """
+        Update the index from a write done by this process.
+
+        Args:
+            data (dict): The full table data TinyDB just wrote
+            locations (dict): doc_id -> (start_byte, end_byte) for `_default`
+            signature: file_signature() of the newly written file
+        """
+        with self._lock:
+            table = data.get('_default', {})
+            expected, self._expected_uuids = self._expected_uuids, None
+            if expected is None or not self.loaded:
+                self._summaries = {doc_id: summarize(record) for doc_id, record in table.items()}
+                self._by_uuid = {s['uuid']: doc_id for doc_id, s in self._summaries.items() if s.get('uuid')}
+                self._cache.clear()
+            else:
+                changed = {self._by_uuid[uuid] for uuid in expected if uuid in self._by_uuid}
+                changed.update(table.keys() - self._summaries.keys())
+                for doc_id in self._summaries.keys() - table.keys():
+                    self._forget(doc_id)
+                for doc_id in changed:
+                    self._forget(doc_id)
+                    summary = self._summaries[doc_id] = summarize(table[doc_id])
+                    if summary.get('uuid'):
+                        self._by_uuid[summary['uuid']] = doc_id
+            self._locations = locations
+            self._signature = signature
+            self._history = None
+            self.loaded = True
+
+    def _forget(self, doc_id):
+        summary = self._summaries.pop(doc_id, None)
+        if summary and self._by_uuid.get(summary.get('uuid')) == doc_id:
+            del self._by_uuid[summary['uuid']]
+        # A changed body is read again from disk when next opened
+        self._cache.pop(doc_id, None)
+
+    def signature(self):
+        """Signature of the database generation the index reflects."""
+        self.refresh_if_stale()
+        return self._signature
+
+    def __len__(self):
+        return len(self._summaries)
+
+    def summaries(self):
+        self.refresh_if_stale()
+        return list(self._summaries.values())
+
+    def summary_by_uuid(self, param_uuid):
+        """Return the in-memory summary of the chart with this uuid, or None."""
+        self.refresh_if_stale()
+        doc_id = self._by_uuid.get(param_uuid)
+        return dict(self._summaries[doc_id]) if doc_id is not None else None
+
+    def history(self):
+        """Return [Name, datetime, uhid, uuid] rows, newest first."""
+        self.refresh_if_stale()
+        with self._lock:
+            if self._history is None:
+                ordered = sorted(self._summaries.values(), key=datetime_sort_key, reverse=True)
+                self._history = [[s.get('Name'), s.get('datetime'), s.get('uhid'), s.get('uuid')] for s in ordered]
+            return self._history
+
+    def _cached_body(self, doc_id):
+        encoded = self._cache.get(doc_id)
+        record_cache_lookup('chart_body', encoded is not None)
+        if encoded is not None:
+            self._cache.move_to_end(doc_id)
+            return self.codec.decode(encoded)
+        body = self._read_body(doc_id)
+        self._cache[doc_id] = self.codec.encode(body)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return body
+
+    def _read_body(self, doc_id):
+        start, end = self._locations[doc_id]
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if (st.st_ino, st.st_size, st.st_mtime_ns) != self._signature:
+                raise _StaleIndex()
+            f.seek(start)
+            raw = f.read(end - start)
+        return json.loads(raw)
+
+    def get_by_uuid(self, param_uuid):
+        """Page in and return the full chart with this uuid, or None."""
+        self.refresh_if_stale()
+        with self._lock:
+            doc_id = self._by_uuid.get(param_uuid)
+            if doc_id is None:
+                return None
+            try:
+                return self._cached_body(doc_id)
+            except _StaleIndex:
+                # db.json was replaced between the staleness check and the read
+                self.load()
+                doc_id = self._by_uuid.get(param_uuid)
+                return self._cached_body(doc_id) if doc_id is not None else None
+
+
+class _StaleIndex(Exception):
+    pass
@@ -0,0 +1,119 @@
+"""
+Circuit breaker for calls to upstream services.
+
+While an upstream is healthy the breaker is closed and every call goes
+through. After `failure_threshold` consecutive failed calls it opens:
+calls fail fast without touching the network, so a dead DDI server costs
+a nurse an immediate error instead of a hung request. Every `reset_timeout`
+seconds one call is let through as a probe (half-open); if it succeeds the
+breaker closes, otherwise it stays open for another period.
+
+The breaker for the DDI server lives here rather than in ddi_client, so
+/health and /metrics can report it without importing requests.
+"""
+import os
+import threading
+import time
+
+from metrics import CIRCUIT_BREAKER_STATE
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._last_failure = None
+        self._last_success = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def allow(self):
+        """
+        Whether a call may go to the upstream now.
+
+        In the half-open state only one caller gets True (the probe) until
+        it reports its outcome.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def _retry_after(self):
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def retry_after(self):
+        """Seconds until the next probe is allowed (0 if calls go through)."""
+        with self._lock:
+            return self._retry_after()
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+            self._last_success = time.time()
+
+    def record_failure(self, reason=None):
+        with self._lock:
+            self._failures += 1
+            self._last_failure = {'time': time.time(), 'reason': reason}
+            if self._probing or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def reset(self):
+        """Close the breaker and forget past failures (e.g. the upstream moved)."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def snapshot(self):
+        """State for health output."""
+        with self._lock:
+            state = self._current_state()
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'retry_after_s': round(self._retry_after(), 1),
+                'last_failure': self._last_failure,
+                'last_success': self._last_success,
+            }
+
+
+ddi_breaker = CircuitBreaker(
+    'ddi',
+    failure_threshold=int(os.getenv('DDI_BREAKER_FAILURES', 5)),
+    reset_timeout=float(os.getenv('DDI_BREAKER_RESET_SECONDS', 30)),
+)
+
+CIRCUIT_BREAKER_STATE.set_function(lambda: [({'upstream': ddi_breaker.name}, STATE_VALUES[ddi_breaker.state])])
@@ -1,7 +1,13 @@
 from tinydb import Query
 from tinydb import TinyDB
+import logging
 import os
 from datetime import datetime
+from db_storage import AtomicJSONStorage, db_write_lock
+from chart_index import ChartIndex, file_signature, iter_records
+from metrics import DB_OPERATION_SECONDS, DB_RECORDS
+
+logger = logging.getLogger(__name__)
 
 def catch_exceptions(handler=None):
     """
@@ -19,9 +25,9 @@ def catch_exceptions(handler=None):
                     # Call the custom handler if provided
                     handler(e)
                 else:
-                    # Default behavior: Print the exception
-                    print(args, kwargs)
-                    print(f"An error occurred in {func.__name__}: {e}")
+                    # Default behavior: log the exception
+                    logger.debug("%s called with %s %s", func.__name__, args, kwargs)
+                    logger.error("An error occurred in %s: %s", func.__name__, e)
 
         return wrapper
     return decorator
@@ -30,18 +36,66 @@ def catch_exceptions(handler=None):
 if not os.path.exists('DATABASE'):
     os.makedirs('DATABASE')
 
-# Initialize TinyDB
-db = TinyDB('DATABASE/db.json')
+DB_PATH = os.path.join('DATABASE', 'db.json')
+
+# Summaries of every chart, streamed from db.json on first use (or by the
+# startup warmup); chart bodies are paged in from disk on demand
+chart_index = ChartIndex(DB_PATH)
+DB_RECORDS.set_function(lambda: len(chart_index))
 
-# Find all records
-all_users = db.all()
-# print("All Users:", all_users)
-# for user in all_users:
-#     print(user)
+# Initialize TinyDB (writes go through a temp file + rename, see db_storage.py)
+db = TinyDB(DB_PATH, storage=AtomicJSONStorage, on_write=chart_index.apply_write)
 
 ## Create a query
 q = Query()
 
+# Callbacks run after every chart write, see register_chart_listener
+_chart_listeners = []
+
+
+def register_chart_listener(callback):
+    """
+    Register `callback(event, chart)` to run after every chart write.
+
+    event is "inserted" when a new chart is saved and "printed" when a print
+    is recorded. For a print of an existing chart, `chart` is its index
+    summary (uuid, Name, datetime, date, uhid, bed_number, print_time).
+    Listeners run under the database write lock, so they see events in order
+    and should hand slow work off to a background thread.
+    """
+    _chart_listeners.append(callback)
+
+
+def _notify_chart_listeners(event, chart):
+    for callback in _chart_listeners:
+        try:
+            callback(event, chart)
+        except Exception as e:
+            # A broken listener must never fail the print itself
+            logger.error("Error in chart listener %s: %s", getattr(callback, '__name__', callback), e)
+
+
+def _sync_with_disk():
+    """
+    Pick up writes made by other worker processes before writing.
+
+    Must be called with db_write_lock held. If db.json is not the file this
+    process last wrote, TinyDB's cached next document id and query results
+    are dropped so the insert cannot reuse another worker's id. That is
+    checked against the storage, not the chart index: a read request may
+    already have refreshed the index after the other worker's write.
+    """
+    chart_index.refresh_if_stale()
+    if file_signature(DB_PATH) != db.storage.last_written:
+        db.clear_cache()
+        db.table(db.default_table_name)._next_id = None
+
+
+def iter_charts():
+    """Stream every stored chart from disk, one at a time."""
+    for _, record, _, _ in iter_records(DB_PATH):
+        yield record
+
 
 # def return_database_sorted_according_to_date():
 #
@@ -54,44 +108,24 @@ q = Query()
 #         print(entries["Name"], entries["uhid"], entries["date"])
 
 def return_database_with_history():
-
-    print("all fione here")
-    # Sort entries by date in ascending order
-    to_return_nested_list_for_history=[]
-    sorted_entries = sorted(
-        db.all(),
-        key=lambda x: datetime.strptime(x.get('datetime', '01-01-1970T00:00:00'), '%d-%m-%Y %H:%M:%S',)
-    )
-    if sorted_entries != None:
-        for entries in reversed(sorted_entries):
-            # print(entries["Name"], entries["date"],entries["uhid"],entries["uuid"])
-            to_return_nested_list_for_history.append([entries["Name"], entries["datetime"],entries["uhid"],entries["uuid"]])
-
-        return to_return_nested_list_for_history
+    """
+    Return [Name, datetime, uhid, uuid] for every chart, newest first.
+    Served from the in-memory chart index, no chart bodies are loaded.
+    """
+    with DB_OPERATION_SECONDS.time(operation='history'):
+        return list(chart_index.history())
 
 def return_database_with_query_is_uuid(param_uuid="NA"):
-    db = TinyDB('DATABASE/db.json')
-    # print("all fione here")
     if param_uuid != "NA":
-        # Sort entries by date in ascending order
-        to_return_single_dict = {}
-
-        # UUID to search for
-        search_uuid = param_uuid
+        # Page the single chart body in from disk via the index
+        with DB_OPERATION_SECONDS.time(operation='get_chart'):
+            to_return_single_dict = chart_index.get_by_uuid(param_uuid)
 
-        Record = Query()
-
-        # Search the database
-        to_return_single_dict_but_its_list_now  = db.search(Record.uuid == search_uuid)
-
-        if to_return_single_dict_but_its_list_now:
-            print("databasehandler.py->>>>Entry found:", to_return_single_dict_but_its_list_now )
-            print("databasehandler.py->>>>typeof returning_dict:", type(to_return_single_dict_but_its_list_now ))
-            # Convert to dictionary
-            to_return_single_dict = to_return_single_dict_but_its_list_now[0] if to_return_single_dict_but_its_list_now else {}
+        if to_return_single_dict:
+            logger.debug("Entry found: %s", to_return_single_dict.get('uuid'))
             return to_return_single_dict
         else:
-            print("databasehandler.py->>>>No entry found with that UUID.")
+            logger.debug("No entry found with UUID %s", param_uuid)
             return None
     return None
 
@@ -101,9 +135,8 @@ def return_databse_with_query_is_name_and_date_and_uhid(param_name=None,param_da
     db = TinyDB('DATABASE/db.json')
 
     if param_name=="" and param_date=="" and param_uhid=="":
-        print("please enter any one field to begin search")
+        logger.info("please enter any one field to begin search")
     else:
-        print("kuch to mila")
         # Define the fields to query (set some fields as None if not querying them)
         if param_name != None:
             name_to_find = param_name.lower() if len(param_name)>0 else None
@@ -121,8 +154,8 @@ def return_databse_with_query_is_name_and_date_and_uhid(param_name=None,param_da
         else:
             uhid_to_find = None
         # uhid_to_find = None
-        print(name_to_find,date_to_find,uhid_to_find)
-        print(param_name,param_date,param_uhid)
+        logger.debug("Search %s %s %s (given %s %s %s)", name_to_find, date_to_find, uhid_to_find,
+                     param_name, param_date, param_uhid)
 
         # Use the Query object to construct the query
         Entry = Query()
@@ -142,14 +175,12 @@ def return_databse_with_query_is_name_and_date_and_uhid(param_name=None,param_da
         # Perform the query if a condition exists
         if query:
             result = db.search(query)
-            print("Matching entries:", len(result))
-            print("after search---------::::")
+            logger.debug("Matching entries: %d", len(result))
             sorted_entries_by_datetime = sorted(
                 result,
                 key=lambda x: datetime.strptime(x.get('datetime', '01-01-1970T00:00:00'), '%d-%m-%Y %H:%M:%S', )
             )
-            for i in result:
-                print(i)
+            logger.debug("Search results: %s", result)
 
             to_return_nested_list_for_search= []
             for entries_search in reversed(sorted_entries_by_datetime):
@@ -157,7 +188,7 @@ def return_databse_with_query_is_name_and_date_and_uhid(param_name=None,param_da
                 to_return_nested_list_for_search.append([entries_search["Name"], entries_search["datetime"], entries_search["uhid"], entries_search["uuid"]])
             return  to_return_nested_list_for_search
         else:
-            print("No query conditions provided.")
+            logger.info("No query conditions provided.")
             return -1
 
 
@@ -188,13 +219,76 @@ def create_entry(json_data):
                 json_data[field] = ''
 
         # Insert the data into the database
-        db.insert(json_data)
-        print(f"Successfully created database entry for {json_data.get('Name', 'Unknown')}")
+        with db_write_lock, DB_OPERATION_SECONDS.time(operation='insert'):
+            _sync_with_disk()
+            with chart_index.expecting_write():
+                db.insert(json_data)
+            _notify_chart_listeners("inserted", json_data)
+        logger.info("Created database entry for %s", json_data.get('Name', 'Unknown'))
         return True
     except Exception as e:
-        print(f"Error creating database entry: {str(e)}")
+        logger.error("Error creating database entry: %s", e)
         return False
 
+def _record_print(current_time):
+    def transform(doc):
+        # Charts printed before print_count existed were printed at least once
+        doc['print_count'] = doc.get('print_count', 1 if doc.get('print_time') else 0) + 1
+        doc['print_time'] = current_time
+    return transform
+
+def record_chart_print(json_data):
+    """
+    Record that the chart in `json_data` was printed.
+
+    Sets print_time and bumps print_count on the existing entry with the same
+    uuid, or inserts a new entry built from the /download payload. The lookup and the write happen
+    under db_write_lock so concurrent prints cannot lose each other's updates.
+
+    Returns:
+        str: "updated" or "inserted", or None if the payload has no uuid
+    """
+    param_uuid = json_data.get('uuid')
+    if not param_uuid:
+        return None
+
+    current_time = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+    current_date = datetime.now().strftime("%d-%m-%Y")
+
+    with db_write_lock, DB_OPERATION_SECONDS.time(operation='record_print'):
+        _sync_with_disk()
+        Record = Query()
+        if chart_index.summary_by_uuid(param_uuid):
+            with chart_index.expecting_write([param_uuid]):
+                db.update(_record_print(current_time), Record.uuid == param_uuid)
+            _notify_chart_listeners("printed", chart_index.summary_by_uuid(param_uuid))
+            return "updated"
+
+        new_entry = {
+            'uuid': param_uuid,
+            'datetime': current_time,
+            'date': current_date,
+            'Name': json_data.get('Name', ''),
+            'Age_year': json_data.get('Age_year', ''),
+            'Age_month': json_data.get('Age_month', ''),
+            'Sex': json_data.get('Sex', ''),
+            'uhid': json_data.get('uhid', ''),
+            'bed_number': json_data.get('bed_number', ''),
+            'Diagnosis': json_data.get('Diagnosis', ''),
+            'Consultants': json_data.get('Consultants', ''),
+            'JR': json_data.get('JR', ''),
+            'SR': json_data.get('SR', ''),
+            'print_time': current_time,
+            'print_count': 1,
+            'each_entry_layout': json_data.get('entries', {}),
+            'each_table_row_layout': json_data.get('parameters', {})
+        }
+        with chart_index.expecting_write():
+            db.insert(new_entry)
+        _notify_chart_listeners("inserted", new_entry)
+        _notify_chart_listeners("printed", new_entry)
+        return "inserted"
+
 def search_entries(name=None, date=None, uuid=None):
     """
     Search for entries in the database based on provided criteria.
@@ -219,7 +313,7 @@ def search_entries(name=None, date=None, uuid=None):
         # Return matching entries
         return db.search(query)
     except Exception as e:
-        print(f"Error searching database: {str(e)}")
+        logger.error("Error searching database: %s", e)
         return []
 
 def get_all_entries():
@@ -229,7 +323,7 @@ def get_all_entries():
     try:
         return db.all()
     except Exception as e:
-        print(f"Error getting all entries: {str(e)}")
+        logger.error("Error getting all entries: %s", e)
         return []
 
 
@@ -0,0 +1,198 @@
+"""
+Online, crash-consistent snapshots of DATABASE/db.json.
+
+All writers replace db.json atomically (see db_storage.py), so every inode the
+path has ever pointed to is a complete database generation. A snapshot pins
+the current generation with a hard link, copies it while the app keeps
+writing new generations, and verifies the copy by checksum and JSON parse.
+
+Usage:
+    python db_snapshot.py create [--dest DIR] [--keep N]
+    python db_snapshot.py verify SNAPSHOT.json
+    python db_snapshot.py list [--dest DIR]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+from db_storage import db_write_lock
+
+DB_PATH = os.path.join('DATABASE', 'db.json')
+SNAPSHOT_DIR = os.path.join('DATABASE', 'snapshots')
+CHUNK_SIZE = 1024 * 1024
+
+
+def _sha256_of(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _pin_generation(db_path, pin_path):
+    """
+    Pin the current db.json generation at `pin_path`.
+
+    A hard link costs one metadata operation and does not need the write
+    lock, because writers never modify a generation in place. Filesystems
+    without hard links fall back to a copy taken while holding db_write_lock,
+    the process-wide ProcessWriteLock (thread RLock plus an flock shared with
+    every server worker), so no writer in any process replaces db.json
+    mid-copy.
+    """
+    try:
+        os.link(db_path, pin_path)
+    except (OSError, AttributeError):
+        with db_write_lock:
+            shutil.copyfile(db_path, pin_path)
+
+
+def create_snapshot(db_path=DB_PATH, dest_dir=SNAPSHOT_DIR, keep=None):
+    """
+    Create a verified point-in-time snapshot of the chart database.
+
+    Args:
+        db_path (str): Live database file
+        dest_dir (str): Directory for snapshots (same filesystem as db_path
+            for the hard-link fast path)
+        keep (int): If set, delete all but the newest `keep` snapshots
+
+    Returns:
+        dict: path, sha256, size_bytes, records and seconds of the snapshot
+    """
+    started = time.perf_counter()
+    os.makedirs(dest_dir, exist_ok=True)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    snapshot_path = os.path.join(dest_dir, f"db-{timestamp}.json")
+    pin_path = os.path.join(dest_dir, f".pin-{timestamp}.json")
+    tmp_path = snapshot_path + '.tmp'
+
+    _pin_generation(db_path, pin_path)
+    try:
+        # Copy the pinned generation while the app keeps writing new ones
+        digest = hashlib.sha256()
+        with open(pin_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                dst.write(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+        sha256 = digest.hexdigest()
+    finally:
+        os.remove(pin_path)
+
+    try:
+        records = _verify_file(tmp_path, sha256)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, snapshot_path)
+    with open(snapshot_path + '.sha256', 'w') as f:
+        f.write(f"{sha256}  {os.path.basename(snapshot_path)}\n")
+
+    if keep is not None:
+        prune_snapshots(dest_dir, keep)
+
+    return {
+        'path': snapshot_path,
+        'sha256': sha256,
+        'size_bytes': os.path.getsize(snapshot_path),
+        'records': records,
+        'seconds': round(time.perf_counter() - started, 4),
+    }
+
+
+def _verify_file(path, expected_sha256):
+    actual = _sha256_of(path)
+    if actual != expected_sha256:
+        raise ValueError(f"Checksum mismatch for {path}: expected {expected_sha256}, got {actual}")
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return len(data.get('_default', {}))
+
+
+def verify_snapshot(snapshot_path):
+    """
+    Verify a snapshot against its .sha256 sidecar and check that it parses.
+
+    Returns:
+        dict: path, sha256, records and seconds taken
+    Raises:
+        ValueError: If the checksum does not match or the JSON is invalid
+    """
+    started = time.perf_counter()
+    with open(snapshot_path + '.sha256', 'r') as f:
+        expected = f.read().split()[0]
+    try:
+        records = _verify_file(snapshot_path, expected)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Snapshot {snapshot_path} is not valid JSON: {e}")
+    return {
+        'path': snapshot_path,
+        'sha256': expected,
+        'records': records,
+        'seconds': round(time.perf_counter() - started, 4),
+    }
+
+
+def list_snapshots(dest_dir=SNAPSHOT_DIR):
+    """Return snapshot paths in dest_dir, oldest first."""
+    if not os.path.isdir(dest_dir):
+        return []
+    names = sorted(f for f in os.listdir(dest_dir) if f.startswith('db-') and f.endswith('.json'))
+    return [os.path.join(dest_dir, name) for name in names]
+
+
+def prune_snapshots(dest_dir=SNAPSHOT_DIR, keep=7):
+    """Delete all but the newest `keep` snapshots and their checksum files."""
+    snapshots = list_snapshots(dest_dir)
+    removed = []
+    for path in snapshots[:max(len(snapshots) - keep, 0)]:
+        for victim in (path, path + '.sha256'):
+            if os.path.exists(victim):
+                os.remove(victim)
+        removed.append(path)
+    return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot the chart database without pausing writes.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    create = sub.add_parser('create', help='take a verified snapshot')
+    create.add_argument('--db', default=DB_PATH)
+    create.add_argument('--dest', default=SNAPSHOT_DIR)
+    create.add_argument('--keep', type=int, default=None, help='number of snapshots to retain')
+
+    verify = sub.add_parser('verify', help='verify a snapshot against its checksum')
+    verify.add_argument('snapshot')
+
+    listing = sub.add_parser('list', help='list existing snapshots')
+    listing.add_argument('--dest', default=SNAPSHOT_DIR)
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'create':
+            print(json.dumps(create_snapshot(args.db, args.dest, args.keep), indent=2))
+        elif args.command == 'verify':
+            print(json.dumps(verify_snapshot(args.snapshot), indent=2))
+        elif args.command == 'list':
+            for path in list_snapshots(args.dest):
+                print(path)
+    except Exception as e:
+        print(f"Snapshot {args.command} failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import json
+import os
+import tempfile
+import threading
+
+from tinydb.storages import Storage
+
+
+try:
+    import fcntl
+except ImportError:  # Windows: the development server runs a single process
+    fcntl = None
+
+
+class ProcessWriteLock:
+    """
+    Re-entrant lock held across threads and worker processes.
+
+    Threads of one process serialize on an RLock; the outermost holder also
+    takes an exclusive flock on `lock_path`, so several server workers
+    sharing one DATABASE directory cannot interleave their read-modify-write
+    cycles. Without fcntl it degrades to the thread lock.
+    """
+
+    def __init__(self, lock_path):
+        self.lock_path = lock_path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+                self._handle = open(self.lock_path, 'a')
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+            except Exception:
+                if self._handle:
+                    self._handle.close()
+                    self._handle = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._handle is not None:
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+            self._handle.close()
+            self._handle = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+# Every writer of DATABASE/db.json holds this lock for the whole
+# read-modify-write, so two prints (in any thread or worker process)
+# cannot interleave their updates.
+db_write_lock = ProcessWriteLock(os.path.join('DATABASE', '.db.lock'))
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """
+    Write JSON to `path` without ever exposing a half-written file.
+
+    The data is written to a temporary file in the same directory, flushed to
+    disk and then renamed over the target. Readers (and snapshots) therefore
+    always see either the old or the new file, never a mix of both.
+
+    Args:
+        path (str): Destination file
+        data: JSON-serializable object
+        **dump_kwargs: Extra arguments passed to json.dump
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_tables(path, data, **dump_kwargs):
+    """
+    Atomically write TinyDB table data, recording where each record lands.
+
+    The output is the same JSON TinyDB would write, serialized one record at
+    a time so the byte range of every `_default` record is known without
+    re-reading the file. ChartIndex uses these ranges to page charts in.
+    A table may also be an iterable of (doc_id, record) pairs, so a large
+    generated database never has to be held in memory.
+
+    Returns:
+        dict: doc_id -> (start_byte, end_byte) for the `_default` table
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    dump_kwargs.pop('indent', None)  # record ranges assume compact output
+
+    locations = {}
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            position = 0
+
+            def emit(text):
+                nonlocal position
+                raw = text.encode('utf-8')
+                f.write(raw)
+                position += len(raw)
+
+            emit('{')
+            for table_index, (table_name, table) in enumerate(data.items()):
+                emit((', ' if table_index else '') + json.dumps(table_name) + ': {')
+                records = table.items() if hasattr(table, 'items') else table
+                for doc_index, (doc_id, record) in enumerate(records):
+                    emit((', ' if doc_index else '') + json.dumps(str(doc_id)) + ': ')
+                    start = position
+                    emit(json.dumps(record, **dump_kwargs))
+                    if table_name == '_default':
+                        locations[str(doc_id)] = (start, position)
+                emit('}')
+            emit('}')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return locations
+
+
+class AtomicJSONStorage(Storage):
+    """
+    TinyDB storage that replaces the database file atomically on every write.
+
+    TinyDB's default JSONStorage rewrites the file in place, so a copy taken
+    during a write can contain truncated JSON. This storage opens the file
+    per read and writes through atomic_write_tables instead.
+
+    `on_write(data, locations, signature)` is called after each successful
+    write so in-memory indexes can follow along without re-reading the file.
+    `last_written` is the signature of the file this storage last wrote, so
+    callers can tell whether another process has written since.
+    """
+
+    def __init__(self, path, create_dirs=False, encoding='utf-8', on_write=None, **kwargs):
+        super().__init__()
+        self._path = path
+        self._encoding = encoding
+        self._on_write = on_write
+        self.kwargs = kwargs
+        self.last_written = None
+
+        if create_dirs:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def read(self):
+        if not os.path.exists(self._path) or os.path.getsize(self._path) == 0:
+            # Let TinyDB initialize an empty database
+            return None
+        with open(self._path, 'r', encoding=self._encoding) as f:
+            return json.load(f)
+
+    def write(self, data):
+        with db_write_lock:
+            locations = atomic_write_tables(self._path, data, **self.kwargs)
+            st = os.stat(self._path)
+            self.last_written = (st.st_ino, st.st_size, st.st_mtime_ns)
+            if self._on_write:
+                self._on_write(data, locations, self.last_written)
+
+    def close(self):
+        pass
@@ -0,0 +1,169 @@
+"""
+Persistent cache of drug-drug interaction results per drug pair.
+
+Most DDI scans are for charts whose medication list barely changed since
+the last scan. Interactions depend only on the two drugs involved, so
+results are cached per unordered pair of normalized drug names ("a|b",
+sorted) and persisted to DATABASE/ddi_cache.json:
+
+    {"amikacin|vancomycin": {"rows": [{"Drug 1": ..., "Drug 2": ...,
+                                       "Interaction": ...}],
+                             "stored": 1747000000.0}}
+
+A pair without interactions is cached with no rows, so it is not asked
+again. Entries expire after DDI_CACHE_TTL_SECONDS (default: 7 days; 0
+disables the cache) and at most DDI_CACHE_MAX_PAIRS (default: 50000) are
+kept, least recently used dropped first. Writers from every worker
+process serialize on DATABASE/.ddi_cache.lock and reload the file if
+another worker changed it.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import combinations
+
+from chart_index import file_signature
+from db_storage import ProcessWriteLock, atomic_write_json
+from medication_aggregates import extract_medications
+from metrics import record_cache_lookup
+
+DDI_CACHE_PATH = os.path.join('DATABASE', 'ddi_cache.json')
+
+
+def normalize_drug(name):
+    # '|' separates the two drugs of a pair key
+    return ' '.join(str(name).replace('|', '/').split()).lower()
+
+
+def pair_key(drug_a, drug_b):
+    """Cache key of an unordered pair of normalized drug names."""
+    return '|'.join(sorted((drug_a, drug_b)))
+
+
+def chart_drugs(chart):
+    """Sorted, de-duplicated normalized drug names charted in `chart`."""
+    return sorted({normalize_drug(drug) for _, drug in extract_medications(chart)})
+
+
+def drug_pairs(drugs):
+    """Cache keys of every pair of `drugs`."""
+    return [pair_key(a, b) for a, b in combinations(sorted(set(drugs)), 2)]
+
+
+def chart_with_drugs(chart, drugs):
+    """Copy of `chart` whose medication entries list only `drugs` (normalized names)."""
+    wanted = set(drugs)
+    subset = dict(chart)
+    for field in ('each_entry_layout', 'entries'):
+        layout = chart.get(field)
+        if not isinstance(layout, dict):
+            continue
+        filtered = {}
+        for entry_key, entry in layout.items():
+            if not isinstance(entry, dict):
+                continue
+            subtitles = {key: subtitle for key, subtitle in (entry.get('subtitles') or {}).items()
+                         if isinstance(subtitle, dict) and normalize_drug(subtitle.get('content', '')) in wanted}
+            if subtitles:
+                filtered[entry_key] = dict(entry, subtitles=subtitles)
+        subset[field] = filtered
+    return subset
+
+
+def rows_by_pair(rows, drugs):
+    """
+    Attribute interaction table rows to pairs of `drugs`.
+
+    Returns:
+        tuple: ({key: rows} for every pair of `drugs`, rows naming a drug
+            outside `drugs`, e.g. a generic name the server substituted)
+    """
+    drugs = set(drugs)
+    by_pair = {key: [] for key in drug_pairs(drugs)}
+    unmatched = []
+    for row in rows:
+        drug_a, drug_b = normalize_drug(row.get('Drug 1', '')), normalize_drug(row.get('Drug 2', ''))
+        key = pair_key(drug_a, drug_b)
+        if key in by_pair:
+            by_pair[key].append(row)
+        else:
+            unmatched.append(row)
+    return by_pair, unmatched
+
+
+class DDIPairCache:
+    def __init__(self, path=DDI_CACHE_PATH, ttl=None, max_entries=None):
+        self.path = path
+        self.ttl = float(ttl if ttl is not None else os.getenv('DDI_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+        self.max_entries = int(max_entries or os.getenv('DDI_CACHE_MAX_PAIRS', 50000))
+        self._lock = threading.Lock()
+        self._write_lock = ProcessWriteLock(os.path.join(os.path.dirname(path) or '.', '.ddi_cache.lock'))
+        self._entries = OrderedDict()  # pair key -> {"rows", "stored"}, least recently used first
+        self._signature = None
+        self.loaded = False
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def _refresh(self):
+        """Load on first use, or reload if another process saved the file."""
+        if self.loaded and file_signature(self.path) == self._signature:
+            return
+        self.loaded = True
+        self._entries = OrderedDict()
+        self._signature = file_signature(self.path)
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self._entries.update(json.load(f))
+        except (OSError, ValueError):
+            # A damaged cache only costs upstream calls; start over
+            self._entries = OrderedDict()
+
+    def lookup(self, keys):
+        """
+        Split pair keys into cached results and pairs to ask the upstream.
+
+        Returns:
+            tuple: ({key: rows} for fresh cached pairs, [keys not cached])
+        """
+        if not self.enabled:
+            return {}, list(keys)
+        now = time.time()
+        cached, missing = {}, []
+        with self._lock:
+            self._refresh()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and now - entry['stored'] < self.ttl:
+                    self._entries.move_to_end(key)
+                    cached[key] = entry['rows']
+                else:
+                    missing.append(key)
+                record_cache_lookup('ddi_pairs', key in cached)
+        return cached, missing
+
+    def store(self, results):
+        """Cache `{key: rows}` and persist the cache."""
+        if not self.enabled or not results:
+            return
+        now = time.time()
+        with self._write_lock, self._lock:
+            self._refresh()
+            for key, rows in results.items():
+                self._entries[key] = {'rows': rows, 'stored': now}
+                self._entries.move_to_end(key)
+            # Drop expired entries, then the least recently used ones
+            for key in [key for key, entry in self._entries.items() if now - entry['stored'] >= self.ttl]:
+                del self._entries[key]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            atomic_write_json(self.path, self._entries)
+            self._signature = file_signature(self.path)
+
+
+ddi_pair_cache = DDIPairCache()
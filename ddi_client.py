@@ -0,0 +1,138 @@
+"""
+Shared HTTP client for the DDI server.
+
+One requests.Session with a connection pool is reused by every /ddi
+request, so scans after the first skip the TCP handshake. Each call has
+a connect and a read timeout, so a hung DDI server can no longer pin a
+worker thread. Connection failures and 502/503/504 answers are retried a
+bounded number of times with full-jitter exponential backoff. Read
+timeouts are not retried, because the server may still be working on the
+request.
+
+Calls go through circuit_breaker.ddi_breaker. While it is open, post()
+raises CircuitOpenError immediately.
+
+Environment:
+    DDI_CONNECT_TIMEOUT         seconds (default: 3)
+    DDI_READ_TIMEOUT            seconds (default: 30)
+    DDI_RETRIES                 extra attempts after a retryable failure (default: 2)
+    DDI_BACKOFF                 base backoff in seconds (default: 0.25)
+    DDI_POOL_SIZE               pooled connections (default: 10)
+    DDI_BREAKER_FAILURES        failed calls that open the breaker (default: 5)
+    DDI_BREAKER_RESET_SECONDS   seconds between probes while open (default: 30)
+"""
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from circuit_breaker import ddi_breaker
+from metrics import DDI_UPSTREAM_ERRORS, DDI_UPSTREAM_RETRIES, DDI_UPSTREAM_SECONDS
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """The DDI server is considered down; the call was not attempted."""
+
+
+class DDIClient:
+    def __init__(self, breaker=ddi_breaker, connect_timeout=None, read_timeout=None, retries=None,
+                 backoff=None, pool_size=None):
+        self.breaker = breaker
+        self.timeout = (float(connect_timeout or os.getenv('DDI_CONNECT_TIMEOUT', 3)),
+                        float(read_timeout or os.getenv('DDI_READ_TIMEOUT', 30)))
+        self.retries = int(retries if retries is not None else os.getenv('DDI_RETRIES', 2))
+        self.backoff = float(backoff if backoff is not None else os.getenv('DDI_BACKOFF', 0.25))
+        self.pool_size = int(pool_size or os.getenv('DDI_POOL_SIZE', 10))
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    def reset(self):
+        """Drop pooled connections (e.g. after the DDI host or port changed)."""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _sleep_before_retry(self, attempt):
+        DDI_UPSTREAM_RETRIES.inc()
+        time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def post(self, url, **kwargs):
+        """
+        POST to the DDI server with timeouts, retries and the circuit breaker.
+
+        The request body must be replayable (bytes, not open files) since
+        it may be sent more than once.
+
+        Returns:
+            requests.Response: The last response, whatever its status
+        Raises:
+            CircuitOpenError: The breaker is open
+            requests.exceptions.RequestException: The call failed
+        """
+        if not self.breaker.allow():
+            DDI_UPSTREAM_ERRORS.inc(reason='circuit_open')
+            raise CircuitOpenError(f"DDI server is unavailable; retrying in {self.breaker.retry_after():.0f}s")
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            started = time.perf_counter()
+            try:
+                response = self.session.post(url, timeout=self.timeout, **kwargs)
+            except requests.exceptions.ConnectTimeout as e:
+                # Nothing reached the server, so it is safe to send again
+                reason, error = 'timeout', e
+            except requests.exceptions.Timeout:
+                DDI_UPSTREAM_ERRORS.inc(reason='timeout')
+                self.breaker.record_failure('read timeout')
+                raise
+            except requests.exceptions.ConnectionError as e:
+                reason, error = 'connection', e
+            except Exception as e:
+                # InvalidURL, ChunkedEncodingError, ...: not retried, but the
+                # breaker must still hear about it or a half-open probe
+                # would never finish and every later call would fail fast
+                DDI_UPSTREAM_ERRORS.inc(reason='request')
+                self.breaker.record_failure(type(e).__name__)
+                raise
+            else:
+                if response.status_code in RETRY_STATUSES and not last_attempt:
+                    logger.warning("DDI server answered %s, retrying", response.status_code)
+                    self._sleep_before_retry(attempt)
+                    continue
+                if response.status_code >= 500:
+                    self.breaker.record_failure(f'status {response.status_code}')
+                else:
+                    self.breaker.record_success()
+                return response
+            finally:
+                DDI_UPSTREAM_SECONDS.observe(time.perf_counter() - started)
+
+            DDI_UPSTREAM_ERRORS.inc(reason=reason)
+            if last_attempt:
+                self.breaker.record_failure(reason)
+                raise error
+            logger.warning("DDI request failed (%s), retrying", reason)
+            self._sleep_before_retry(attempt)
+
+
+ddi_client = DDIClient()
@@ -0,0 +1,144 @@
+"""
+Background DDI scans of saved and printed charts.
+
+A DDIPrescanner is a chart listener: every saved or printed chart is
+queued for a DDI scan on a small thread pool, and the result is kept
+against the chart's uuid together with the drug list it was computed for.
+When the nurse then presses the DDI button, /ddi gets the stored result
+at once as long as the medication list is unchanged. A scan for a drug
+list that is already being scanned, in the background or for another
+/ddi request, waits for that scan instead of sending the same request
+again.
+
+Results live in this worker process only; other workers still find the
+scanned pairs in the shared pair cache (ddi_cache.py), so their /ddi does
+not reach the DDI server either.
+
+Environment:
+    DDI_PRESCAN                  0 disables background scans (default: 1)
+    DDI_PRESCAN_WORKERS          scan threads per process (default: 2)
+    DDI_PRESCAN_QUEUE            queued scans beyond which new ones are dropped (default: 50)
+    DDI_PRESCAN_MAX_AGE_SECONDS  how long a stored result is reused (default: 86400)
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from circuit_breaker import OPEN, ddi_breaker
+from ddi_cache import chart_drugs
+from metrics import DDI_PRESCANS, record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+
+def _fetch_ddi_data(chart):
+    # python-docx and requests load on the first scan, not at import
+    from ddiwindowmodified import fetch_ddi_data
+    return fetch_ddi_data(chart)
+
+
+class DDIPrescanner:
+    def __init__(self, load_chart=None, scan=_fetch_ddi_data, workers=None, max_pending=None, max_charts=1000,
+                 max_age=None, enabled=None):
+        """
+        Args:
+            load_chart (callable): Returns the stored chart for a uuid; used
+                for prints, whose listener event carries only the summary
+            scan (callable): Returns the {'table': [...]} result for a chart
+            max_charts (int): Results kept, least recently used dropped first
+        """
+        self.enabled = os.getenv('DDI_PRESCAN', '1') != '0' if enabled is None else enabled
+        self.workers = int(workers or os.getenv('DDI_PRESCAN_WORKERS', 2))
+        self.max_pending = int(max_pending or os.getenv('DDI_PRESCAN_QUEUE', 50))
+        self.max_charts = max_charts
+        self.max_age = float(max_age if max_age is not None else os.getenv('DDI_PRESCAN_MAX_AGE_SECONDS', 24 * 3600))
+        self._load_chart = load_chart
+        self._scan = scan
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+        self._in_flight = {}  # drug list -> (Future, uuids waiting for it)
+        self._results = OrderedDict()  # uuid -> (drug list, result, scanned at), least recently used first
+
+    def record_chart_event(self, event, chart):
+        """Chart listener: queue a background scan; never blocks the write."""
+        uuid = chart.get('uuid')
+        if not self.enabled or not uuid:
+            return
+        if ddi_breaker.state == OPEN:
+            DDI_PRESCANS.inc(outcome='skipped')
+            return
+        with self._lock:
+            if self._pending >= self.max_pending:
+                DDI_PRESCANS.inc(outcome='dropped')
+                return
+            if self._executor is None:
+                # Created on first use so the gunicorn master forks no threads
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ddi-prescan')
+            self._pending += 1
+        DDI_PRESCANS.inc(outcome='queued')
+        self._executor.submit(self._background_scan, uuid, chart)
+
+    def _background_scan(self, uuid, chart):
+        try:
+            if 'each_entry_layout' not in chart and 'entries' not in chart:
+                chart = self._load_chart(uuid) if self._load_chart else None
+                if not chart:
+                    return
+            self.scan(chart)
+            DDI_PRESCANS.inc(outcome='completed')
+        except Exception as e:
+            # No DDI server configured or reachable; /ddi reports it when asked
+            DDI_PRESCANS.inc(outcome='failed')
+            logger.debug("Background DDI scan of %s failed: %s", uuid, e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def scan(self, chart):
+        """
+        DDI result for `chart`, in the shape fetch_ddi_data returns.
+
+        Returns the stored result if the chart's medication list is
+        unchanged since it was scanned, waits for an identical scan in
+        flight, and otherwise scans in the calling thread.
+        """
+        uuid = chart.get('uuid')
+        drugs = tuple(chart_drugs(chart))
+        with self._lock:
+            stored = self._results.get(uuid) if uuid else None
+            hit = stored is not None and stored[0] == drugs and time.time() - stored[2] < self.max_age
+            record_cache_lookup('ddi_prescan', hit)
+            if hit:
+                self._results.move_to_end(uuid)
+                return stored[1]
+            flight = self._in_flight.get(drugs)
+            owner = flight is None
+            if owner:
+                flight = self._in_flight[drugs] = (Future(), set())
+            if uuid:
+                flight[1].add(uuid)
+        future, uuids = flight
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._scan(chart)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[drugs]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[drugs]
+            scanned_at = time.time()
+            for each in uuids:
+                self._results[each] = (drugs, result, scanned_at)
+                self._results.move_to_end(each)
+            while len(self._results) > self.max_charts:
+                self._results.popitem(last=False)
+        future.set_result(result)
+        return result
@@ -0,0 +1,247 @@
+"""
+Local stand-in for the DDI (drug-drug interaction) server.
+
+Implements POST /uploadfile/ the way fetch_ddi_data calls it: a DOCX
+upload in the `file` field. The drug names found in the document are
+matched against an interaction table, and the pairs present are returned
+in either response shape fetch_ddi_data parses:
+
+    interactions       {"interactions": [{"drug_A", "drug_B", "interaction"}]}
+    drug_interactions  {"drug_interactions": [{"drug1", "drug2", "description"}]}
+
+POST /interactions/ answers the same for the compact JSON transport
+(DDI_TRANSPORT=json), whose body is {"medications": ["Midazolam", ...]}.
+
+--table replaces the built-in table with a JSON file holding a list of
+[drug_a, drug_b, interaction] triples or {"drug_a", "drug_b",
+"interaction"} objects. Faults can be injected to exercise timeouts,
+retries and the circuit breaker: --latency-ms (plus up to --jitter-ms)
+delays every answer, --error-rate answers that share of requests with
+--error-status, and --timeout-rate holds that share for --hang-seconds
+before answering 504. GET /_faults shows the current faults and POST
+/_faults with a JSON object changes them while the server runs.
+
+Run it and point Settings > IP settings at it:
+
+    python ddi_stub_server.py --host 127.0.0.1 --port 5005
+    python ddi_stub_server.py --shape drug_interactions --latency-ms 800 --error-rate 0.1
+
+The load tester (benchmarks/load_test.py) runs it as a subprocess; the
+benchmarks and ad-hoc tests serve it from a thread with serve_in_thread().
+"""
+import argparse
+import io
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+from docx import Document
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+from app_logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERACTIONS = [
+    ("Amikacin", "Vancomycin", "Additive nephrotoxicity and ototoxicity; monitor levels and renal function."),
+    ("Ceftriaxone", "Calcium Gluconate", "Ceftriaxone-calcium precipitates; do not co-administer in neonates."),
+    ("Fentanyl", "Midazolam", "Additive respiratory depression and hypotension."),
+    ("Midazolam", "Fluconazole", "Fluconazole inhibits CYP3A4 and raises midazolam levels."),
+    ("Ondansetron", "Fentanyl", "Risk of serotonin syndrome."),
+    ("Phenytoin", "Fluconazole", "Fluconazole raises phenytoin levels."),
+    ("Furosemide", "Amikacin", "Additive ototoxicity."),
+    ("Adrenaline", "Milrinone", "Additive arrhythmia risk; monitor ECG."),
+]
+
+
+def document_text(data):
+    """All paragraph text of an uploaded DOCX."""
+    return '\n'.join(paragraph.text for paragraph in Document(io.BytesIO(data)).paragraphs)
+
+
+def load_table(path):
+    """(drug_a, drug_b, interaction) tuples from a JSON table file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = json.load(f)
+    table = []
+    for row in rows:
+        if isinstance(row, dict):
+            row = (row['drug_a'], row['drug_b'], row['interaction'])
+        drug_a, drug_b, interaction = row
+        table.append((str(drug_a), str(drug_b), str(interaction)))
+    return table
+
+
+def find_interactions(text, table):
+    """Interactions in `table` whose two drugs both occur in `text`."""
+    words = set(re.findall(r'[a-z]+', text.lower()))
+    found = []
+    for drug_a, drug_b, interaction in table:
+        if all(set(re.findall(r'[a-z]+', drug.lower())) <= words for drug in (drug_a, drug_b)):
+            found.append((drug_a, drug_b, interaction))
+    return found
+
+
+def response_body(found, shape):
+    """Interactions as the real server words them in `shape`."""
+    if shape == 'drug_interactions':
+        return {'drug_interactions': [{'drug1': a, 'drug2': b, 'description': text} for a, b, text in found]}
+    return {'interactions': [{'drug_A': a, 'drug_B': b, 'interaction': text} for a, b, text in found]}
+
+
+class Faults:
+    """Injected misbehaviour; can be changed while the server runs."""
+
+    FIELDS = {'latency_ms': float, 'jitter_ms': float, 'error_rate': float, 'error_status': int,
+              'timeout_rate': float, 'hang_seconds': float}
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, error_status=503, timeout_rate=0.0,
+                 hang_seconds=60, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def update(self, changes):
+        """Apply {field: value} changes; raises ValueError for unknown fields or bad values."""
+        unknown = set(changes) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fault settings: {', '.join(sorted(unknown))}")
+        parsed = {name: self.FIELDS[name](value) for name, value in changes.items()}
+        with self._lock:
+            for name, value in parsed.items():
+                setattr(self, name, value)
+
+    def inject(self):
+        """Delay the request; returns an error (body, status) to answer with, or None."""
+        with self._lock:
+            delay = (self.latency_ms + self._rng.uniform(0, self.jitter_ms)) / 1000
+            roll = self._rng.random()
+            timeout_rate, error_rate = self.timeout_rate, self.error_rate
+            hang_seconds, error_status = self.hang_seconds, self.error_status
+        if delay:
+            time.sleep(delay)
+        if roll < timeout_rate:
+            time.sleep(hang_seconds)
+            return {'detail': 'Injected timeout'}, 504
+        if roll < timeout_rate + error_rate:
+            return {'detail': 'Injected error'}, error_status
+        return None
+
+
+def create_app(table=None, shape='interactions', faults=None):
+    """
+    Flask app serving /uploadfile/, /interactions/ and /_faults.
+
+    Args:
+        table (list): (drug_a, drug_b, interaction) tuples; defaults to
+            DEFAULT_INTERACTIONS
+        shape (str): 'interactions' or 'drug_interactions'
+        faults (Faults): Injected latency, errors and timeouts; none by default
+    """
+    table = list(DEFAULT_INTERACTIONS if table is None else table)
+    faults = faults or Faults()
+    app = Flask(__name__)
+    app.config['DDI_FAULTS'] = faults
+    requests_served = itertools.count(1)
+
+    def answer(text):
+        found = find_interactions(text, table)
+        logger.debug("Request %d: %d interactions", next(requests_served), len(found))
+        return jsonify(response_body(found, shape))
+
+    @app.before_request
+    def _inject_faults():
+        if request.endpoint in ('upload_file', 'medication_interactions'):
+            error = faults.inject()
+            if error is not None:
+                body, status = error
+                return jsonify(body), status
+        return None
+
+    @app.route('/uploadfile/', methods=['POST'])
+    def upload_file():
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({'detail': 'No file uploaded'}), 422
+        try:
+            text = document_text(upload.read())
+        except Exception as e:
+            return jsonify({'detail': f'Could not read document: {e}'}), 400
+        return answer(text)
+
+    @app.route('/interactions/', methods=['POST'])
+    def medication_interactions():
+        body = request.get_json(silent=True)
+        medications = body.get('medications') if isinstance(body, dict) else None
+        if not isinstance(medications, list):
+            return jsonify({'detail': 'Expected {"medications": [...]}'}), 422
+        return answer('\n'.join(map(str, medications)))
+
+    @app.route('/_faults', methods=['GET', 'POST'])
+    def fault_settings():
+        if request.method == 'POST':
+            changes = request.get_json(silent=True)
+            if not isinstance(changes, dict):
+                return jsonify({'detail': 'Expected a JSON object'}), 422
+            try:
+                faults.update(changes)
+            except (TypeError, ValueError) as e:
+                return jsonify({'detail': str(e)}), 422
+            logger.info("Faults now %s", faults.as_dict())
+        return jsonify(faults.as_dict())
+
+    return app
+
+
+def serve_in_thread(app=None, host='127.0.0.1', port=0):
+    """
+    Serve the stand-in from a daemon thread.
+
+    Returns:
+        werkzeug BaseWSGIServer: `.port` is the bound port; call
+        `.shutdown()` to stop it
+    """
+    server = make_server(host, port, app or create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, name='ddi-stub', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5005)
+    parser.add_argument('--table', help='JSON interaction table (default: built-in)')
+    parser.add_argument('--shape', choices=('interactions', 'drug_interactions'), default='interactions')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay before every answer')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Extra random delay, up to this much')
+    parser.add_argument('--error-rate', type=float, default=0, help='Share of requests answered with an error')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--timeout-rate', type=float, default=0, help='Share of requests held for --hang-seconds')
+    parser.add_argument('--hang-seconds', type=float, default=60)
+    parser.add_argument('--seed', type=int, help='Random seed for jitter and injected failures')
+    args = parser.parse_args()
+    configure_logging()
+    faults = Faults(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                    error_status=args.error_status, timeout_rate=args.timeout_rate,
+                    hang_seconds=args.hang_seconds, seed=args.seed)
+    table = load_table(args.table) if args.table else None
+    app = create_app(table, shape=args.shape, faults=faults)
+    logger.info("DDI stand-in on %s:%d (%s shape, faults %s)", args.host, args.port, args.shape, faults.as_dict())
+    make_server(args.host, args.port, app, threaded=True).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
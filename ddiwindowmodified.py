@@ -1,18 +1,26 @@
+import io
 import json
+import logging
 import os
 import requests
 from docx import Document
 import re
+from settings_service import settings_service
+from metrics import DDI_UPSTREAM_ERRORS
+from ddi_client import ddi_client
+from ddi_cache import chart_drugs, chart_with_drugs, ddi_pair_cache, drug_pairs, normalize_drug, rows_by_pair
+
+logger = logging.getLogger(__name__)
+
+# DDI_TRANSPORT=json sends only the medication list, as compact JSON, to
+# DDI_JSON_PATH on the DDI server. Servers without that endpoint (404, 405,
+# 415 or 501) get the DOCX upload to /uploadfile/ instead, the default.
+JSON_UNSUPPORTED_STATUSES = (404, 405, 415, 501)
+_json_unsupported = False
 
 def get_valid_ip_port():
-    """Reads IP and Port from settings.json."""
-    current_dir = os.getcwd()
-    SETTINGS_FILE = os.path.join(current_dir, "settings.json")
-    
-    with open(SETTINGS_FILE, "r") as file:
-        settings = json.load(file)
-    
-    ip_settings = settings.get('ip_settings', {})
+    """Returns IP and Port from the cached settings."""
+    ip_settings = settings_service.value('ip_settings', {}) or {}
     ip = ip_settings.get('host')
     port = str(ip_settings.get('port'))
     
@@ -26,7 +34,7 @@ def clean_text(text):
     return cleaned
 
 def convert_json_to_docx(json_data, output_path):
-    """Convert JSON data to DOCX format."""
+    """Convert JSON data to DOCX format; `output_path` may also be a writable file object."""
     doc = Document()
     
     # Step 4: Write cleaned JSON content into the Word document
@@ -49,6 +57,91 @@ def convert_json_to_docx(json_data, output_path):
     doc.save(output_path)
     return True
 
+def docx_bytes(json_data):
+    """The DOCX document for `json_data`, built in memory."""
+    buffer = io.BytesIO()
+    convert_json_to_docx(json_data, buffer)
+    return buffer.getvalue()
+
+def parse_ddi_response(ddi_data):
+    """Interaction table rows from either response shape of the DDI server."""
+    table_data = []
+    if isinstance(ddi_data, dict):
+        if 'interactions' in ddi_data:
+            for interaction in ddi_data['interactions']:
+                table_data.append({
+                    'Drug 1': interaction.get('drug_A', ''),
+                    'Drug 2': interaction.get('drug_B', ''),
+                    'Interaction': interaction.get('interaction', '')
+                })
+        elif 'drug_interactions' in ddi_data:
+            for interaction in ddi_data['drug_interactions']:
+                table_data.append({
+                    'Drug 1': interaction.get('drug1', ''),
+                    'Drug 2': interaction.get('drug2', ''),
+                    'Interaction': interaction.get('description', '')
+                })
+    return table_data
+
+def post_chart(api_url, json_data):
+    """Upload `json_data` to the DDI server as a DOCX; returns the interaction table rows."""
+    # Convert JSON to DOCX in memory: concurrent scans share no files, and
+    # a retried request can resend the same bytes
+    files = {
+        'file': ('document.docx', docx_bytes(json_data), 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+    }
+    
+    # Make API request (pooled session, timeouts, retries and circuit breaker)
+    response = ddi_client.post(api_url, files=files)
+    if response.status_code != 200:
+        DDI_UPSTREAM_ERRORS.inc(reason='status')
+        raise requests.exceptions.RequestException(f"Server returned status code {response.status_code}")
+    return parse_ddi_response(response.json())
+
+def medication_list(json_data):
+    """Drug names charted in `json_data` as written, one per normalized name."""
+    layout = json_data.get('each_entry_layout') or json_data.get('entries') or {}
+    names = {}
+    for entry in layout.values():
+        if not isinstance(entry, dict):
+            continue
+        for subtitle in (entry.get('subtitles') or {}).values():
+            content = ' '.join(str(subtitle.get('content', '')).split()) if isinstance(subtitle, dict) else ''
+            if content:
+                names.setdefault(normalize_drug(content), content)
+    return list(names.values())
+
+def post_medications(api_url, json_data):
+    """
+    Send the medication list of `json_data` as JSON; returns the interaction
+    table rows, or None if the server has no JSON endpoint.
+    """
+    body = json.dumps({'medications': medication_list(json_data)}, separators=(',', ':')).encode('utf-8')
+    response = ddi_client.post(api_url, data=body, headers={'Content-Type': 'application/json'})
+    if response.status_code in JSON_UNSUPPORTED_STATUSES:
+        return None
+    if response.status_code != 200:
+        DDI_UPSTREAM_ERRORS.inc(reason='status')
+        raise requests.exceptions.RequestException(f"Server returned status code {response.status_code}")
+    return parse_ddi_response(response.json())
+
+def query_server(base_url, json_data):
+    """Interaction table rows for `json_data` over the configured transport."""
+    global _json_unsupported
+    if os.getenv('DDI_TRANSPORT', 'docx') == 'json' and not _json_unsupported:
+        rows = post_medications(base_url + os.getenv('DDI_JSON_PATH', '/interactions/'), json_data)
+        if rows is not None:
+            return rows
+        # Remembered until restart or until ip_settings point elsewhere
+        _json_unsupported = True
+        logger.warning("DDI server has no JSON endpoint; using DOCX uploads")
+    return post_chart(base_url + '/uploadfile/', json_data)
+
+def reset_transport():
+    """Try the JSON transport again, e.g. after the DDI server changed."""
+    global _json_unsupported
+    _json_unsupported = False
+
 def fetch_ddi_data(json_data=None):
     """Fetch drug-drug interaction data from the API."""
     try:
@@ -57,51 +150,27 @@ def fetch_ddi_data(json_data=None):
         if not ip or not port:
             raise ValueError("IP address or port is missing. Please check your settings.")
             
-        api_url = f"http://{ip}:{port}/uploadfile/"
-        
-        # Get current directory and file paths
-        current_dir = os.getcwd()
-        docx_file_path = os.path.join(current_dir, "RESOURCES", "converted_document_from_current_format_json.docx")
+        base_url = f"http://{ip}:{port}"
         
         # Use provided JSON data or read from file
         if json_data is None:
-            json_file_path = os.path.join(current_dir, "RESOURCES", "current_format.json")
+            json_file_path = os.path.join(os.getcwd(), "RESOURCES", "current_format.json")
             with open(json_file_path, 'r') as f:
                 json_data = json.load(f)
         
-        # Convert JSON to DOCX
-        convert_json_to_docx(json_data, docx_file_path)
+        # Only pairs missing from the interaction cache go to the server
+        keys = drug_pairs(chart_drugs(json_data))
+        cached, missing = ddi_pair_cache.lookup(keys)
+        if not missing:
+            return {'table': [row for key in keys for row in cached[key]]}
         
-        # Prepare files for API request
-        files = {
-            'file': ('document.docx', open(docx_file_path, 'rb'), 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-        }
-        
-        # Make API request
-        response = requests.post(api_url, files=files)
-        files['file'][1].close()
-        
-        if response.status_code == 200:
-            ddi_data = response.json()
-            table_data = []
-            if isinstance(ddi_data, dict):
-                if 'interactions' in ddi_data:
-                    for interaction in ddi_data['interactions']:
-                        table_data.append({
-                            'Drug 1': interaction.get('drug_A', ''),
-                            'Drug 2': interaction.get('drug_B', ''),
-                            'Interaction': interaction.get('interaction', '')
-                        })
-                elif 'drug_interactions' in ddi_data:
-                    for interaction in ddi_data['drug_interactions']:
-                        table_data.append({
-                            'Drug 1': interaction.get('drug1', ''),
-                            'Drug 2': interaction.get('drug2', ''),
-                            'Interaction': interaction.get('description', '')
-                        })
-            return {'table': table_data}
-        else:
-            raise requests.exceptions.RequestException(f"Server returned status code {response.status_code}")
+        asked = sorted({drug for key in missing for drug in key.split('|')})
+        fresh, unmatched = rows_by_pair(query_server(base_url, chart_with_drugs(json_data, asked)), asked)
+        # Rows the server named differently cannot be tied to a pair, so
+        # "no interaction" is only cached when every row was attributed
+        ddi_pair_cache.store(fresh if not unmatched else {key: rows for key, rows in fresh.items() if rows})
+        cached.update(fresh)
+        return {'table': [row for key in keys for row in cached[key]] + unmatched}
             
     except ConnectionRefusedError:
         raise ConnectionRefusedError("Connection refused. Please check if the DDI server is running and the IP/Port settings are correct.")
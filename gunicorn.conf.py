@@ -0,0 +1,60 @@
+"""
+Gunicorn settings for the production server.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Environment:
+    FLASK_HOST, FLASK_PORT   bind address (same variables as `python main.py`)
+    WEB_WORKERS              worker processes (default: 2 x CPUs + 1, at most 8)
+    WEB_THREADS              threads per worker (default: 4)
+    WEB_TIMEOUT              seconds before a stuck worker is killed (default: 120,
+                             a large chart can spend several seconds in pdflatex)
+    WARMUP                   0 skips the startup warmup (warmup.py) that wsgi.py
+                             runs before the socket is bound; /ready reports it
+    DDI_*                    DDI client timeouts, retries and circuit breaker
+                             (ddi_client.py), transport (ddiwindowmodified.py)
+                             pair cache (ddi_cache.py) and background scans
+                             (ddi_prescan.py); each worker has its own breaker,
+                             reported by /health
+
+All workers write into the same GENERATED_PDFS directory. Every print
+compiles in a job directory of its own (pdf_generator.py), so prints in
+different workers and threads never share files; see
+tests/test_concurrent_prints.py.
+
+Graceful reload: `kill -HUP <master pid>` starts new workers and lets the old
+ones finish their in-flight requests for up to graceful_timeout seconds.
+Because the app is preloaded in the master, code changes need a restart of
+the master instead (or `kill -USR2` for a zero-downtime re-exec).
+"""
+import multiprocessing
+import os
+
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5000')}"
+
+workers = int(os.getenv('WEB_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.getenv('WEB_THREADS', 4))
+worker_class = 'gthread'
+
+# Load main.py (indexes, templates, heavy imports) once, before forking
+preload_app = True
+
+timeout = int(os.getenv('WEB_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # The log writer thread started in the preloaded master is not inherited
+    from app_logging import restart_listener_after_fork
+    restart_listener_after_fork()
+    # Module-level start time was taken in the master
+    from metrics import mark_worker_started
+    mark_worker_started()
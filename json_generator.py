@@ -1,7 +1,10 @@
 import json
+import logging
 from datetime import datetime
 import uuid
 
+logger = logging.getLogger(__name__)
+
 
 def create_json_file(val1,val2,val3,format ):
     """
@@ -116,9 +119,9 @@ def create_json_file(val1,val2,val3,format ):
     try:
         with open(f'RESOURCES/{format}_format.json', 'w') as json_file:
             json.dump(data, json_file, indent=4)
-        print(f"JSON file '{format}_format.json' has been created successfully.")
+        logger.info("JSON file '%s_format.json' has been created successfully.", format)
     except Exception as e:
-        print(f"An error occurred while creating the JSON file: {e}")
+        logger.error("An error occurred while creating the JSON file: %s", e)
 
 
 
@@ -1,49 +1,293 @@
-from flask import Flask, render_template, request, send_file, jsonify, send_from_directory
+from flask import Flask, render_template, request, send_file, jsonify, send_from_directory, url_for, g
 import json
-from datetime import datetime, timedelta
-import uuid
+import hashlib
+import gzip
 import os
+import sys
 import time
 from json_generator import create_json_file
-from pdf_generator import generate_picu_treatment_chart
-from io import BytesIO
-from reportlab.pdfgen import canvas
-from database_handler import create_entry, return_database_with_history, search_entries, return_database_with_query_is_uuid  # Import the history function and search_entries
-import requests
-import shutil
+from pdf_generator import generate_picu_treatment_chart, invalidate_logo_cache, current_logo_path, find_pdflatex, prepare_logo, remove_job_dir
+from pdf_cache import PDFCache, PDF_SETTING_KEYS, chart_pdf_key
+from database_handler import create_entry, return_database_with_history, search_entries, return_database_with_query_is_uuid, record_chart_print  # Import the history function and search_entries
+from database_handler import register_chart_listener, iter_charts, chart_index, DB_PATH
+from medication_aggregates import MedicationAggregates
+from bed_board import BedBoard
+from settings_service import settings_service
+from asset_pipeline import asset_url, build_assets, manifest_version, serve_asset
+import logging
+
+from app_logging import configure_logging
+import metrics
+from tracing import finish_trace, server_timing_header, span, start_trace, write_trace
+import request_profiler
+from warmup import WARMUP_CHART, Warmup
+from circuit_breaker import ddi_breaker
+from ddi_prescan import DDIPrescanner
 
 app = Flask(__name__, static_folder='RESOURCES', static_url_path='/resources')
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Logos and format files keep fixed names, so browsers must revalidate them
+# (cheap: send_from_directory answers If-None-Match with a 304)
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
+
+# Content-hashed, precompressed CSS/JS for the index page (assets/dist)
+build_assets()
+app.jinja_env.globals['asset_url'] = asset_url
+
+# Re-copy the chart logo when the logo setting changes
+settings_service.subscribe(invalidate_logo_cache, keys=['logo_upload'])
+
+# Compiled chart PDFs by rendering inputs; reprinting an unchanged chart skips pdflatex
+pdf_cache = PDFCache(pdf_dir=os.path.join(app.root_path, 'GENERATED_PDFS'))
+settings_service.subscribe(pdf_cache.invalidate, keys=PDF_SETTING_KEYS)
+
+
+def _ddi_server_changed(changed, settings):
+    # Connections, failures and the JSON transport fallback belong to the
+    # old DDI host/port. Imported here so startup still does not load
+    # requests (or python-docx)
+    from ddi_client import ddi_client
+    ddi_client.reset()
+    ddi_breaker.reset()
+    if 'ddiwindowmodified' in sys.modules:
+        sys.modules['ddiwindowmodified'].reset_transport()
+
+
+settings_service.subscribe(_ddi_server_changed, keys=['ip_settings'])
+
+# Daily/weekly medication counts per bed, kept up to date on every save and
+# print; loaded from disk on first use
+medication_aggregates = MedicationAggregates(iter_charts=iter_charts, db_path=DB_PATH)
+register_chart_listener(medication_aggregates.record_chart_event)
+
+
+def _ward_bed_count():
+    try:
+        with open('RESOURCES/default_format.json', 'r') as f:
+            return int(json.load(f).get('default_Bed_count', 16))
+    except Exception as e:
+        logger.error("Error reading default_Bed_count: %s", e)
+        return 16
+
+
+# Most recent chart per bed, for the morning bed round
+bed_board = BedBoard(chart_index, bed_count=_ward_bed_count())
+register_chart_listener(bed_board.record_chart_event)
+
+# DDI scan of every saved or printed chart in the background; /ddi returns
+# the result at once while the chart's medication list is unchanged
+ddi_prescanner = DDIPrescanner(load_chart=return_database_with_query_is_uuid)
+register_chart_listener(ddi_prescanner.record_chart_event)
+
 # Assuming the create_json_file function is already imported
 # from your_module import create_json_file
 
+# Primes settings, logo, indexes, the index page and TeX before /ready says
+# so; started by wsgi.py (gunicorn) or __main__ (dev server)
+warmup = Warmup()
+
+
+@warmup.step('settings')
+def _warm_settings():
+    load_settings()
+
+
+@warmup.step('logo')
+def _warm_logo():
+    prepare_logo(app.root_path, os.path.join(app.root_path, 'GENERATED_PDFS'))
+
+
+@warmup.step('indexes')
+def _warm_indexes():
+    chart_index.history()
+    medication_aggregates.load_or_rebuild()
+    bed_board.overview()
+
+
+@warmup.step('index-page')
+def _warm_index_page():
+    with app.test_request_context('/'):
+        index()
+
+
+@warmup.step('tex')
+def _warm_tex():
+    # One real compile reads pdflatex's format, packages and fonts into the
+    # OS page cache; the PDF itself is thrown away
+    if not os.path.exists(find_pdflatex()):
+        return 'pdflatex not found'
+    settings = load_settings()
+    pdf_path = generate_picu_treatment_chart(settings.get('heading', 'PICU TREATMENT CHART'),
+                                             settings.get('subheading', 'MB 5 PCIU'), WARMUP_CHART,
+                                             settings.get('font_size', 8))
+    if not pdf_path:
+        raise RuntimeError('Warmup chart did not compile')
+    remove_job_dir(pdf_path)
+
+
+# Rendered index page and its ETag, keyed by the template's mtime. The page
+# carries no per-request data; formats and history come from JSON endpoints
+_index_page_cache = {}
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    start_trace()
+    # Admin-requested cProfile run (PROFILING_ENABLED + X-Profile token)
+    g.profiler = request_profiler.start_if_requested(request)
+
+
+@app.after_request
+def _record_request_metrics(response):
+    # Label by URL rule ("/get_entry/<uuid>"), not path, to bound cardinality
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    started = g.get('request_started')
+    if started is not None:
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method)
+    metrics.HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+
+    # Per-stage breakdown for the browser's dev tools (and $TRACE_FILE)
+    trace = finish_trace()
+    if trace is not None:
+        spans, total = trace
+        response.headers['Server-Timing'] = server_timing_header(spans, total)
+        if spans:
+            try:
+                write_trace(request.method, route, response.status_code, spans, total)
+            except Exception as e:
+                logger.error("Error writing trace: %s", e)
+
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        try:
+            spans, total = trace if trace is not None else ((), None)
+            name = request_profiler.finish(profiler, request.method, route, response.status_code, spans, total)
+            response.headers['X-Profile-Name'] = name
+        except Exception as e:
+            logger.error("Error saving request profile: %s", e)
+    return response
+
+
+@app.teardown_request
+def _stop_abandoned_profiler(exc):
+    # after_request does not run when a view raises; never leave the profiler on
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        try:
+            request_profiler.finish(profiler, request.method, route, 500)
+        except Exception as e:
+            logger.error("Error saving request profile: %s", e)
+
+
+@app.route('/profiles')
+def list_request_profiles():
+    """Recently saved request profiles (admin token required)."""
+    if not request_profiler.is_authorized(request):
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify(request_profiler.list_profiles())
+
+
+@app.route('/profiles/<filename>')
+def get_request_profile(filename):
+    """Download one saved profile file (.prof, .txt or .json)."""
+    if not request_profiler.is_authorized(request):
+        return jsonify({'error': 'Not found'}), 404
+    path = request_profiler.profile_file(filename)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(os.path.abspath(path), as_attachment=True, download_name=filename)
+
+
+@app.route('/ready')
+def readiness():
+    """200 once the startup warmup has finished, 503 until then."""
+    response = jsonify(warmup.status())
+    response.status_code = 200 if warmup.ready else 503
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@app.route('/health')
+def health():
+    """Liveness plus the state of upstream circuit breakers; always 200 while the process serves."""
+    response = jsonify({'status': 'ok', 'ready': warmup.ready, 'upstreams': {'ddi': ddi_breaker.snapshot()}})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Counters and latency histograms in Prometheus text format."""
+    return app.response_class(metrics.render(), mimetype=None, content_type=metrics.CONTENT_TYPE)
+
+
+def _accepts_gzip():
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+
+
+def _conditional_response(body, etag, mimetype, gzipped_body=None):
+    """
+    Response with a strong ETag; answers 304 if the browser already has it.
+    Bodies over 1 KB are gzipped for clients that accept it; the gzipped
+    representation gets its own ETag as HTTP requires.
+    """
+    response = app.response_class(mimetype=mimetype)
+    if _accepts_gzip() and len(body) > 1024:
+        response.set_data(gzipped_body if gzipped_body is not None else gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+        etag += '-gz'
+    else:
+        response.set_data(body)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 
 @app.route('/')
 def index():
     try:
-        # Load default format
-        with open('RESOURCES/default_format.json', 'r') as f:
-            default_data = json.load(f)
-        
-        # Get all JSON files in the RESOURCES directory
-        json_files = []
-        for file in os.listdir('RESOURCES'):
-            if file.endswith('.json') and file != 'default_format.json':
-                json_files.append(file)
-
-        # Get database entries for search tab
-        database_entries = return_database_with_history()
-
-        return render_template('index.html', 
-                             json_files=json_files,
-                             default_data=default_data,
-                             current_data=default_data,
-                             database_entries=database_entries)  # Pass entries to template
+        template_path = os.path.join(app.root_path, app.template_folder, 'index.html')
+        # The page changes only with the template or the asset fingerprints
+        cache_key = (os.path.getmtime(template_path), manifest_version())
+        metrics.record_cache_lookup('index_page', _index_page_cache.get('key') == cache_key)
+        if _index_page_cache.get('key') != cache_key:
+            body = render_template('index.html').encode('utf-8')
+            _index_page_cache.update(key=cache_key, body=body, gzipped=gzip.compress(body, compresslevel=9),
+                                     etag=hashlib.sha256(body).hexdigest()[:32])
+        return _conditional_response(_index_page_cache['body'], _index_page_cache['etag'], 'text/html',
+                                     gzipped_body=_index_page_cache['gzipped'])
     except Exception as e:
-        print(f"Error in index route: {str(e)}")
+        logger.error("Error in index route: %s", e)
         return str(e), 500
 
 
+@app.route('/formats')
+def list_formats():
+    """Names of the chart format JSON files in RESOURCES."""
+    try:
+        json_files = sorted(f for f in os.listdir('RESOURCES')
+                            if f.endswith('.json') and f != 'default_format.json')
+        body = json.dumps(json_files).encode('utf-8')
+        return _conditional_response(body, hashlib.sha256(body).hexdigest()[:32], 'application/json')
+    except Exception as e:
+        logger.error("Error listing formats: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/formats/<name>')
+def get_format(name):
+    """One chart format file; send_from_directory adds ETag/Last-Modified."""
+    if not name.endswith('.json'):
+        return jsonify({'error': 'Not a format file'}), 404
+    return send_from_directory('RESOURCES', name, max_age=0)
+
+
 def cleanup_old_pdfs(max_age_days=7, max_files=100):
     """
     Clean up old PDF files to prevent storage overflow.
@@ -70,7 +314,7 @@ def cleanup_old_pdfs(max_age_days=7, max_files=100):
             file_path = os.path.join(pdf_dir, pdf_file)
             if os.path.getmtime(file_path) < cutoff_time:
                 os.remove(file_path)
-                print(f"Removed old PDF: {pdf_file}")
+                logger.info("Removed old PDF: %s", pdf_file)
         
         # If still too many files, remove oldest ones
         pdf_files = [f for f in os.listdir(pdf_dir) if f.endswith('.pdf')]
@@ -78,189 +322,149 @@ def cleanup_old_pdfs(max_age_days=7, max_files=100):
             for pdf_file in pdf_files[:-max_files]:
                 file_path = os.path.join(pdf_dir, pdf_file)
                 os.remove(file_path)
-                print(f"Removed excess PDF: {pdf_file}")
+                logger.info("Removed excess PDF: %s", pdf_file)
                 
     except Exception as e:
-        print(f"Error in cleanup_old_pdfs: {str(e)}")
+        logger.error("Error in cleanup_old_pdfs: %s", e)
 
 
 def load_settings():
     """
-    Load settings from settings.json file.
-    Returns a dictionary containing the settings.
+    Return the current settings.
+    Served from memory by settings_service; settings.json is only re-read
+    when it changes on disk.
     """
-    try:
-        with open('settings.json', 'r') as f:
-            settings = json.load(f)
-        return settings
-    except Exception as e:
-        print(f"Error loading settings: {str(e)}")
-        # Return default settings if file not found or error occurs
-        return {
-            'heading': 'PICU TREATMENT CHART',
-            'subheading': 'MB 5 PCIU',
-            'font_size': 8,
-            'logo_upload': {
-                'path': 'RESOURCES/default_AIIMS_LOGO.png',
-                'url': '/resources/default_AIIMS_LOGO.png'
-            }
-        }
+    return settings_service.get()
+
+
+def _pdf_response(pdf_path, digest, as_attachment=False):
+    """
+    Serve a generated PDF with its content hash as a strong ETag.
+
+    If-None-Match is answered with a 304 for POST /download too (Werkzeug
+    only does that for GET). GET /pdfs/<digest>.pdf also supports Range
+    requests, and POST responses point to that URL with Content-Location.
+    """
+    if request.if_none_match.contains(digest):
+        response = app.response_class(status=304)
+    else:
+        response = send_file(
+            pdf_path,
+            as_attachment=as_attachment,
+            download_name=os.path.basename(pdf_path),
+            mimetype='application/pdf',
+            conditional=True,
+            etag=digest
+        )
+    response.set_etag(digest)
+    response.headers['Content-Location'] = url_for('get_pdf', digest=digest)
+    response.headers['Accept-Ranges'] = 'bytes'
+    # The URL names the content, so it never changes; patient data stays private
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+
+@app.route('/pdfs/<digest>.pdf')
+def get_pdf(digest):
+    """A previously generated chart PDF, addressed by its sha256."""
+    pdf_path = pdf_cache.path_for_digest(digest)
+    if pdf_path is None:
+        return jsonify({'error': 'PDF not found'}), 404
+    return _pdf_response(pdf_path, digest)
 
 
 @app.route('/download', methods=['POST'])
 def download_pdf():
     try:
-        print("\n=== Starting PDF Download Process ===")
         # Get JSON data from request
         json_data = request.get_json()
-        print(f"Received JSON data: {json_data}")
-
-        # Generate timestamp for unique filenames
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        print(f"Generated timestamp: {timestamp}")
+        logger.info("PDF requested for chart %s", json_data.get('uuid'))
+        logger.debug("Received JSON data: %s", json_data)
 
         # Get current directory and PDF directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
         pdf_dir = os.path.join(current_dir, "GENERATED_PDFS")
-        db_dir = os.path.join(current_dir, "DATABASE")  # Add DATABASE directory path
-
-        # Print directory information
-        print("\n=== Directory Information ===")
-        print(f"Current working directory: {os.getcwd()}")
-        print(f"PDF directory path: {pdf_dir}")
-        print(f"Database directory path: {db_dir}")
-        print(f"PDF directory exists: {os.path.exists(pdf_dir)}")
-        print(f"Database directory exists: {os.path.exists(db_dir)}")
-        print(f"PDF directory permissions: {oct(os.stat(pdf_dir).st_mode)[-3:]}")
-        print(f"Directory contents: {os.listdir(pdf_dir)}")
-
-        # Load settings
-        print("\n=== Loading Settings ===")
-        settings = load_settings()
-        print(f"Loaded settings: {settings}")
+
+        with span('settings'):
+            settings = load_settings()
 
         # Use settings for heading, subheading, and font size
         heading = settings.get('heading', 'PICU TREATMENT CHART')
         subheading = settings.get('subheading', 'MB 5 PCIU')
         font_size = settings.get('font_size', 8)
-        print(f"Using settings - heading: {heading}, subheading: {subheading}, font_size: {font_size}")
-
-        # Generate PDF
-        print("\n=== Generating PDF ===")
-        print("Calling generate_picu_treatment_chart...")
-        pdf_path = generate_picu_treatment_chart(heading, subheading, json_data, font_size)
-        print("Finished generate_picu_treatment_chart")
+        logger.debug("Using settings - heading: %s, subheading: %s, font_size: %s", heading, subheading, font_size)
+
+        # Reuse the PDF of an identical earlier print, otherwise generate it
+        with span('pdf-cache'):
+            pdf_key = chart_pdf_key(json_data, settings, current_logo_path(current_dir))
+            cached = pdf_cache.lookup(pdf_key)
+        if cached:
+            pdf_path, pdf_digest = cached
+            logger.info("Reusing cached PDF %s", pdf_path)
+        else:
+            generated_path = generate_picu_treatment_chart(heading, subheading, json_data, font_size)
+            pdf_path = None
+            if generated_path and os.path.exists(generated_path):
+                try:
+                    # This request's own PDF, from its own job directory
+                    with span('pdf-store'):
+                        pdf_path, pdf_digest = pdf_cache.store(pdf_key, generated_path)
+                finally:
+                    remove_job_dir(generated_path)
 
         if pdf_path and os.path.exists(pdf_path):
-            print(f"\n=== PDF Generation Successful ===")
-            print(f"PDF generated at: {pdf_path}")
-            print(f"File size: {os.path.getsize(pdf_path)} bytes")
+            logger.info("PDF ready at %s (%d bytes)", pdf_path, os.path.getsize(pdf_path))
 
             # Update db.json with print information
             try:
-                print("\n=== Updating db.json ===")
-                # Get the UUID from the JSON data
                 uuid = json_data.get('uuid')
-                print(f"UUID from JSON data: {uuid}")
-                
                 if uuid:
-                    # Get current timestamp in the correct format
-                    current_time = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-                    current_date = datetime.now().strftime("%d-%m-%Y")
-                    print(f"Current timestamp: {current_time}")
-                    
-                    # Load current db.json from DATABASE directory
-                    db_path = os.path.join(db_dir, 'db.json')
-                    print(f"Loading db.json from: {db_path}")
-                    
-                    with open(db_path, 'r') as f:
-                        db_data = json.load(f)
-                    print(f"Current db.json content: {db_data}")
-                    
-                    # Update print time for the entry
-                    entry_found = False
-                    if '_default' in db_data:
-                        for entry_id, entry in db_data['_default'].items():
-                            if entry.get('uuid') == uuid:
-                                print(f"Found matching entry in db.json: {entry}")
-                                entry['print_time'] = current_time
-                                entry_found = True
-                                print(f"Updated entry with new print_time: {entry}")
-                                break
-                    
-                    if not entry_found:
-                        print(f"Entry not found in db.json, adding new entry with UUID: {uuid}")
-                        # Create new entry
-                        new_entry = {
-                            'uuid': uuid,
-                            'datetime': current_time,
-                            'date': current_date,
-                            'Name': json_data.get('Name', ''),
-                            'Age_year': json_data.get('Age_year', ''),
-                            'Age_month': json_data.get('Age_month', ''),
-                            'Sex': json_data.get('Sex', ''),
-                            'uhid': json_data.get('uhid', ''),
-                            'bed_number': json_data.get('bed_number', ''),
-                            'Diagnosis': json_data.get('Diagnosis', ''),
-                            'Consultants': json_data.get('Consultants', ''),
-                            'JR': json_data.get('JR', ''),
-                            'SR': json_data.get('SR', ''),
-                            'print_time': current_time,
-                            'each_entry_layout': json_data.get('entries', {}),
-                            'each_table_row_layout': json_data.get('parameters', {})
-                        }
-                        
-                        # Get the next available ID
-                        next_id = str(max([int(k) for k in db_data['_default'].keys()]) + 1) if db_data['_default'] else '1'
-                        
-                        # Add the new entry
-                        db_data['_default'][next_id] = new_entry
-                        print(f"Added new entry with ID {next_id}: {new_entry}")
-                    
-                    # Save updated db.json
-                    print(f"Saving updated db.json to: {db_path}")
-                    with open(db_path, 'w') as f:
-                        json.dump(db_data, f, indent=2)
-                    print(f"Successfully saved updated db.json")
-                    
-                    # Verify the update
-                    with open(db_path, 'r') as f:
-                        updated_db = json.load(f)
-                    print(f"Verified db.json content after update: {updated_db}")
+                    # Written atomically under the database write lock, so a
+                    # snapshot taken meanwhile never sees a half-written file
+                    with span('db-update'):
+                        result = record_chart_print(json_data)
+                    logger.info("db.json %s entry with UUID: %s", result, uuid)
                 else:
-                    print("Warning: No UUID found in JSON data, skipping db.json update")
-            except Exception as db_error:
-                print(f"Warning: Failed to update db.json: {db_error}")
-                import traceback
-                traceback.print_exc()
-
-            # Return the PDF file
-            return send_file(
-                pdf_path,
-                as_attachment=True,
-                download_name=os.path.basename(pdf_path),
-                mimetype='application/pdf'
-            )
+                    logger.warning("No UUID found in JSON data, skipping db.json update")
+            except Exception:
+                logger.exception("Failed to update db.json")
+
+            # Return the PDF file (or 304 if the client already has it)
+            return _pdf_response(pdf_path, pdf_digest, as_attachment=True)
         else:
-            print("\n=== PDF Generation Failed ===")
-            print(f"Generated PDF not found at: {pdf_path}")
-            print(f"Directory contents: {os.listdir(pdf_dir)}")
+            logger.error("PDF generation failed, no PDF at %s", pdf_path)
+            if logger.isEnabledFor(logging.DEBUG) and os.path.isdir(pdf_dir):
+                logger.debug("Directory contents: %s", os.listdir(pdf_dir))
             return jsonify({"error": "Failed to generate PDF"}), 500
 
     except Exception as e:
-        print(f"ERROR in download_pdf: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in download_pdf")
         return jsonify({"error": str(e)}), 500
 
 
 @app.route('/get_entries')
 def get_entries():
+    """
+    History rows [Name, datetime, uhid, uuid], newest first.
+    Optional ?page=N&per_page=M returns one page; X-Total-Count has the total.
+    """
     try:
         entries = return_database_with_history()
-        return jsonify(entries)
+        total = len(entries)
+        page = request.args.get('page', type=int)
+        per_page = request.args.get('per_page', default=100, type=int)
+        if page:
+            start = (max(page, 1) - 1) * per_page
+            entries = entries[start:start + per_page]
+
+        # The ETag follows the database generation, so an unchanged history
+        # costs the browser a 304 and no body
+        etag = hashlib.sha256(repr((chart_index.signature(), page, per_page)).encode()).hexdigest()[:32]
+        response = _conditional_response(json.dumps(entries).encode('utf-8'), etag, 'application/json')
+        response.headers['X-Total-Count'] = str(total)
+        return response
     except Exception as e:
-        print(f"Error getting entries: {str(e)}")
+        logger.error("Error getting entries: %s", e)
         return jsonify([]), 500
 
 
@@ -271,11 +475,11 @@ def search():
     date = data.get('date', '').strip()
     uhid = data.get('uhid', '').strip()
     
-    print(f"Search parameters - Name: '{name}', Date: '{date}', UHID: '{uhid}'")
+    logger.debug("Search parameters - Name: '%s', Date: '%s', UHID: '%s'", name, date, uhid)
     
     # Get all entries
     entries = return_database_with_history()
-    print(f"Total entries found: {len(entries)}")
+    logger.debug("Total entries found: %d", len(entries))
     
     # Filter entries based on search criteria
     filtered_entries = []
@@ -291,27 +495,69 @@ def search():
         if name_match and date_match and uhid_match:
             filtered_entries.append(entry)
     
-    print(f"Filtered entries found: {len(filtered_entries)}")
+    logger.debug("Filtered entries found: %d", len(filtered_entries))
     return jsonify(filtered_entries)
 
 
 @app.route('/get_entry/<uuid>')
 def get_entry(uuid):
     try:
-        print(f"Received request for UUID: {uuid}")  # Debug log
-        
+        logger.debug("Received request for UUID: %s", uuid)
+
         # Get the entry from the database using return_database_with_query_is_uuid
         entry = return_database_with_query_is_uuid(param_uuid=uuid)
-        print(f"Search result: {entry}")  # Debug log
-        
+
         if not entry:
-            print(f"No entry found for UUID: {uuid}")  # Debug log
+            logger.info("No entry found for UUID: %s", uuid)
             return jsonify({'error': 'Entry not found'}), 404
         
-        print(f"Returning entry: {entry}")  # Debug log
+        logger.debug("Returning entry: %s", entry)
         return jsonify(entry)
     except Exception as e:
-        print(f"Error getting entry: {str(e)}")
+        logger.error("Error getting entry: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/ward')
+def ward_overview():
+    """All beds with the uuid, name, uhid and times of their current chart."""
+    try:
+        return jsonify(bed_board.overview())
+    except Exception as e:
+        logger.error("Error getting ward overview: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/ward/<bed_number>')
+def ward_bed(bed_number):
+    try:
+        chart = bed_board.current(bed_number)
+        if not chart:
+            return jsonify({'error': f'No chart on bed {bed_number}'}), 404
+        return jsonify(chart)
+    except Exception as e:
+        logger.error("Error getting bed %s: %s", bed_number, e)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/aggregates/medications')
+def medication_usage():
+    """
+    Medication usage counts per bed.
+    Query args: granularity=daily|weekly, from, to (YYYY-MM-DD or YYYY-Www), bed
+    """
+    try:
+        rows = medication_aggregates.query(
+            granularity=request.args.get('granularity', 'daily'),
+            start=request.args.get('from'),
+            end=request.args.get('to'),
+            bed=request.args.get('bed')
+        )
+        return jsonify(rows)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error("Error getting medication aggregates: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -319,8 +565,7 @@ def get_entry(uuid):
 def settings():
     if request.method == 'GET':
         try:
-            with open('settings.json', 'r') as f:
-                settings_data = json.load(f)
+            settings_data = settings_service.get()
             # Convert the logo path to a URL path
             if 'logo_upload' in settings_data and 'path' in settings_data['logo_upload']:
                 logo_path = settings_data['logo_upload']['path']
@@ -329,16 +574,15 @@ def settings():
                 settings_data['logo_upload']['url'] = f'/resources/{logo_filename}'
             return jsonify(settings_data)
         except Exception as e:
-            print(f"Error reading settings: {str(e)}")
+            logger.error("Error reading settings: %s", e)
             return jsonify({'error': str(e)}), 500
     elif request.method == 'POST':
         try:
             new_settings = request.get_json()
-            with open('settings.json', 'w') as f:
-                json.dump(new_settings, f, indent=2)
+            settings_service.replace(new_settings)
             return jsonify({'message': 'Settings updated successfully'})
         except Exception as e:
-            print(f"Error updating settings: {str(e)}")
+            logger.error("Error updating settings: %s", e)
             return jsonify({'error': str(e)}), 500
 
 
@@ -356,24 +600,20 @@ def upload_logo():
             # Save the file as website_logo.png
             file.save('RESOURCES/website_logo.png')
             
-            # Update settings.json with the new logo path
-            with open('settings.json', 'r') as f:
-                settings_data = json.load(f)
-            
-            settings_data['logo_upload'] = {
-                'path': 'RESOURCES/website_logo.png',
-                'url': '/resources/website_logo.png'
-            }
-            
-            with open('settings.json', 'w') as f:
-                json.dump(settings_data, f, indent=2)
+            # Update settings.json with the new logo path (atomic read-modify-write)
+            settings_service.update({
+                'logo_upload': {
+                    'path': 'RESOURCES/website_logo.png',
+                    'url': '/resources/website_logo.png'
+                }
+            })
             
             return jsonify({'message': 'Logo uploaded successfully'})
         else:
             return jsonify({'error': 'Only PNG files are allowed'}), 400
             
     except Exception as e:
-        print(f"Error uploading logo: {str(e)}")
+        logger.error("Error uploading logo: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -381,19 +621,15 @@ def upload_logo():
 def ddi():
     try:
         # Get the JSON data from the request
-        json_data = request.get_json()
-        
-        # Save the current data to current_format.json
-        with open('RESOURCES/current_format.json', 'w') as f:
-            json.dump(json_data, f, indent=2)
+        json_data = request.get_json(silent=True)
+        if not json_data:
+            return jsonify({'error': 'No chart data provided'}), 400
         
-        # Wait for file to be written
-        time.sleep(1)
-        
-        # Use our fetch_ddi_data function
-        from ddiwindowmodified import fetch_ddi_data
+        # Background result if still current, else fetch_ddi_data (python-docx
+        # and requests load on first use)
+        import requests
         try:
-            results = fetch_ddi_data(json_data)
+            results = ddi_prescanner.scan(json_data)
             if not results or 'table' not in results:
                 return jsonify({'error': 'No results returned from DDI server'}), 503
             return jsonify(results)
@@ -414,10 +650,15 @@ def ddi():
             return jsonify({'error': str(e)}), 500
             
     except Exception as e:
-        print(f"Error in DDI route: {str(e)}")
+        logger.error("Error in DDI route: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/assets/<path:filename>')
+def serve_assets(filename):
+    return serve_asset(filename)
+
+
 @app.route('/resources/<path:filename>')
 def serve_resource(filename):
     return send_from_directory('RESOURCES', filename)
@@ -426,4 +667,5 @@ def serve_resource(filename):
 if __name__ == '__main__':
     host = os.getenv('FLASK_HOST', '192.168.1.153')
     port = int(os.getenv('FLASK_PORT', 5001))
+    warmup.start()
     app.run(host=host, port=port, debug=False)
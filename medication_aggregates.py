@@ -0,0 +1,208 @@
+"""
+Incrementally maintained medication-usage aggregates.
+
+Pharmacy dashboards need per-day and per-week counts of charted drugs and
+entry categories per bed. Instead of scanning every each_entry_layout in
+the database on each request, the counts are updated whenever a chart is
+saved or printed and persisted to DATABASE/aggregates.json:
+
+    {
+      "daily":  {"2025-05-11": {"<bed>": {"charts": 2, "prints": 3,
+                                          "categories": {"Antimicrobials": 2},
+                                          "drugs": {"amoxicillin": 1}}}},
+      "weekly": {"2025-W19": {...same shape...}}
+    }
+
+`prints` counts every print, reprints included. A rebuild takes them
+from each chart's print_count, all on the day of its latest print_time,
+since earlier print days are not stored.
+
+A query touches O(days x beds) rows regardless of how many charts exist.
+The aggregates are loaded (or, the first time, built from every chart) on
+first use, so importing the app does not scan the database.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+from chart_index import file_signature
+from db_storage import atomic_write_json
+
+AGGREGATES_PATH = os.path.join('DATABASE', 'aggregates.json')
+UNKNOWN_BED = 'unassigned'
+
+
+def _chart_day(chart, event):
+    """Day a chart event counts towards; prints count on the day they happen."""
+    if event == 'inserted':
+        for field, fmt in (('datetime', '%d-%m-%Y %H:%M:%S'), ('date', '%d-%m-%Y')):
+            try:
+                return datetime.strptime(chart.get(field) or '', fmt).date()
+            except ValueError:
+                continue
+    return datetime.now().date()
+
+
+def _week_key(day):
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _normalize(text):
+    return ' '.join(str(text).split())
+
+
+def extract_medications(chart):
+    """
+    Return (category, drug) pairs charted in `chart`.
+
+    Stored charts keep medications in each_entry_layout; /download payloads
+    that have not been stored yet use `entries`.
+    """
+    layout = chart.get('each_entry_layout') or chart.get('entries') or {}
+    pairs = []
+    for entry in layout.values():
+        if not isinstance(entry, dict):
+            continue
+        category = _normalize(entry.get('title', ''))
+        for subtitle in (entry.get('subtitles') or {}).values():
+            drug = _normalize(subtitle.get('content', '')) if isinstance(subtitle, dict) else ''
+            if drug:
+                pairs.append((category, drug.lower()))
+    return pairs
+
+
+def _empty_row():
+    return {'charts': 0, 'prints': 0, 'categories': {}, 'drugs': {}}
+
+
+class MedicationAggregates:
+    def __init__(self, path=AGGREGATES_PATH, iter_charts=None, db_path=None):
+        """
+        Args:
+            path (str): Persisted aggregates
+            iter_charts (callable): Returns an iterator over stored charts;
+                used to build the aggregates if `path` does not exist yet
+            db_path (str): File iter_charts reads; chart events that
+                arrive while it is unchanged since a rebuild are skipped
+        """
+        self.path = path
+        self._iter_charts = iter_charts
+        self.db_path = db_path
+        self._rebuilt_from = None  # file_signature(db_path) the last rebuild read
+        self._lock = threading.Lock()
+        self._tables = {'daily': {}, 'weekly': {}}
+        self._signature = None
+        self.loaded = False
+
+    def load_or_rebuild(self, iter_charts=None):
+        """
+        Load persisted aggregates, or build them once from all stored charts.
+
+        Args:
+            iter_charts (callable): Overrides the one given to the constructor
+        """
+        with self._lock:
+            self._load_or_rebuild(iter_charts or self._iter_charts)
+        return self
+
+    def _load_or_rebuild(self, iter_charts):
+        """Returns True if the aggregates were rebuilt from the charts."""
+        self.loaded = True
+        if os.path.exists(self.path):
+            self._load()
+            return False
+        self._tables = {'daily': {}, 'weekly': {}}
+        self._rebuilt_from = file_signature(self.db_path) if self.db_path else None
+        for chart in iter_charts():
+            self._apply('inserted', chart)
+            if chart.get('print_time'):
+                day = self._print_day(chart)
+                for _ in range(chart.get('print_count') or 1):
+                    self._apply('printed', chart, day=day)
+        self._save()
+        return True
+
+    def _refresh(self):
+        """Load on first use, or reload if another process updated the file."""
+        if not self.loaded:
+            return self._load_or_rebuild(self._iter_charts)
+        if os.path.exists(self.path) and file_signature(self.path) != self._signature:
+            self._load()
+        return False
+
+    def _load(self):
+        with open(self.path, 'r') as f:
+            self._tables = json.load(f)
+        self._signature = file_signature(self.path)
+
+    def _save(self):
+        atomic_write_json(self.path, self._tables)
+        self._signature = file_signature(self.path)
+
+    @staticmethod
+    def _print_day(chart):
+        try:
+            return datetime.strptime(chart['print_time'], '%d-%m-%Y %H:%M:%S').date()
+        except (KeyError, ValueError):
+            return None
+
+    def _apply(self, event, chart, day=None):
+        day = day or _chart_day(chart, event)
+        bed = _normalize(chart.get('bed_number', '')) or UNKNOWN_BED
+        for table, period in (('daily', day.isoformat()), ('weekly', _week_key(day))):
+            row = self._tables[table].setdefault(period, {}).setdefault(bed, _empty_row())
+            if event == 'printed':
+                row['prints'] += 1
+                continue
+            row['charts'] += 1
+            # Counts are charts per drug/category, not doses within a chart
+            medications = extract_medications(chart)
+            for category in {category for category, _ in medications if category}:
+                row['categories'][category] = row['categories'].get(category, 0) + 1
+            for drug in {drug for _, drug in medications}:
+                row['drugs'][drug] = row['drugs'].get(drug, 0) + 1
+
+    def record_chart_event(self, event, chart):
+        """Chart listener: fold one insert or print into the aggregates."""
+        with self._lock:
+            if self._refresh() or self._rebuilt_from_current_db():
+                # Built from db.json, which already holds this event (a
+                # new chart's print follows its insert without a write)
+                return
+            self._apply(event, chart)
+            self._save()
+
+    def _rebuilt_from_current_db(self):
+        if self._rebuilt_from is None:
+            return False
+        if file_signature(self.db_path) == self._rebuilt_from:
+            return True
+        self._rebuilt_from = None  # db.json moved on; later events are all new
+        return False
+
+    def query(self, granularity='daily', start=None, end=None, bed=None):
+        """
+        Return aggregate rows for a period range, oldest first.
+
+        Args:
+            granularity (str): "daily" (periods YYYY-MM-DD) or "weekly" (YYYY-Www)
+            start, end (str): Inclusive period bounds in the granularity's format
+            bed (str): Only this bed if given
+        Returns:
+            list: {"period", "bed", "charts", "prints", "categories", "drugs"} dicts
+        """
+        if granularity not in ('daily', 'weekly'):
+            raise ValueError("granularity must be 'daily' or 'weekly'")
+        with self._lock:
+            self._refresh()
+            rows = []
+            for period in sorted(self._tables[granularity]):
+                if (start and period < start) or (end and period > end):
+                    continue
+                for bed_number, row in sorted(self._tables[granularity][period].items()):
+                    if bed is not None and bed_number != bed:
+                        continue
+                    rows.append(dict(row, period=period, bed=bed_number))
+            return rows
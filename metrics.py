@@ -0,0 +1,261 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are registered once at import time and
+updated from the request path. GET /metrics returns render(). Each gunicorn
+worker keeps its own values, and Prometheus tells them apart by the
+`instance` it scrapes. Behind a single port a scrape sees whichever worker
+answers, so counters are best read with rate(), which tolerates that.
+
+The metrics every module reports are defined at the bottom of this file,
+so names and labels stay in one place.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """Yield (suffix, label values, extra labels, value)."""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, values, extra, value in self.samples():
+            labels = _format_labels(self.labelnames, values, extra)
+            lines.append(f'{self.name}{suffix}{labels} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            yield '', values, (), value
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function):
+        """
+        Compute the gauge at scrape time.
+
+        Args:
+            function (callable): Returns a number, or for labelled gauges a
+                list of (labels dict, number)
+        """
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                result = self._function()
+            except Exception:
+                return
+            if not self.labelnames:
+                yield '', (), (), result
+                return
+            for labels, value in result:
+                yield '', self._key(labels), (), value
+            return
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            yield '', values, (), value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (not cumulative) counts, the +Inf overflow, and the sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the `with` block, also when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield '_bucket', values, (('le', _format_value(bound)),), cumulative
+            yield '_count', values, (), cumulative
+            yield '_sum', values, (), total
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render():
+    """All registered metrics in Prometheus text format."""
+    return REGISTRY.render()
+
+
+# --- Metrics reported by the app ---
+
+HTTP_REQUESTS = counter('http_requests_total', 'HTTP requests by route, method and status.',
+                        ('route', 'method', 'status'))
+HTTP_REQUEST_SECONDS = histogram('http_request_duration_seconds', 'HTTP request latency by route.',
+                                 ('route', 'method'))
+
+PDFLATEX_SECONDS = histogram('pdflatex_compile_duration_seconds', 'Duration of pdflatex runs.',
+                             buckets=(0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0, 60.0))
+PDFLATEX_FAILURES = counter('pdflatex_failures_total', 'pdflatex runs that did not produce a PDF.')
+
+DB_OPERATION_SECONDS = histogram('db_operation_duration_seconds', 'Chart database reads and writes.',
+                                 ('operation',))
+DB_RECORDS = gauge('db_records', 'Charts in the database.')
+
+DDI_UPSTREAM_SECONDS = histogram('ddi_upstream_duration_seconds', 'Requests to the DDI server.',
+                                 buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+DDI_UPSTREAM_ERRORS = counter('ddi_upstream_errors_total', 'Failed requests to the DDI server by reason.',
+                              ('reason',))
+DDI_UPSTREAM_RETRIES = counter('ddi_upstream_retries_total', 'Requests to the DDI server that were retried.')
+DDI_PRESCANS = counter('ddi_prescans_total', 'Background DDI scans of saved and printed charts by outcome.',
+                       ('outcome',))
+CIRCUIT_BREAKER_STATE = gauge('circuit_breaker_state', 'Upstream circuit breakers: 0 closed, 1 half-open, 2 open.',
+                              ('upstream',))
+
+CACHE_REQUESTS = counter('cache_requests_total', 'Cache lookups by cache and result (hit/miss).',
+                         ('cache', 'result'))
+CACHE_HIT_RATIO = gauge('cache_hit_ratio', 'Hits / lookups since start-up, by cache.', ('cache',))
+
+LOG_RECORDS_DROPPED = counter('log_records_dropped_total', 'Log records dropped because the log queue was full.')
+PROCESS_START_TIME = gauge('process_start_time_seconds', 'Start time of this worker (unix time).')
+PROCESS_START_TIME.set(time.time())
+
+
+def mark_worker_started():
+    """
+    Reset process_start_time_seconds in a forked worker.
+
+    With gunicorn's preload_app this module is imported once in the master,
+    so every worker would otherwise report the master's start time (called
+    from gunicorn.conf.py's post_fork hook).
+    """
+    PROCESS_START_TIME.set(time.time())
+
+
+def record_cache_lookup(cache, hit):
+    """Count one lookup of a named cache."""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def _cache_hit_ratios():
+    lookups = {}
+    with CACHE_REQUESTS._lock:
+        for (cache, result), count in CACHE_REQUESTS._values.items():
+            hits, total = lookups.get(cache, (0, 0))
+            lookups[cache] = (hits + (count if result == 'hit' else 0), total + count)
+    return [({'cache': cache}, hits / total) for cache, (hits, total) in sorted(lookups.items()) if total]
+
+
+CACHE_HIT_RATIO.set_function(_cache_hit_ratios)
@@ -0,0 +1,111 @@
+"""
+Content-addressed cache of generated chart PDFs.
+
+A chart PDF depends only on the chart's printed fields, the heading,
+subheading and font size settings, and the logo. PDFCache maps a hash of
+those inputs to a PDF that was already compiled, so printing an unchanged
+chart again skips pdflatex. Each PDF is stored as GENERATED_PDFS/<sha256>.pdf.
+That digest is its strong ETag and part of its URL (/pdfs/<sha256>.pdf), so
+browsers can revalidate with If-None-Match and PDF viewers can fetch byte
+ranges from any worker.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from chart_index import file_signature
+from metrics import record_cache_lookup
+
+# Settings that change how a chart is rendered
+PDF_SETTING_KEYS = ('heading', 'subheading', 'font_size', 'logo_upload')
+# Fields that differ between prints of the same chart but are not printed
+UNPRINTED_FIELDS = ('uuid', 'datetime', 'date', 'print_time')
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def chart_pdf_key(json_data, settings, logo_path):
+    """
+    Hash of everything a chart PDF is rendered from.
+
+    Args:
+        json_data (dict): /download payload
+        settings (dict): Current settings
+        logo_path (str): Logo the PDF would use; its file signature is part
+            of the key because re-uploading a logo keeps the same setting
+    Returns:
+        str: Hex sha256
+    """
+    payload = {
+        'chart': {k: v for k, v in json_data.items() if k not in UNPRINTED_FIELDS},
+        'settings': {k: settings.get(k) for k in PDF_SETTING_KEYS},
+        'logo': [logo_path, file_signature(logo_path)],
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PDFCache:
+    def __init__(self, pdf_dir='GENERATED_PDFS', max_entries=200):
+        self.pdf_dir = pdf_dir
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._digests = OrderedDict()  # chart key -> PDF digest, least recently used first
+
+    def path_for_digest(self, digest):
+        """Path of the stored PDF with this digest, or None."""
+        if not DIGEST_PATTERN.match(digest or ''):
+            return None
+        path = os.path.join(self.pdf_dir, f"{digest}.pdf")
+        return path if os.path.isfile(path) else None
+
+    def lookup(self, key):
+        """
+        Return (pdf_path, digest) of the PDF already generated for `key`.
+
+        Returns None on a miss, or if cleanup_old_pdfs removed the file.
+        """
+        with self._lock:
+            digest = self._digests.get(key)
+            path = self.path_for_digest(digest) if digest is not None else None
+            record_cache_lookup('pdf', path is not None)
+            if path is None:
+                self._digests.pop(key, None)
+                return None
+            self._digests.move_to_end(key)
+            return path, digest
+
+    def store(self, key, pdf_path):
+        """
+        Move a freshly generated PDF to its content-addressed name.
+
+        `pdf_path` must be the PDF this request generated (its own job
+        directory), never a shared name another print could overwrite.
+
+        Returns:
+            tuple: (new pdf_path, digest)
+        """
+        digest = file_digest(pdf_path)
+        stored_path = os.path.join(self.pdf_dir, f"{digest}.pdf")
+        os.replace(pdf_path, stored_path)
+        with self._lock:
+            self._digests[key] = digest
+            self._digests.move_to_end(key)
+            while len(self._digests) > self.max_entries:
+                self._digests.popitem(last=False)
+        return stored_path, digest
+
+    def invalidate(self, changed_keys=None, settings=None):
+        """Forget chart keys; subscribed to the settings PDFs are rendered with."""
+        with self._lock:
+            self._digests.clear()
@@ -7,7 +7,13 @@ import sys
 import tempfile # Added for temporary directory
 import shutil   # Added for moving files
 import re
-from datetime import datetime
+import threading
+import logging
+
+from metrics import PDFLATEX_FAILURES, PDFLATEX_SECONDS, record_cache_lookup
+from tracing import span
+
+logger = logging.getLogger(__name__)
 
 
 def split_string(s,length=10):
@@ -107,35 +113,30 @@ def generate_picu_treatment_chart(heading,subheading,json_data,font_size=9):
         output_filename (str): The filename for the generated PDF
 
     Returns:
-        str: Path to the generated PDF file
+        str: Path to the generated PDF file, inside a working directory of
+        its own; remove it with remove_job_dir() once the PDF is used
     """
-    print("\n=== Starting PDF Generation Process ===")
-    print(f"Input parameters:")
-    print(f"- Heading: {heading}")
-    print(f"- Subheading: {subheading}")
-    print(f"- Font size: {font_size}")
+    logger.debug("Generating chart PDF - heading: %s, subheading: %s, font size: %s", heading, subheading, font_size)
     
     # If json_data is a string, parse it
     if isinstance(json_data, str):
-        print("Converting JSON string to dictionary...")
         json_data = json.loads(json_data)
 
-    print("\n=== Extracting Patient Information ===")
     # Extract patient information
-    patient_info = extract_patient_info(json_data)
-    print(f"Extracted patient info: {patient_info}")
+    with span('patient-info'):
+        patient_info = extract_patient_info(json_data)
+    logger.debug("Extracted patient info: %s", patient_info)
 
-    print("\n=== Extracting Treatment Tables ===")
     # Extract treatment tables
-    treatment_tables = extract_entry_tables(json_data)
-    print(f"Found {len(treatment_tables)} treatment tables")
+    with span('entry-tables'):
+        treatment_tables = extract_entry_tables(json_data)
+    logger.debug("Found %d treatment tables", len(treatment_tables))
 
-    print("\n=== Extracting Table Rows ===")
     # Extract table rows
-    table_rows = extract_table_rows(json_data)
-    print(f"Found {len(table_rows)} table rows")
+    with span('table-rows'):
+        table_rows = extract_table_rows(json_data)
+    logger.debug("Found %d table rows", len(table_rows))
 
-    print("\n=== Generating PDF ===")
     # Generate the PDF and get the path
     pdf_path = generate_pdf_from_latex(
         heading=heading,
@@ -147,14 +148,10 @@ def generate_picu_treatment_chart(heading,subheading,json_data,font_size=9):
     )
 
     if pdf_path and os.path.exists(pdf_path):
-        print(f"\n=== PDF Generation Successful ===")
-        print(f"PDF generated at: {pdf_path}")
-        print(f"File size: {os.path.getsize(pdf_path)} bytes")
+        logger.info("PDF generated at %s (%d bytes)", pdf_path, os.path.getsize(pdf_path))
         return pdf_path
     else:
-        print("\n=== PDF Generation Failed ===")
-        print(f"PDF path: {pdf_path}")
-        print(f"File exists: {os.path.exists(pdf_path) if pdf_path else False}")
+        logger.error("PDF generation failed (path: %s)", pdf_path)
         return None
 
 
@@ -193,10 +190,8 @@ def extract_patient_info(json_data):
         else:
             patient_info_escaped[key] = value # Keep non-strings as they are
 
-    # Optional: Print the *final* escaped value being used
-    print("????????????????????????????????????????????????????????")
-    # Print the value that will actually be used in the template
-    print(f"Final escaped diagnosis: {repr(patient_info_escaped.get('diagnosis', ''))}")
+    # The value that will actually be used in the template
+    logger.debug("Final escaped diagnosis: %r", patient_info_escaped.get('diagnosis', ''))
 
     # Return the dictionary containing the FINAL escaped values
     return patient_info_escaped
@@ -352,21 +347,102 @@ def generate_two_column_table(data):
 
 # sanitize_filename function should be defined above this point
 
+# Logo copied into GENERATED_PDFS for pdflatex, keyed by output directory.
+# Each value is (source path, mtime, size), so the copy only happens again
+# when a new logo is uploaded or the logo setting changes.
+_logo_cache = {}
+_logo_cache_lock = threading.Lock()
+
+# Per-print working directories under GENERATED_PDFS
+JOB_DIR_PREFIX = 'job_'
+
+
+def invalidate_logo_cache(changed_keys=None, settings=None):
+    """Forget prepared logos; subscribed to changes of the logo_upload setting."""
+    with _logo_cache_lock:
+        _logo_cache.clear()
+
+
+def current_logo_path(current_dir):
+    """Absolute path of the logo printed on charts: the uploaded one, else the default."""
+    website_logo_path = os.path.join(current_dir, "RESOURCES", "website_logo.png")
+    default_logo_path = os.path.join(current_dir, "RESOURCES", "default_AIIMS_LOGO.png")
+
+    if os.path.exists(website_logo_path):
+        return website_logo_path
+    return default_logo_path
+
+
+def prepare_logo(current_dir, output_dir):
+    """
+    Copy the current logo into output_dir if it is not there already.
+
+    Returns:
+        str: Logo filename to reference from the LaTeX source
+    """
+    logo_path = current_logo_path(current_dir)
+    logo_filename = os.path.basename(logo_path)
+    logo_copy_path = os.path.join(output_dir, logo_filename)
+
+    with _logo_cache_lock:
+        try:
+            st = os.stat(logo_path)
+            key = (logo_path, st.st_mtime_ns, st.st_size)
+            fresh = _logo_cache.get(output_dir) == key and os.path.exists(logo_copy_path)
+            record_cache_lookup('logo', fresh)
+            if fresh:
+                return logo_filename
+            # Jobs in other threads or workers may be reading the old copy
+            tmp_path = f"{logo_copy_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.copy2(logo_path, tmp_path)
+            os.replace(tmp_path, logo_copy_path)
+            _logo_cache[output_dir] = key
+            logger.info("Copied logo to: %s", logo_copy_path)
+        except Exception as e:
+            logger.warning("Failed to copy logo: %s", e)
+    return logo_filename
+
+
+
+def remove_job_dir(pdf_path):
+    """
+    Delete the working directory of a PDF from generate_picu_treatment_chart.
+
+    Call it once the PDF has been moved or read; other paths are left alone.
+    """
+    job_dir = os.path.dirname(pdf_path or '')
+    if os.path.basename(job_dir).startswith(JOB_DIR_PREFIX):
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+
+def find_pdflatex():
+    """
+    Return the path of the pdflatex binary to use.
+
+    $PDFLATEX overrides the search, e.g. for a TeX install elsewhere. The
+    path is returned even if it does not exist, so callers can report it.
+    """
+    if os.getenv('PDFLATEX'):
+        return os.getenv('PDFLATEX')
+    if sys.platform == 'win32':
+        pdflatex_path = r"C:\texlive\2023\bin\win32\pdflatex.exe"
+        if not os.path.exists(pdflatex_path):
+            pdflatex_path = r"C:\texlive\2022\bin\win32\pdflatex.exe"
+    else:
+        pdflatex_path = "/usr/local/bin/pdflatex"
+        if not os.path.exists(pdflatex_path):
+            pdflatex_path = "/usr/bin/pdflatex"
+    return pdflatex_path
+
 
 def generate_pdf_from_latex(heading, subheading, patient_info, treatment_tables, table_rows, font_size=13):
     try:
         # Detect pdflatex path
-        if sys.platform == 'win32':
-            pdflatex_path = r"C:\texlive\2023\bin\win32\pdflatex.exe"
-            if not os.path.exists(pdflatex_path):
-                pdflatex_path = r"C:\texlive\2022\bin\win32\pdflatex.exe"
-        else:
-            pdflatex_path = "/usr/local/bin/pdflatex"
-            if not os.path.exists(pdflatex_path):
-                pdflatex_path = "/usr/bin/pdflatex"
+        pdflatex_path = find_pdflatex()
 
         if not os.path.exists(pdflatex_path):
-            print(f"ERROR: pdflatex not found at {pdflatex_path}")
+            PDFLATEX_FAILURES.inc()
+            logger.error("pdflatex not found at %s", pdflatex_path)
             return None
 
         # Calculate line height based on font size
@@ -381,37 +457,23 @@ def generate_pdf_from_latex(heading, subheading, patient_info, treatment_tables,
         output_dir = os.path.join(current_dir, "GENERATED_PDFS")
         os.makedirs(output_dir, exist_ok=True)
 
-        # Generate a unique filename using timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_filename = f"current_{timestamp}"
-        tex_file_path = os.path.join(output_dir, f"{base_filename}.tex")
-        pdf_file_path = os.path.join(output_dir, f"{base_filename}.pdf")
+        # Every job compiles in its own directory: concurrent prints (threads
+        # or worker processes) must never share the .tex, .aux or .pdf
+        job_dir = tempfile.mkdtemp(prefix=JOB_DIR_PREFIX, dir=output_dir)
+        base_filename = "chart"
+        tex_file_path = os.path.join(job_dir, f"{base_filename}.tex")
+        pdf_file_path = os.path.join(job_dir, f"{base_filename}.pdf")
 
         # Process the tables into LaTeX code
-        left_table = generate_minipage(treatment_tables)
-        right_table = generate_two_column_table(table_rows)
-
-        # Check for logo files
-        website_logo_path = os.path.join(current_dir, "RESOURCES", "website_logo.png")
-        default_logo_path = os.path.join(current_dir, "RESOURCES", "default_AIIMS_LOGO.png")
-        
-        if os.path.exists(website_logo_path):
-            logo_path = website_logo_path  # Use absolute path
-            print("Using website logo")
-        else:
-            logo_path = default_logo_path  # Use absolute path
-            print("Using default logo")
+        with span('latex-assembly'):
+            left_table = generate_minipage(treatment_tables)
+            right_table = generate_two_column_table(table_rows)
 
-        # Create a copy of the logo in the output directory
-        logo_filename = os.path.basename(logo_path)
-        logo_copy_path = os.path.join(output_dir, logo_filename)
-        try:
-            shutil.copy2(logo_path, logo_copy_path)
-            print(f"Copied logo to: {logo_copy_path}")
-        except Exception as e:
-            print(f"Warning: Failed to copy logo: {e}")
-            logo_copy_path = logo_path  # Fall back to original path
+        # Make sure the logo is next to the .tex file (copied only when it changed)
+        with span('logo-copy'):
+            logo_filename = prepare_logo(current_dir, output_dir)
 
+        assembly = span('latex-assembly')
         latex_code = rf"""
 \documentclass{{article}}
 \usepackage{{graphicx}}
@@ -488,59 +550,62 @@ def generate_pdf_from_latex(heading, subheading, patient_info, treatment_tables,
 
 \end{{document}}
 """
+        assembly.end()
         # --- Write LaTeX code to the intermediate .tex file ---
         try:
-            print("\n=== Writing LaTeX File ===")
-            print(f"Writing to: {tex_file_path}")
-            with open(tex_file_path, "w", encoding="utf-8") as f:
+            logger.debug("Writing LaTeX to %s", tex_file_path)
+            with span('tex-write'), open(tex_file_path, "w", encoding="utf-8") as f:
                 f.write(latex_code)
-            print("LaTeX file written successfully")
         except Exception as e:
-            print(f"ERROR: Failed to write LaTeX file: {e}")
+            logger.error("Failed to write LaTeX file: %s", e)
+            remove_job_dir(pdf_file_path)
             return None
 
         # --- Compile LaTeX to PDF ---
         try:
-            print("\n=== Compiling LaTeX to PDF ===")
-            print(f"Using pdflatex at: {pdflatex_path}")
-            print(f"Compiling: {tex_file_path}")
-            print(f"Output will be: {pdf_file_path}")
+            logger.debug("Compiling %s with %s", tex_file_path, pdflatex_path)
 
             # Run pdflatex with full path and proper error handling
-            result = subprocess.run(
-                [pdflatex_path, "-jobname", base_filename, "-interaction=nonstopmode", tex_file_path],
-                cwd=output_dir,  # Set working directory to output_dir
-                capture_output=True,
-                text=True
-            )
-
-            # Print compilation output for debugging
-            print("\n=== pdflatex Output ===")
-            print(result.stdout)
+            with PDFLATEX_SECONDS.time(), span('pdflatex'):
+                result = subprocess.run(
+                    [pdflatex_path, "-jobname", base_filename, "-interaction=nonstopmode", tex_file_path],
+                    cwd=job_dir,
+                    # The shared logo copy stays in output_dir
+                    env=dict(os.environ, TEXINPUTS=output_dir + os.pathsep),
+                    capture_output=True,
+                    text=True
+                )
+
+            # Full compiler output only when debugging; it is tens of KB per compile
+            logger.debug("pdflatex output:\n%s", result.stdout)
             if result.stderr:
-                print("\n=== pdflatex Errors ===")
-                print(result.stderr)
+                logger.debug("pdflatex errors:\n%s", result.stderr)
 
             if result.returncode != 0:
-                print(f"ERROR: pdflatex compilation failed with return code {result.returncode}")
+                PDFLATEX_FAILURES.inc()
+                logger.error("pdflatex compilation failed with return code %s", result.returncode)
+                # The end of the log holds the LaTeX error
+                logger.error("pdflatex output (tail):\n%s", result.stdout[-2000:])
+                remove_job_dir(pdf_file_path)
                 return None
 
             # Check if PDF was generated
             if not os.path.exists(pdf_file_path):
-                print(f"ERROR: PDF file not found at {pdf_file_path}")
+                PDFLATEX_FAILURES.inc()
+                logger.error("PDF file not found at %s", pdf_file_path)
+                remove_job_dir(pdf_file_path)
                 return None
 
-            print(f"PDF generated successfully at: {pdf_file_path}")
             return pdf_file_path
 
         except Exception as e:
-            print(f"ERROR: Failed to compile LaTeX: {e}")
+            PDFLATEX_FAILURES.inc()
+            logger.error("Failed to compile LaTeX: %s", e)
+            remove_job_dir(pdf_file_path)
             return None
 
     except Exception as e:
-        print(f"ERROR: Unexpected error in generate_pdf_from_latex: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Unexpected error in generate_pdf_from_latex")
         return None
 
 # --- Keep the __main__ block for testing ---
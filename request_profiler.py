@@ -0,0 +1,184 @@
+"""
+Opt-in profiling of single requests in production.
+
+Disabled unless both environment variables are set:
+
+    PROFILING_ENABLED=1
+    PROFILING_TOKEN=<secret shared with admins>
+
+An admin then profiles one request by adding the header `X-Profile: <token>`.
+The token is accepted in the header only; a query argument would end up in
+the access log. The request runs under cProfile, and three files are saved
+to PROFILE_DIR (default DATABASE/profiles), which keeps the newest
+PROFILE_KEEP (default 20) profiles:
+
+    <name>.prof   pstats dump (snakeviz, `python -m pstats`)
+    <name>.txt    call tree by cumulative time, with callees
+    <name>.json   route, status, total time, Server-Timing spans and the
+                  wall time spent waiting on subprocesses (pdflatex)
+
+GET /profiles lists recent profiles, and GET /profiles/<file> downloads one.
+Both require the same token. Only one request is profiled at a time; the
+profiler hooks are interpreter-wide on newer Pythons.
+"""
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join('DATABASE', 'profiles'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 20))
+PROFILE_EXTENSIONS = ('.prof', '.txt', '.json')
+_PROFILE_FILE = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9]{6}-[A-Za-z0-9_.-]+\.(prof|txt|json)$')
+
+_active = threading.Lock()
+
+
+def profiling_enabled():
+    return os.getenv('PROFILING_ENABLED') == '1' and bool(os.getenv('PROFILING_TOKEN'))
+
+
+def is_authorized(request):
+    """True if profiling is enabled and the request carries the admin token."""
+    if not profiling_enabled():
+        return False
+    supplied = request.headers.get('X-Profile', '')
+    return hmac.compare_digest(supplied.encode('utf-8'), os.getenv('PROFILING_TOKEN').encode('utf-8'))
+
+
+def start_if_requested(request):
+    """
+    Start profiling the current request if an admin asked for it.
+
+    Returns:
+        cProfile.Profile or None
+    """
+    if not request.headers.get('X-Profile'):
+        return None
+    if request.path.startswith('/profiles'):
+        # The token also authorizes listing/downloading; do not profile that
+        return None
+    if not is_authorized(request):
+        logger.warning("Rejected profiling request for %s", request.path)
+        return None
+    if not _active.acquire(blocking=False):
+        logger.info("Another request is being profiled; %s runs unprofiled", request.path)
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        _active.release()
+        logger.warning("A profiler is already active; %s runs unprofiled", request.path)
+        return None
+    return profiler
+
+
+def _subprocess_wall_seconds(stats):
+    # Time the request thread spent blocked in subprocess.run (pdflatex)
+    return sum(ct for (filename, _, func), (_, _, _, ct, _) in stats.stats.items()
+               if func == 'run' and filename.endswith('subprocess.py'))
+
+
+def finish(profiler, method, route, status, spans=(), total=None, profile_dir=None):
+    """
+    Stop the profiler and save the profile.
+
+    Args:
+        profiler (cProfile.Profile): From start_if_requested()
+        spans (list): (name, start_s, duration_s) from tracing.finish_trace()
+        total (float): Request duration in seconds
+    Returns:
+        str: Profile name (file names without extension)
+    """
+    profile_dir = profile_dir or PROFILE_DIR
+    try:
+        profiler.disable()
+    finally:
+        _active.release()
+
+    os.makedirs(profile_dir, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', route).strip('_') or 'root'
+    name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{method}-{slug}"
+    base = os.path.join(profile_dir, name)
+
+    profiler.dump_stats(base + '.prof')
+    report = io.StringIO()
+    stats = pstats.Stats(profiler, stream=report)
+    stats.sort_stats('cumulative').print_stats(60)
+    stats.print_callees(30)
+    with open(base + '.txt', 'w') as f:
+        f.write(report.getvalue())
+
+    pdflatex_seconds = sum(duration for span_name, _, duration in spans if span_name == 'pdflatex')
+    summary = {
+        'name': name,
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'method': method,
+        'route': route,
+        'status': status,
+        'total_ms': round(total * 1000, 3) if total is not None else None,
+        'pdflatex_ms': round(pdflatex_seconds * 1000, 3),
+        'subprocess_wall_ms': round(_subprocess_wall_seconds(stats) * 1000, 3),
+        'spans': [{'name': span_name, 'start_ms': round(start * 1000, 3), 'dur_ms': round(duration * 1000, 3)}
+                  for span_name, start, duration in spans],
+    }
+    with open(base + '.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    prune_profiles(profile_dir)
+    logger.info("Saved request profile %s", name)
+    return name
+
+
+def _profile_names(profile_dir):
+    try:
+        files = os.listdir(profile_dir)
+    except FileNotFoundError:
+        return []
+    return sorted({os.path.splitext(f)[0] for f in files if _PROFILE_FILE.match(f)}, reverse=True)
+
+
+def prune_profiles(profile_dir=None, keep=None):
+    """Delete all but the newest `keep` profiles."""
+    profile_dir = profile_dir or PROFILE_DIR
+    keep = PROFILE_KEEP if keep is None else keep
+    for name in _profile_names(profile_dir)[keep:]:
+        for ext in PROFILE_EXTENSIONS:
+            try:
+                os.remove(os.path.join(profile_dir, name + ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(profile_dir=None):
+    """Summaries of the saved profiles, newest first."""
+    profile_dir = profile_dir or PROFILE_DIR
+    profiles = []
+    for name in _profile_names(profile_dir):
+        try:
+            with open(os.path.join(profile_dir, name + '.json')) as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            summary = {'name': name}
+        summary['files'] = [name + ext for ext in PROFILE_EXTENSIONS
+                            if os.path.exists(os.path.join(profile_dir, name + ext))]
+        profiles.append(summary)
+    return profiles
+
+
+def profile_file(filename, profile_dir=None):
+    """Path of a saved profile file, or None if the name is not one."""
+    profile_dir = profile_dir or PROFILE_DIR
+    if not _PROFILE_FILE.match(filename):
+        return None
+    path = os.path.join(profile_dir, filename)
+    return path if os.path.isfile(path) else None
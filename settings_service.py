@@ -0,0 +1,121 @@
+"""
+Single in-memory source of truth for settings.json.
+
+The parsed settings are kept in memory and only re-read when the file's
+signature (inode, size, mtime) changes, so /download, /ddi and /settings no
+longer open and parse the file on every request. Writes go through a
+temp-file-and-rename under a process-wide lock, and subscribers are told
+which top-level keys changed, whether the change came from this process,
+another worker or a hand edit of the file.
+"""
+import copy
+import json
+import logging
+import os
+import threading
+
+from chart_index import file_signature
+from db_storage import ProcessWriteLock, atomic_write_json
+from metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_PATH = 'settings.json'
+
+DEFAULT_SETTINGS = {
+    'heading': 'PICU TREATMENT CHART',
+    'subheading': 'MB 5 PCIU',
+    'font_size': 8,
+    'logo_upload': {
+        'path': 'RESOURCES/default_AIIMS_LOGO.png',
+        'url': '/resources/default_AIIMS_LOGO.png'
+    }
+}
+
+
+class SettingsService:
+    def __init__(self, path=SETTINGS_PATH, defaults=None):
+        self.path = path
+        self.defaults = defaults if defaults is not None else DEFAULT_SETTINGS
+        self._lock = threading.RLock()
+        self._write_lock = ProcessWriteLock(os.path.join('DATABASE', '.settings.lock'))
+        self._settings = None
+        self._signature = None
+        self._subscribers = []  # (keys or None, callback)
+
+    def subscribe(self, callback, keys=None):
+        """
+        Call `callback(changed_keys, settings)` when settings change.
+
+        Args:
+            callback (callable): Receives the set of changed top-level keys
+                and a copy of the new settings
+            keys (iterable): Only notify when one of these keys changed
+                (default: any key)
+        """
+        self._subscribers.append((frozenset(keys) if keys else None, callback))
+
+    def _notify(self, old, new):
+        changed = {key for key in set(old) | set(new) if old.get(key) != new.get(key)}
+        if not changed:
+            return
+        for keys, callback in self._subscribers:
+            if keys is None or keys & changed:
+                try:
+                    callback(changed, copy.deepcopy(new))
+                except Exception as e:
+                    logger.error("Error in settings subscriber %s: %s", getattr(callback, '__name__', callback), e)
+
+    def _reload_if_changed(self):
+        signature = file_signature(self.path)
+        fresh = self._settings is not None and signature == self._signature
+        record_cache_lookup('settings', fresh)
+        if fresh:
+            return
+        old = self._settings
+        try:
+            with open(self.path, 'r') as f:
+                self._settings = json.load(f)
+        except Exception as e:
+            logger.error("Error loading settings: %s", e)
+            # Fall back to defaults if the file is missing or broken
+            self._settings = copy.deepcopy(self.defaults)
+        self._signature = signature
+        if old is not None:
+            self._notify(old, self._settings)
+
+    def get(self):
+        """Return a copy of the current settings."""
+        with self._lock:
+            self._reload_if_changed()
+            return copy.deepcopy(self._settings)
+
+    def value(self, key, default=None):
+        """Return one top-level setting without copying the whole dict."""
+        with self._lock:
+            self._reload_if_changed()
+            return copy.deepcopy(self._settings.get(key, default))
+
+    def replace(self, new_settings):
+        """Atomically replace settings.json with `new_settings`."""
+        with self._write_lock, self._lock:
+            self._reload_if_changed()
+            self._write(copy.deepcopy(new_settings))
+
+    def update(self, changes):
+        """Atomically merge `changes` into the top level of settings.json."""
+        with self._write_lock, self._lock:
+            self._reload_if_changed()
+            new_settings = copy.deepcopy(self._settings)
+            new_settings.update(copy.deepcopy(changes))
+            self._write(new_settings)
+
+    def _write(self, new_settings):
+        old = self._settings
+        atomic_write_json(self.path, new_settings, indent=2)
+        self._settings = new_settings
+        self._signature = file_signature(self.path)
+        self._notify(old or {}, new_settings)
+
+
+settings_service = SettingsService()
@@ -0,0 +1,40 @@
+"""
+ChartCodec shares vocabulary strings between cached charts and leaves
+per-patient text out of its string table.
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_codec import ChartCodec  # noqa: E402
+
+
+def chart(name, description):
+    # json.loads gives every chart its own string objects, as TinyDB does
+    return json.loads(json.dumps({
+        "Name": name,
+        "each_sex_value_names": {"Sex_1_name": "Male", "Sex_2_name": "Female", "Sex_3_name": "Other",
+                                 "Sex_4_name": "Unknown"},
+        "each_table_row_layout": {"row_1": {"row_header_name": "Weight", "row_header_description": description}},
+    }))
+
+
+def test_sex_names_are_shared_between_charts():
+    codec = ChartCodec()
+    first, second = chart("Patient A", "12 kg"), chart("Patient B", "12 kg")
+    assert first["each_sex_value_names"]["Sex_1_name"] is not second["each_sex_value_names"]["Sex_1_name"]
+    first, second = codec.decode(codec.encode(first)), codec.decode(codec.encode(second))
+    for key in ("Sex_1_name", "Sex_2_name", "Sex_3_name", "Sex_4_name"):
+        assert first["each_sex_value_names"][key] is second["each_sex_value_names"][key]
+    assert first["each_table_row_layout"]["row_1"]["row_header_name"] is \
+        second["each_table_row_layout"]["row_1"]["row_header_name"]
+
+
+def test_free_text_is_not_interned():
+    codec = ChartCodec()
+    decoded = codec.decode(codec.encode(chart("Patient A", "12 kg")))
+    assert decoded["each_table_row_layout"]["row_1"]["row_header_description"] == "12 kg"
+    assert "12 kg" not in codec._strings
+    assert "Patient A" not in codec._strings
@@ -0,0 +1,155 @@
+"""
+Concurrent /download requests for different charts must each get their own
+chart's PDF.
+
+The app runs from a scratch copy with a stand-in pdflatex that copies the
+.tex source into the "PDF" after a short pause, so overlapping jobs really
+overlap and every PDF names the patient it was rendered for.
+"""
+import glob
+import hashlib
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Args are -jobname <name> -interaction=nonstopmode <tex file>
+FAKE_PDFLATEX = '#!/bin/sh\nsleep 0.3\ncat "$4" > "$2.pdf"\n'
+
+CHILD = r'''
+import hashlib, json, sys, threading
+import main
+
+charts = json.loads(sys.argv[1])
+results = [None] * len(charts)
+barrier = threading.Barrier(len(charts))
+
+def post(i):
+    client = main.app.test_client()
+    barrier.wait()
+    response = client.post('/download', json=charts[i])
+    body = response.get_data()
+    results[i] = {'status': response.status_code, 'etag': response.headers.get('ETag', '').strip('"'),
+                  'sha256': hashlib.sha256(body).hexdigest(), 'body': body.decode('utf-8', 'replace')}
+
+threads = [threading.Thread(target=post, args=(i,)) for i in range(len(charts))]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+print(json.dumps(results))
+'''
+
+
+def chart(n):
+    return {'uuid': f'00000000-0000-4000-8000-{n:012d}', 'Name': f'Patient Number{n:03d}', 'uhid': f'{100000000 + n}',
+            'bed_number': str(n % 16 + 1), 'Age_year': '4', 'Age_month': '2', 'Sex': 'Male',
+            'entries': {}, 'parameters': {}}
+
+
+@pytest.fixture
+def app_copy(tmp_path):
+    """Scratch copy of the app with an empty database and a stand-in pdflatex."""
+    for module in glob.glob(os.path.join(REPO_ROOT, '*.py')):
+        shutil.copy2(module, tmp_path)
+    resources = tmp_path / 'RESOURCES'
+    resources.mkdir()
+    for name in os.listdir(os.path.join(REPO_ROOT, 'RESOURCES')):
+        src = os.path.join(REPO_ROOT, 'RESOURCES', name)
+        if os.path.isfile(src):
+            shutil.copy2(src, resources)
+    for folder in ('templates', 'assets'):
+        shutil.copytree(os.path.join(REPO_ROOT, folder), tmp_path / folder, ignore=shutil.ignore_patterns('dist'))
+    shutil.copy2(os.path.join(REPO_ROOT, 'settings.json'), tmp_path)
+    (tmp_path / 'DATABASE').mkdir()
+    (tmp_path / 'DATABASE' / 'db.json').write_text('{"_default": {}}')
+    fake = tmp_path / 'fake_pdflatex'
+    fake.write_text(FAKE_PDFLATEX)
+    fake.chmod(0o755)
+    env = dict(os.environ, PYTHONPATH=str(tmp_path), PDFLATEX=str(fake), WARMUP='0', DDI_PRESCAN='0',
+               LOG_LEVEL='WARNING')
+    return tmp_path, env
+
+
+def check_own_pdfs(charts, results):
+    names = [c['Name'] for c in charts]
+    for sent, result in zip(charts, results):
+        assert result['status'] == 200, result['body'][:500]
+        assert result['sha256'] == result['etag']
+        assert sent['Name'] in result['body']
+        assert not [name for name in names if name != sent['Name'] and name in result['body']]
+
+
+def test_concurrent_prints_get_their_own_pdf(app_copy):
+    workdir, env = app_copy
+    charts = [chart(n) for n in range(8)]
+    out = subprocess.run([sys.executable, '-c', CHILD, json.dumps(charts)], cwd=workdir, env=env,
+                         capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr[-3000:]
+    check_own_pdfs(charts, json.loads(out.stdout.strip().splitlines()[-1]))
+
+    # Reprints are served from the PDF cache and must still be the patient's own
+    out = subprocess.run([sys.executable, '-c', CHILD, json.dumps(charts)], cwd=workdir, env=env,
+                         capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr[-3000:]
+    check_own_pdfs(charts, json.loads(out.stdout.strip().splitlines()[-1]))
+    # Job directories are removed once their PDF is stored
+    assert not glob.glob(str(workdir / 'GENERATED_PDFS' / 'job_*'))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_concurrent_prints_across_gunicorn_workers(app_copy):
+    # Worker processes share GENERATED_PDFS, so per-process locks cannot
+    # keep their jobs apart; only per-request paths can
+    pytest.importorskip('gunicorn')
+    requests = pytest.importorskip('requests')
+    workdir, env = app_copy
+    port = free_port()
+    env = dict(env, FLASK_HOST='127.0.0.1', FLASK_PORT=str(port), WEB_WORKERS='3', WEB_THREADS='4')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        deadline = time.time() + 60
+        while True:
+            try:
+                if requests.get(base_url + '/ready', timeout=5).ok:
+                    break
+            except requests.RequestException:
+                pass
+            assert time.time() < deadline, 'gunicorn did not come up'
+            time.sleep(0.2)
+
+        charts = [chart(n) for n in range(12)]
+        results = [None] * len(charts)
+        barrier = threading.Barrier(len(charts))
+
+        def post(i):
+            barrier.wait()
+            response = requests.post(base_url + '/download', json=charts[i], timeout=60)
+            results[i] = {'status': response.status_code, 'etag': response.headers.get('ETag', '').strip('"'),
+                          'sha256': hashlib.sha256(response.content).hexdigest(),
+                          'body': response.content.decode('utf-8', 'replace')}
+
+        threads = [threading.Thread(target=post, args=(i,)) for i in range(len(charts))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        check_own_pdfs(charts, results)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
@@ -0,0 +1,112 @@
+"""
+Lightweight per-request spans, reported through the Server-Timing header.
+
+Code wraps a pipeline stage in `with span('pdflatex'):`, or calls
+`stage = span('name')` ... `stage.end()` where a block does not fit.
+Spans recorded while a request is being handled are returned as
+
+    Server-Timing: patient-info;dur=0.2, pdflatex;dur=1843.5, ..., total;dur=1902.1
+
+which browser dev tools show under the request's Timing tab. Outside a
+request span() costs one context variable lookup.
+
+If $TRACE_FILE is set, every request that recorded spans is also appended
+to that file as one JSON line: time, method, route, status, total_ms and
+spans [{name, start_ms, dur_ms}], with start_ms relative to the request
+start.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+_trace = contextvars.ContextVar('trace', default=None)
+_trace_file_lock = threading.Lock()
+
+
+def start_trace():
+    """Start collecting spans for the current request."""
+    _trace.set({'started': time.perf_counter(), 'spans': []})
+
+
+class Span:
+    """A timed stage; use as a context manager or call end() explicitly."""
+
+    def __init__(self, name):
+        self.name = name
+        self._trace = _trace.get()
+        self._started = time.perf_counter()
+        self._ended = False
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.end()
+
+    def end(self):
+        if self._trace is None or self._ended:
+            return
+        self._ended = True
+        now = time.perf_counter()
+        self._trace['spans'].append((self.name, self._started - self._trace['started'], now - self._started))
+
+
+def span(name):
+    """
+    Time a stage of the current request.
+
+    Args:
+        name (str): Server-Timing metric name (a token: letters, digits, -)
+    Returns:
+        Span: Started now; ends when the `with` block exits or on end()
+    """
+    return Span(name)
+
+
+def finish_trace():
+    """
+    Stop collecting and return the trace of the current request.
+
+    Returns:
+        tuple: (spans as (name, start_s, duration_s), total_s), or None if
+        no trace was started
+    """
+    trace = _trace.get()
+    _trace.set(None)
+    if trace is None:
+        return None
+    return trace['spans'], time.perf_counter() - trace['started']
+
+
+def server_timing_header(spans, total):
+    """Server-Timing header value; repeated stages are summed."""
+    durations = {}
+    for name, _, duration in spans:
+        durations[name] = durations.get(name, 0.0) + duration
+    parts = [f"{name};dur={duration * 1000:.1f}" for name, duration in durations.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ', '.join(parts)
+
+
+def write_trace(method, route, status, spans, total, path=None):
+    """Append one request's spans to $TRACE_FILE (no-op if it is not set)."""
+    path = path or os.getenv('TRACE_FILE')
+    if not path:
+        return
+    entry = {
+        'time': datetime.now().isoformat(timespec='milliseconds'),
+        'method': method,
+        'route': route,
+        'status': status,
+        'total_ms': round(total * 1000, 3),
+        'spans': [{'name': name, 'start_ms': round(start * 1000, 3), 'dur_ms': round(duration * 1000, 3)}
+                  for name, start, duration in spans],
+    }
+    line = json.dumps(entry) + '\n'
+    with _trace_file_lock:
+        with open(path, 'a') as f:
+            f.write(line)
@@ -0,0 +1,114 @@
+"""
+Startup warmup: prime caches before the app takes traffic.
+
+The first /download after a restart pays for a cold pdflatex (format file,
+packages and fonts read from disk), an empty chart index and an unrendered
+index page. A Warmup runs registered steps once at startup so the first
+nurse does not:
+
+    warmup = Warmup()
+
+    @warmup.step('indexes')
+    def _warm_indexes():
+        chart_index.history()
+
+A step may return a string to report it as skipped (e.g. no pdflatex); an
+exception marks it failed. Failed steps are logged but do not keep the app
+from becoming ready, since the app works without them, only slower.
+
+GET /ready reports 503 until every step has finished, then 200. Under
+gunicorn the master runs the warmup before forking, so workers start out
+ready. Set WARMUP=0 to skip the warmup; the app is then ready at once.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# A /download body touching every medication category and parameter row,
+# with LaTeX specials, so the warmup compile loads the same packages and
+# fonts a real chart does
+WARMUP_CHART = {
+    "Name": "Warmup Patient", "Age_year": "4", "Age_month": "6", "Sex": "Female", "uhid": "000000000",
+    "bed_number": "1", "Diagnosis": "Severe pneumonia & sepsis (50% FiO2)", "Consultants": "Dr. One",
+    "JR": "Dr. Two", "SR": "Dr. Three",
+    "parameters": {f"row_{n + 1}": {"row_header_name": name, "row_header_description": value}
+                   for n, (name, value) in enumerate([("Date", "01-01-2025"), ("Time", "08:00"),
+                                                      ("Weight", "15 kg"), ("Length", "98 cm"),
+                                                      ("BSA", "0.64 m^2"), ("TFR", "100%"),
+                                                      ("TFV", "1250 ml"), ("IVM", "N/2 + 5% D")])},
+    "entries": {f"entry_{n + 1}": {"title": title, "subtitles": {
+        f"subtitle_{m + 1}": {"content": drug, "day": f"D{m + 1}", "dose": dose, "volume": "5 ml"}
+        for m, (drug, dose) in enumerate(drugs)}}
+        for n, (title, drugs) in enumerate([
+            ("Respiratory support", [("HFNC", "2 L/kg/min"), ("O2 via NC", "1 L/min")]),
+            ("Sedation, analgesia, and neuromuscular blockade", [("Midazolam", "1 mcg/kg/min"),
+                                                                 ("Fentanyl", "1 mcg/kg/h")]),
+            ("Inotropes and Anti-hypertensives", [("Adrenaline", "0.1 mcg/kg/min")]),
+            ("Antimicrobials", [("Ceftriaxone", "100 mg/kg q24h"), ("Vancomycin", "15 mg/kg q6h")]),
+            ("Other Medications", [("Paracetamol", "15 mg/kg q6h"), ("Pantoprazole", "1 mg/kg #OD")]),
+        ])},
+}
+
+
+class Warmup:
+    def __init__(self, enabled=None):
+        self.enabled = os.getenv('WARMUP', '1') != '0' if enabled is None else enabled
+        self._steps = []
+        self._lock = threading.Lock()
+        self._results = {}  # step name -> {"status", "ms", "detail"}
+        self._state = 'pending' if self.enabled else 'ready'
+        self._finished_at = None
+
+    def step(self, name):
+        """Decorator registering `func()` as a warmup step; steps run in order."""
+        def decorator(func):
+            self._steps.append((name, func))
+            return func
+        return decorator
+
+    @property
+    def ready(self):
+        return self._state == 'ready'
+
+    def run(self):
+        """Run every step in this thread; returns once the app is ready."""
+        with self._lock:
+            if self._state != 'pending':
+                return
+            self._state = 'running'
+        started = time.perf_counter()
+        for name, func in self._steps:
+            step_started = time.perf_counter()
+            try:
+                detail = func()
+                status = 'skipped' if isinstance(detail, str) else 'ok'
+            except Exception as e:
+                logger.exception("Warmup step %s failed", name)
+                status, detail = 'failed', str(e)
+            elapsed_ms = (time.perf_counter() - step_started) * 1000
+            self._results[name] = {'status': status, 'ms': round(elapsed_ms, 1),
+                                   'detail': detail if isinstance(detail, str) else None}
+            logger.info("Warmup step %s %s in %.0f ms", name, status, elapsed_ms)
+        self._finished_at = time.time()
+        self._state = 'ready'
+        logger.info("Warmup finished in %.0f ms", (time.perf_counter() - started) * 1000)
+
+    def start(self):
+        """Run the warmup in a background thread (the dev server keeps serving /ready)."""
+        if self._state != 'pending':
+            return None
+        thread = threading.Thread(target=self.run, name='warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        """Body of GET /ready."""
+        return {
+            'ready': self.ready,
+            'state': self._state if self.enabled else 'disabled',
+            'steps': dict(self._results),
+            'finished_at': self._finished_at,
+        }
@@ -0,0 +1,27 @@
+"""
+WSGI entry point for the production server (see gunicorn.conf.py).
+
+main loads the chart index and medication aggregates on first use; here
+they are loaded up front, the index template is compiled and the DDI module
+imported, so with preload_app all of this happens once in the gunicorn
+master and the forked workers share the memory copy-on-write.
+
+The startup warmup (see warmup.py) also runs here, before gunicorn binds
+its socket, so workers are forked ready and /ready answers 200 in all of
+them.
+"""
+import gc
+
+from main import app, chart_index, medication_aggregates, warmup
+import ddiwindowmodified  # noqa: F401  (python-docx is slow to import)
+
+chart_index.refresh_if_stale()
+medication_aggregates.load_or_rebuild()
+warmup.run()
+
+# Compile the index template before the workers fork
+app.jinja_env.get_template('index.html')
+
+# Keep the garbage collector in the workers from touching (and therefore
+# un-sharing) the pages holding everything loaded so far
+gc.freeze()